@@ -58,8 +58,9 @@ import {
   getTrackedReposSummary,
   refreshTrackedReposSummary,
   fetchTrackedReposOnly,
-  fetchTrackedReposSummaryOnly,
-  getHotRepos,
+  subscribeActivityUpdates,
+  streamTrackedReposSummary,
+  streamHotRepos,
   refreshHotRepos,
   HotReposResponse
 } from './api/github'
@@ -131,24 +132,31 @@ function MainContent() {
   const [isRefreshingTrackedSummary, setIsRefreshingTrackedSummary] = useState(false);
   const [shouldTranslate, setShouldTranslate] = useState(false)
 
-  // 热门仓库和总结查询
-  const { 
-    data: hotReposData = { repos: [], summary: '' }, 
-    refetch: refetchHotRepos, 
-    isLoading: isLoadingHotRepos 
-  } = useQuery<HotReposResponse>({
-    queryKey: ['hotRepos', shouldTranslate],
-    queryFn: () => getHotRepos(shouldTranslate),
-    enabled: tabValue === 0,
-    refetchOnWindowFocus: false,
-    staleTime: 5 * 60 * 1000
-  })
+  // 热门仓库和总结通过 SSE 获取，先显示仓库列表，总结逐段显示；
+  // 切换翻译选项或卸载时关闭连接，服务端随之停止生成
+  const [hotReposData, setHotReposData] = useState<HotReposResponse>({ repos: [], summary: '' })
+  const [isLoadingHotRepos, setIsLoadingHotRepos] = useState(true)
+  React.useEffect(() => {
+    setIsLoadingHotRepos(true)
+    setHotReposData({ repos: [], summary: '' })
+    return streamHotRepos(shouldTranslate, {
+      onRepos: (repos) => {
+        setHotReposData({ repos, summary: '' })
+        setIsLoadingHotRepos(false)
+      },
+      onSummary: (chunk) => setHotReposData((data) => ({ ...data, summary: data.summary + chunk })),
+      onError: (detail) => {
+        setIsLoadingHotRepos(false)
+        setMessage('获取热门项目失败：' + detail)
+      }
+    })
+  }, [shouldTranslate])
 
   // 刷新热门仓库的mutation
   const refreshHotReposMutation = useMutation({
     mutationFn: () => refreshHotRepos(shouldTranslate),
     onSuccess: (data) => {
-      queryClient.setQueryData(['hotRepos', shouldTranslate], data)
+      setHotReposData(data)
       setMessage('热门项目数据已更新！')
     },
     onError: (error) => {
@@ -169,17 +177,16 @@ function MainContent() {
     staleTime: 5 * 60 * 1000
   } as UseQueryOptions<TrackedRepo[]>)
 
-  // 已追踪仓库总结查询
-  const {
-    data: trackedReposSummaryData = '',
-    isLoading: isLoadingTrackedSummary
-  } = useQuery<string>({
-    queryKey: ['trackedRepos', 'summary', refreshDays],
-    queryFn: () => fetchTrackedReposSummaryOnly(refreshDays),
-    enabled: tabValue === 1,
-    refetchOnWindowFocus: false,
-    staleTime: 5 * 60 * 1000
-  } as UseQueryOptions<string>)
+  // 已追踪仓库总结通过 SSE 逐段获取，有新动态时重新获取
+  const [trackedSummaryVersion, setTrackedSummaryVersion] = useState(0)
+  React.useEffect(() => {
+    if (tabValue !== 1) return
+    setTrackedReposSummary('')
+    return streamTrackedReposSummary(refreshDays, {
+      onSummary: (chunk) => setTrackedReposSummary((summary) => summary + chunk),
+      onError: (detail) => setMessage('获取已追踪项目总结失败：' + detail)
+    })
+  }, [tabValue, refreshDays, trackedSummaryVersion])
 
   // 获取定时任务列表的查询
   const { 
@@ -194,6 +201,15 @@ function MainContent() {
     staleTime: 5 * 60 * 1000
   } as UseQueryOptions<ScheduledTask[]>);
 
+  // 订阅新动态推送，有更新时刷新已追踪仓库数据
+  React.useEffect(() => {
+    return subscribeActivityUpdates((delta) => {
+      queryClient.invalidateQueries({ queryKey: ['trackedRepos'] })
+      setTrackedSummaryVersion((version) => version + 1)
+      setMessage(`${delta.repo} 有 ${delta.new_events} 条新动态`)
+    })
+  }, [])
+
   // 当定时任务数据变化时更新状态
   React.useEffect(() => {
     console.log('获取到的定时任务数据:', scheduledTasksData);
@@ -599,7 +615,7 @@ function MainContent() {
           </Typography>
 
           {/* 添加已追踪项目总结卡片 */}
-          {trackedReposSummaryData && (
+          {trackedReposSummary && (
             <Card sx={{ mb: 3 }}>
               <CardContent>
                 <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', mb: 2 }}>
@@ -617,7 +633,7 @@ function MainContent() {
                   </Button>
                 </Box>
                 <Typography variant="body1" component="div" sx={{ whiteSpace: 'pre-line' }}>
-                  {trackedReposSummaryData}
+                  {trackedReposSummary}
                 </Typography>
               </CardContent>
             </Card>
@@ -210,6 +210,39 @@ export async function getHotRepos(shouldTranslate: boolean = false): Promise<Hot
   return response.json()
 }
 
+export interface SummaryStreamHandlers<T> {
+  onRepos?: (repos: T) => void;
+  onSummary: (chunk: string) => void;
+  onDone?: () => void;
+  onError: (detail: string) => void;
+}
+
+// 通过 SSE 获取仓库列表和逐段生成的总结，返回关闭连接的函数，关闭后服务端停止生成
+function streamSummary<T>(url: string, handlers: SummaryStreamHandlers<T>): () => void {
+  const source = new EventSource(url)
+  source.addEventListener('repos', (event) => handlers.onRepos?.(JSON.parse((event as MessageEvent).data)))
+  source.addEventListener('summary', (event) => handlers.onSummary(JSON.parse((event as MessageEvent).data)))
+  source.addEventListener('done', () => {
+    source.close()
+    handlers.onDone?.()
+  })
+  // 服务端发送的 error 事件带有错误详情，连接失败时没有数据；两种情况都不自动重连
+  source.addEventListener('error', (event) => {
+    source.close()
+    const data = (event as MessageEvent).data
+    handlers.onError(data ? JSON.parse(data).detail : '连接中断')
+  })
+  return () => source.close()
+}
+
+export function streamHotRepos(shouldTranslate: boolean, handlers: SummaryStreamHandlers<Repo[]>): () => void {
+  return streamSummary(`${API_BASE_URL}/api/hot-repos/stream?should_translate=${shouldTranslate}`, handlers)
+}
+
+export function streamTrackedReposSummary(days: number, handlers: SummaryStreamHandlers<TrackedRepo[]>): () => void {
+  return streamSummary(`${API_BASE_URL}/api/tracked-repos-summary/stream?days=${days}`, handlers)
+}
+
 export async function refreshHotRepos(shouldTranslate: boolean = false): Promise<HotReposResponse> {
   const response = await fetch(`${API_BASE_URL}/api/hot-repos/refresh?should_translate=${shouldTranslate}`, {
     method: 'POST'
@@ -218,4 +251,36 @@ export async function refreshHotRepos(shouldTranslate: boolean = false): Promise
     throw new Error('Failed to refresh hot repos')
   }
   return response.json()
-}
\ No newline at end of file
+}
+export interface ActivityDelta {
+  type: 'activity';
+  repo: string;
+  new_events: number;
+  counts: Record<string, number>;
+  timestamp: string;
+}
+
+// 订阅已追踪仓库的新动态推送，返回取消订阅的函数
+export function subscribeActivityUpdates(onDelta: (delta: ActivityDelta) => void): () => void {
+  let socket: WebSocket | null = null
+  let retryTimer: ReturnType<typeof setTimeout> | undefined
+  let closed = false
+
+  const connect = () => {
+    socket = new WebSocket(`${API_BASE_URL.replace(/^http/, 'ws')}/ws/activities`)
+    socket.onmessage = (event) => onDelta(JSON.parse(event.data))
+    socket.onclose = () => {
+      // 连接断开后自动重连
+      if (!closed) {
+        retryTimer = setTimeout(connect, 5000)
+      }
+    }
+  }
+
+  connect()
+  return () => {
+    closed = true
+    clearTimeout(retryTimer)
+    socket?.close()
+  }
+}
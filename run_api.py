@@ -1,10 +1,32 @@
+import os
+import argparse
 import uvicorn
-from src.api_server import app
+
+def main():
+    """启动 API 服务"""
+    parser = argparse.ArgumentParser(description="启动 GitHub Tracker API 服务")
+    parser.add_argument("--prod", action="store_true", help="生产模式：关闭热重载并启动多个工作进程")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", os.cpu_count() or 1)),
+                        help="生产模式下的工作进程数，默认为 CPU 核数")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    if args.prod:
+        # 多个工作进程中只有一个会当选为调度主进程，定时任务和邮件不会重复执行
+        uvicorn.run(
+            "src.api_server:app",
+            host=args.host,
+            port=args.port,
+            workers=args.workers
+        )
+    else:
+        uvicorn.run(
+            "src.api_server:app",
+            host=args.host,
+            port=args.port,
+            reload=True  # 开发模式下启用热重载
+        )
 
 if __name__ == "__main__":
-    uvicorn.run(
-        "src.api_server:app",
-        host="0.0.0.0",
-        port=8000,
-        reload=True  # 开发模式下启用热重载
-    ) 
\ No newline at end of file
+    main()
@@ -0,0 +1,118 @@
+"""LLM 调用的单次额外开销基准
+
+用法:
+    python scripts/bench_llm_overhead.py [--calls 200]
+
+不访问真实模型，分别对比改造前后三部分开销：
+1. 提示词模板：每次读文件 vs 模板注册表
+2. 智谱AI客户端：每次新建客户端 vs 复用客户端
+3. Ollama：每次新建 ClientSession vs 复用连接池（请求发往本地模拟服务）
+"""
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+import yaml
+from aiohttp import web, ClientSession
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+
+from src.llm.prompt_registry import prompt_registry  # noqa: E402
+from src.llm.ollama_client import OllamaAI  # noqa: E402
+
+def report(name: str, before: float, after: float, calls: int) -> None:
+    """打印单次调用的平均耗时"""
+    before_us = before / calls * 1e6
+    after_us = after / calls * 1e6
+    print(f"{name:<12} 改造前 {before_us:>9.1f} us/次   改造后 {after_us:>9.1f} us/次   "
+          f"节省 {before_us - after_us:>9.1f} us/次")
+
+def bench_prompt(calls: int) -> None:
+    template_path = BASE_DIR / "src" / "prompt_engineering" / "translate.txt"
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        with open(template_path, 'r', encoding='utf-8') as f:
+            f.read().strip()
+    before = time.perf_counter() - start
+
+    prompt_registry.get("translate")
+    start = time.perf_counter()
+    for _ in range(calls):
+        prompt_registry.get("translate")
+    after = time.perf_counter() - start
+    report("提示词模板", before, after, calls)
+
+def bench_zhipu(calls: int) -> None:
+    try:
+        from zhipuai import ZhipuAI
+    except ImportError:
+        print("智谱AI      未安装 zhipuai，跳过")
+        return
+
+    start = time.perf_counter()
+    for _ in range(calls):
+        ZhipuAI(api_key="bench.key").close()
+    before = time.perf_counter() - start
+
+    client = ZhipuAI(api_key="bench.key")
+    start = time.perf_counter()
+    for _ in range(calls):
+        client.chat.completions
+    after = time.perf_counter() - start
+    client.close()
+    report("智谱AI客户端", before, after, calls)
+
+async def bench_ollama(calls: int) -> None:
+    async def generate(request):
+        await request.json()
+        return web.json_response({"response": "ok"})
+
+    app = web.Application()
+    app.router.add_post("/api/generate", generate)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / "model_config.yaml"
+        with open(config_path, 'w', encoding='utf-8') as f:
+            yaml.safe_dump({"llm": {"ollama": {"base_url": base_url, "model": "bench"}}}, f)
+        llm = OllamaAI(config_path)
+
+        payload = {"model": "bench", "prompt": "hi", "stream": False}
+        start = time.perf_counter()
+        for _ in range(calls):
+            async with ClientSession() as session:
+                async with session.post(f"{base_url}/api/generate", json=payload) as response:
+                    await response.json()
+        before = time.perf_counter() - start
+
+        await llm._call_model("hi")
+        start = time.perf_counter()
+        for _ in range(calls):
+            await llm._call_model("hi")
+        after = time.perf_counter() - start
+        await llm.close()
+
+    await runner.cleanup()
+    report("Ollama会话", before, after, calls)
+
+def main():
+    parser = argparse.ArgumentParser(description="测量 LLM 调用的单次额外开销")
+    parser.add_argument('--calls', type=int, default=200, help='每项测量的调用次数')
+    args = parser.parse_args()
+
+    bench_prompt(args.calls)
+    bench_zhipu(args.calls)
+    asyncio.run(bench_ollama(args.calls))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+"""应用启动耗时基准
+
+用法:
+    python scripts/bench_startup.py [--runs 5] [--top 15]
+
+分别测量导入 src.api_server 的冷启动耗时、首次构建全部服务的耗时，
+并通过 ``python -X importtime`` 列出累计耗时最高的模块。
+"""
+import os
+import sys
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = """
+import time
+t = time.perf_counter()
+import src.api_server as api
+t_import = time.perf_counter() - t
+t = time.perf_counter()
+for name in ('github_tracker', 'repo_tracker', 'mail_service', 'summary_service'):
+    getattr(api.services, name)
+t_services = time.perf_counter() - t
+print(f"{t_import:.6f} {t_services:.6f}")
+"""
+
+def _env() -> dict:
+    env = dict(os.environ)
+    env.setdefault('GITHUB_TOKEN', 'bench-token')
+    return env
+
+def measure_runs(runs: int):
+    """在独立进程中多次测量冷启动耗时"""
+    import_times, service_times = [], []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', IMPORT_SNIPPET],
+            cwd=BASE_DIR, env=_env(), capture_output=True, text=True, check=True
+        ).stdout.strip().splitlines()[-1]
+        t_import, t_services = map(float, output.split())
+        import_times.append(t_import)
+        service_times.append(t_services)
+    return import_times, service_times
+
+def import_profile(top: int):
+    """使用 -X importtime 获取各模块的导入耗时"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', 'import src.api_server'],
+        cwd=BASE_DIR, env=_env(), capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, module = line[len('import time:'):].split('|')
+        rows.append((int(cumulative_us), int(self_us), module.rstrip()))
+
+    rows.sort(reverse=True)
+    return rows[:top]
+
+def main():
+    parser = argparse.ArgumentParser(description="测量 API 服务的启动耗时")
+    parser.add_argument('--runs', type=int, default=5, help='冷启动测量次数')
+    parser.add_argument('--top', type=int, default=15, help='显示耗时最高的模块数')
+    args = parser.parse_args()
+
+    import_times, service_times = measure_runs(args.runs)
+    print(f"=== 冷启动耗时（{args.runs} 次）===")
+    print(f"导入 src.api_server: 中位数 {statistics.median(import_times) * 1000:.1f} ms, "
+          f"最小 {min(import_times) * 1000:.1f} ms")
+    print(f"首次构建全部服务:     中位数 {statistics.median(service_times) * 1000:.1f} ms, "
+          f"最小 {min(service_times) * 1000:.1f} ms")
+
+    print(f"\n=== 导入耗时最高的 {args.top} 个模块 ===")
+    print(f"{'累计(ms)':>10} {'自身(ms)':>10}  模块")
+    for cumulative_us, self_us, module in import_profile(args.top):
+        print(f"{cumulative_us / 1000:>10.1f} {self_us / 1000:>10.1f}  {module}")
+
+if __name__ == '__main__':
+    main()
@@ -1,5 +1,15 @@
-from .github_tracker import GitHubTracker
-from .scheduler import ScheduleManager
-from .date_handler import DateHandler
+import importlib
 
-__all__ = ['GitHubTracker', 'ScheduleManager', 'DateHandler'] 
\ No newline at end of file
+__all__ = ['GitHubTracker', 'ScheduleManager', 'DateHandler']
+
+# 按需导入子模块，导入 src.api_server 时不会连带加载 PyGithub、schedule 等依赖
+_lazy_exports = {
+    'GitHubTracker': '.github_tracker',
+    'ScheduleManager': '.scheduler',
+    'DateHandler': '.date_handler',
+}
+
+def __getattr__(name):
+    if name in _lazy_exports:
+        return getattr(importlib.import_module(_lazy_exports[name], __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,27 +1,28 @@
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request, Response, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
 from pathlib import Path
-import os
 from dotenv import load_dotenv
-from .github_tracker import GitHubTracker
-from .repo_activity_tracker import RepoActivityTracker
 import json
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, AsyncIterator, Tuple
 from pydantic import BaseModel, EmailStr
 from datetime import datetime, timedelta
-from apscheduler.schedulers.background import BackgroundScheduler
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from apscheduler.jobstores.base import JobLookupError
 from apscheduler.triggers.cron import CronTrigger
-from dateutil import parser
+from apscheduler.triggers.interval import IntervalTrigger
+from apscheduler.util import obj_to_ref
+from functools import lru_cache
 from .date_handler import DateHandler
 import logging 
 import uuid
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
-import zhipuai  # 导入智谱AI SDK
 import asyncio
-from .mail.mail_service import MailService
-from .llm.summary_service import SummaryService
+from .container import ServiceContainer
+from .utils.response_cache import ResponseCache
+from .utils.leader_election import LeaderElector
+from .utils.activity_broadcaster import ActivityBroadcaster
+from .llm.llm_metrics import llm_metrics, llm_call_site
+from .utils.job_run_log import JOB_EVENTS
 
 # 配置日志
 logging.basicConfig(level=logging.INFO)
@@ -29,9 +30,6 @@ logging.basicConfig(level=logging.INFO)
 # 加载环境变量
 load_dotenv()
 
-# 初始化定时任务调度器
-scheduler = BackgroundScheduler()
-
 app = FastAPI(title="GitHub Tracker API")
 
 # 配置 CORS
@@ -44,20 +42,71 @@ app.add_middleware(
     expose_headers=["*"]  # 允许浏览器访问的响应头
 )
 
+@app.middleware("http")
+async def tag_llm_call_site(request: Request, call_next):
+    """以接口路径标记请求处理期间的 LLM 调用来源"""
+    if not request.url.path.startswith("/api/"):
+        return await call_next(request)
+    with llm_call_site(request.url.path):
+        return await call_next(request)
+
 # 获取项目根目录
 base_dir = Path(__file__).parent.parent
-github_token = os.getenv('GITHUB_TOKEN')
 
-if not github_token:
-    raise ValueError("请设置 GITHUB_TOKEN 环境变量")
+# 追踪器和各项服务在首次使用时才创建
+services = ServiceContainer(base_dir)
+
+# 定时任务调度器只在当选的主进程中创建，非主进程不需要加载任务库
+SCHEDULER_DB_URL = f"sqlite:///{base_dir / 'data' / 'scheduler_jobs.sqlite3'}"
+scheduler: Optional[AsyncIOScheduler] = None
+
+def build_scheduler() -> AsyncIOScheduler:
+    """
+    创建定时任务调度器
+    
+    任务保存在 SQLite 中，重启后保留下一次运行时间，停机期间错过的任务按各类任务的策略补跑；
+    协程任务直接在应用的事件循环中运行，阻塞型任务在单独的有界线程池中运行。
+    """
+    from apscheduler.executors.asyncio import AsyncIOExecutor
+    from apscheduler.executors.pool import ThreadPoolExecutor
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+    return AsyncIOScheduler(
+        jobstores={'default': SQLAlchemyJobStore(url=SCHEDULER_DB_URL)},
+        executors={
+            'default': AsyncIOExecutor(),
+            'blocking': ThreadPoolExecutor(services.scheduler_config.get('blocking_workers', 4))
+        }
+    )
+
+def scheduler_running() -> bool:
+    """当前进程的调度器是否已启动（只有主进程会启动调度器）"""
+    return scheduler is not None and scheduler.running
+
+# 未在配置中指定时各类定时任务的执行策略
+DEFAULT_JOB_POLICY = {"misfire_grace_time": 3600, "coalesce": True, "max_instances": 1}
+
+# 热点读接口的响应缓存，由对应的写操作负责失效；失效通过共享版本号同步到所有工作进程
+response_cache = ResponseCache(generations_path=base_dir / "data" / "response_cache.sqlite3")
+HOT_REPOS_CACHE_TTL = 1800  # 热门项目变化较慢，缓存30分钟
+HOT_REPOS_FAILURE_TTL = 60  # 获取或总结失败的结果只缓存1分钟，既能尽快重试又不会在限流时反复请求
+TRACKED_REPOS_CACHE_TTL = 300  # has_updates 依赖当前时间，缓存5分钟
 
-# 初始化追踪器
-github_tracker = GitHubTracker(github_token, base_dir)
-repo_tracker = RepoActivityTracker(github_token, base_dir)
+def hot_repos_ttl(hot_repos: Dict[str, Any]) -> float:
+    """热门项目结果的缓存时间，仓库列表为空或总结生成失败时缩短"""
+    if not hot_repos["repos"] or hot_repos["summary"] == services.summary_service.ERROR_SUMMARY:
+        return HOT_REPOS_FAILURE_TTL
+    return HOT_REPOS_CACHE_TTL
 
-# 初始化服务
-mail_service = MailService()
-summary_service = SummaryService(base_dir / "config" / "model_config.yaml")
+def invalidate_tracked_repos(delta: Dict[str, Any]) -> None:
+    """仓库有新动态时使已追踪仓库列表的缓存失效"""
+    response_cache.invalidate("tracked-repos")
+
+# 仓库新动态通过 WebSocket 推送给前端，写入活动数据时产生增量消息
+# 消息经 SQLite 分发到所有工作进程，连接在任一进程上的客户端都能收到
+activity_broadcaster = ActivityBroadcaster(db_path=base_dir / "data" / "activity_events.sqlite3")
+# 先使缓存失效再推送，前端收到消息后重新请求时不会拿到旧数据
+services.activity_listeners.append(invalidate_tracked_repos)
+services.activity_listeners.append(activity_broadcaster.publish)
 
 class RepoTrackRequest(BaseModel):
     repo_full_name: str
@@ -74,8 +123,80 @@ class ScheduledTask(ScheduledTaskRequest):
     id: str
     created_at: datetime
 
+async def build_hot_repos(should_translate: bool = False) -> Dict[str, Any]:
+    """
+    获取热门仓库列表并生成总结
+    
+    Args:
+        should_translate: 是否翻译仓库名称和描述，默认为False
+    """
+    print("开始获取热门仓库...")  # 添加调试日志
+    repos = await services.github_tracker.get_trending_repositories(should_translate=should_translate)
+    print(f"获取到 {len(repos)} 个仓库")  # 添加调试日志
+    
+    # 生成总结
+    summary = await services.summary_service.generate_hot_repos_summary(repos)
+    
+    return {
+        "repos": format_hot_repos(repos),
+        "summary": summary
+    }
+
+def format_hot_repos(repos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """转换热门仓库数据格式以匹配前端需求"""
+    formatted_repos = []
+    for repo in repos:
+        formatted_repos.append({
+            "name": repo["name"].split("/")[-1],  # 从 full_name 中提取仓库名
+            "full_name": repo["name"],
+            "description": repo["description"],
+            "description_zh": repo.get("description_zh", ""),
+            "name_zh": repo.get("name_zh", ""),
+            "stars": repo["stars"],
+            "forks": repo["forks"],
+            "updated_at": repo["updated_at"].isoformat(),
+            "url": repo["url"],
+            "similar": repo.get("similar", [])  # 被合并的近似重复仓库
+        })
+    return formatted_repos
+
+def sse_event(event: str, data: Any) -> str:
+    """编码一条 Server-Sent Events 消息"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+def sse_response(events: AsyncIterator[str]) -> StreamingResponse:
+    """以 text/event-stream 返回事件流"""
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.get("/api/hot-repos/stream")
+async def stream_hot_repos(should_translate: bool = False) -> StreamingResponse:
+    """
+    以 SSE 返回热门仓库列表和流式生成的总结
+    
+    先发送 repos 事件（仓库列表），随后逐段发送 summary 事件（总结片段），最后发送 done 事件。
+    
+    Args:
+        should_translate: 是否翻译仓库名称和描述，默认为False
+    """
+    async def events():
+        try:
+            repos = await services.github_tracker.get_trending_repositories(should_translate=should_translate)
+            yield sse_event("repos", format_hot_repos(repos))
+            async for chunk in services.summary_service.stream_hot_repos_summary(repos):
+                yield sse_event("summary", chunk)
+            yield sse_event("done", {})
+        except Exception as e:
+            logging.error(f"流式获取热门仓库时出错: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+            
+    return sse_response(events())
+
 @app.get("/api/hot-repos")
-async def get_hot_repos(should_translate: bool = False) -> Dict[str, Any]:
+async def get_hot_repos(request: Request, should_translate: bool = False) -> Response:
     """
     获取热门仓库列表和总结
     
@@ -83,161 +204,325 @@ async def get_hot_repos(should_translate: bool = False) -> Dict[str, Any]:
         should_translate: 是否翻译仓库名称和描述，默认为False
     """
     try:
-        print("开始获取热门仓库...")  # 添加调试日志
-        repos = github_tracker.get_trending_repositories(should_translate=should_translate)
-        print(f"获取到 {len(repos)} 个仓库")  # 添加调试日志
-        
-        # 生成总结
-        summary = await summary_service.generate_hot_repos_summary(repos)
-        
-        # 转换数据格式以匹配前端需求
-        formatted_repos = []
-        for repo in repos:
-            formatted_repos.append({
-                "name": repo["name"].split("/")[-1],  # 从 full_name 中提取仓库名
-                "full_name": repo["name"],
-                "description": repo["description"],
-                "description_zh": repo.get("description_zh", ""),
-                "name_zh": repo.get("name_zh", ""),
-                "stars": repo["stars"],
-                "forks": repo["forks"],
-                "updated_at": repo["updated_at"].isoformat(),
-                "url": repo["url"]
-            })
-        print(f"返回格式化后的仓库数据: {formatted_repos}")  # 添加调试日志
-        
-        return {
-            "repos": formatted_repos,
-            "summary": summary
-        }
+        return await response_cache.respond(
+            request,
+            f"hot-repos:translate={should_translate}",
+            lambda: build_hot_repos(should_translate),
+            ttl=hot_repos_ttl
+        )
     except Exception as e:
         print(f"获取热门仓库时出错: {str(e)}")  # 添加错误日志
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/translation-cache/stats")
+async def get_translation_cache_stats() -> Dict[str, Any]:
+    """获取翻译缓存的条目数和命中率"""
+    cache = services.llm.translation_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/api/llm/result-cache/stats")
+async def get_llm_result_cache_stats() -> Dict[str, Any]:
+    """获取模型结果缓存的条目数和命中率"""
+    cache = services.llm.result_cache
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/api/llm/metrics")
+async def get_llm_metrics() -> Dict[str, Any]:
+    """按调用来源、服务和模型汇总 LLM 调用的次数、token 数、延迟、重试和费用（当前进程）"""
+    rows = llm_metrics.snapshot()
+    return {
+        "totals": {
+            "calls": sum(row["calls"] for row in rows),
+            "errors": sum(row["errors"] for row in rows),
+            "prompt_tokens": sum(row["prompt_tokens"] for row in rows),
+            "completion_tokens": sum(row["completion_tokens"] for row in rows),
+            "latency_total_s": round(sum(row["latency_total_s"] for row in rows), 3),
+            "cost": round(sum(row["cost"] for row in rows), 6),
+        },
+        "by_site": rows
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_prometheus_metrics() -> str:
+    """以 Prometheus 文本格式导出 LLM 调用统计和发件队列深度"""
+    stats = await asyncio.to_thread(services.mail_queue.stats)
+    lines = ["# HELP mail_queue_messages 发件队列中各状态的邮件数", "# TYPE mail_queue_messages gauge"]
+    lines += [f'mail_queue_messages{{status="{status}"}} {stats[status]}' for status in ("pending", "sending", "dead")]
+    lines += [
+        "# HELP mail_queue_oldest_due_age_seconds 最早待发邮件的等待时间",
+        "# TYPE mail_queue_oldest_due_age_seconds gauge",
+        f"mail_queue_oldest_due_age_seconds {stats['oldest_due_age_seconds']}",
+    ]
+    return llm_metrics.prometheus() + "\n".join(lines) + "\n"
+
+@app.get("/api/mail/queue")
+async def get_mail_queue(dead_limit: int = 20) -> Dict[str, Any]:
+    """获取发件队列深度和最近的死信"""
+    queue = services.mail_queue
+    return {
+        **await asyncio.to_thread(queue.stats),
+        "dead_letters": await asyncio.to_thread(queue.dead_letters, dead_limit)
+    }
+
+@app.post("/api/mail/queue/{message_id}/retry")
+async def retry_dead_letter(message_id: int) -> Dict[str, Any]:
+    """将死信重新放回发件队列"""
+    if not await asyncio.to_thread(services.mail_queue.requeue, message_id):
+        raise HTTPException(status_code=404, detail=f"Dead letter {message_id} not found")
+    services.mail_worker.wake()
+    return {"message": f"Message {message_id} requeued"}
+
+def read_persisted_jobs() -> List[Any]:
+    """非调度主进程直接读取任务库中的任务"""
+    from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+    store = SQLAlchemyJobStore(url=SCHEDULER_DB_URL)
+    store.start(AsyncIOScheduler(), 'default')
+    try:
+        return store.get_all_jobs()
+    finally:
+        store.shutdown()
+
+@app.get("/api/scheduler/jobs")
+async def get_scheduler_jobs() -> Dict[str, Any]:
+    """获取定时任务的下一次运行时间、执行策略和最近一次运行的耗时"""
+    jobs = scheduler.get_jobs() if scheduler_running() else await asyncio.to_thread(read_persisted_jobs)
+    return {
+        "leader": leader_elector.is_leader,
+        "jobs": [
+            {
+                "id": job.id,
+                "func": job.func_ref,
+                "trigger": str(job.trigger),
+                "next_run_time": job.next_run_time.isoformat() if job.next_run_time else None,
+                "misfire_grace_time": job.misfire_grace_time,
+                "coalesce": job.coalesce,
+                "max_instances": job.max_instances,
+                "last_run": services.job_run_log.get(job.id)
+            }
+            for job in jobs
+        ]
+    }
+
+@app.get("/api/polling/plan")
+async def get_polling_plan() -> Dict[str, Any]:
+    """获取每个追踪仓库的事件速率、轮询间隔和下一次轮询时间"""
+    plan = await asyncio.to_thread(services.polling_planner.plan)
+    return {
+        "repos": [
+            {
+                **entry,
+                "last_polled": datetime.fromtimestamp(entry["last_polled"]).isoformat() if entry["last_polled"] else None,
+                "next_poll": datetime.fromtimestamp(entry["next_poll"]).isoformat()
+            }
+            for entry in plan
+        ]
+    }
+
+@app.get("/api/llm/providers")
+async def get_llm_providers() -> Dict[str, Any]:
+    """获取各LLM服务的 p50/p95 延迟、错误率和可用状态"""
+    return services.llm.provider_stats()
+
+@app.get("/api/similar-repos")
+async def get_similar_repos(repo: Optional[str] = None, q: Optional[str] = None, k: int = 5) -> Dict[str, Any]:
+    """
+    在本地向量索引中检索相似仓库，不消耗 GitHub 搜索配额
+    
+    Args:
+        repo: 仓库全名，检索与其相似的仓库
+        q: 查询文本，未提供 repo 时按文本检索
+        k: 返回数量
+    """
+    index = services.vector_index
+    if index is None:
+        raise HTTPException(status_code=404, detail="仓库向量索引未开启")
+    if not repo and not q:
+        raise HTTPException(status_code=400, detail="请提供 repo 或 q 参数")
+    k = max(1, min(k, 50))
+    
+    def lookup() -> List[Any]:
+        if not repo:
+            return index.search(q, k)
+        results = index.similar_to(repo, k)
+        if results is None:
+            # 仓库尚未收录时获取一次详情并加入索引，获取失败（仓库不存在或限流）时不收录
+            details = services.github_tracker.fetch_repository_details(repo)
+            if details is None:
+                raise HTTPException(status_code=404, detail=f"无法获取仓库 {repo} 的详情")
+            index.upsert([details])
+            results = index.similar_to(details["full_name"], k) or []
+        return results
+        
+    # 向量计算和 GitHub 请求都是阻塞操作，在线程池中执行
+    results = await asyncio.to_thread(lookup)
+        
+    return {
+        "query": repo or q,
+        "results": [{**item, "score": round(score, 4)} for item, score in results]
+    }
+
 @app.get("/api/tracked-repos")
-async def get_tracked_repos(days: int = 1) -> List[Dict[str, Any]]:
+async def get_tracked_repos(request: Request, days: int = 1) -> Response:
     """获取已追踪的仓库列表
     
     Args:
         days: 获取最近几天的活动，默认为1天
     """
     try:
-        # 从配置文件读取追踪的仓库
-        config_file = base_dir / "config" / "tracked_repos.json"
-        if not config_file.exists():
-            return []
-            
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            
-        # 获取每个仓库的最新活动
-        tracked_repos = []
-        activity_dir = base_dir / "data" / "repo_activities"
-        
-        for repo in config.get('repositories', []):
-            repo_full_name = repo['full_name']
-            
-            # 获取仓库详情信息
-            repo_details = github_tracker.get_repository_details(repo_full_name)
-            
-            # 查找该仓库的最新活动文件
-            repo_files = list(activity_dir.glob(f"{repo_full_name.replace('/', '_')}*.json"))
-            repo_files.sort(reverse=True)  # 最新的文件排在前面
-            
-            repo_data = {
-                "full_name": repo_full_name,  # 仓库的完整名称
-                "name": repo_details.get("name", repo_full_name.split("/")[-1]),  # 仓库名称
-                "description": repo_details.get("description", ""),  # 仓库描述
-                "stars": repo_details.get("stars", 0),  # 星标数量
-                "forks": repo_details.get("forks", 0),  # Fork 数量
-                "updated_at": repo_details.get("updated_at", ""),  # 最后更新时间
-                "has_updates": False,  # 是否有更新
-                "last_updated": "",  # 最后更新的时间
-                "activities": []  # 活动列表
-            }
-            
-            if repo_files:
-                try:
-                    with open(repo_files[0], 'r', encoding='utf-8') as f:
-                        activity_data = json.load(f)
-                        
-                    # 更新仓库信息
-                    repo_data["last_updated"] = activity_data.get("timestamp", "")
-                    
-                    # 检查是否有未读更新（根据传入的days参数）
-                    recent_time = DateHandler.get_recent_time(days)  # datetime.now() - timedelta(days=days)
-                    logging.info(f"{days}天前的日期: {recent_time.strftime('%Y-%m-%d %H:%M:%S')}")
-                    
-                    # 处理提交
-                    activities = []
-                    for commit in activity_data.get("activities", {}).get("commits", []):
-                        commit_date = DateHandler.parse(commit["date"]) #parser.isoparse(commit["date"])
-                        logging.info(f"commit 日期: {commit_date.strftime('%Y-%m-%d %H:%M:%S')}")
-                        activities.append({
-                            "type": "Commit",
-                            "title": commit["message"].split("\n")[0],
-                            "created_at": commit["date"],
-                            "description": f"作者: {commit['author']}",
-                            "url": commit.get("url", "")
-                        })
-                        if commit_date > recent_time:
-                            repo_data["has_updates"] = True
-                    
-                    # 处理议题
-                    for issue in activity_data.get("activities", {}).get("issues", []):
-                        issue_date = DateHandler.parse(issue["updated_at"]) #parser.isoparse(issue["updated_at"])
-                        logging.info(f"issue 日期: {issue_date.strftime('%Y-%m-%d %H:%M:%S')}")
-                        activities.append({
-                            "type": "Issue",
-                            "title": issue["title"],
-                            "created_at": issue["updated_at"],
-                            "description": f"状态: {issue['state']}",
-                            "url": issue.get("url", "")
-                        })
-                        if issue_date > recent_time:
-                            repo_data["has_updates"] = True
-                    
-                    # 处理PR
-                    for pr in activity_data.get("activities", {}).get("pull_requests", []):
-                        pr_date = DateHandler.parse(pr["updated_at"]) #parser.isoparse(pr["updated_at"])
-                        logging.info(f"pr 日期: {pr_date.strftime('%Y-%m-%d %H:%M:%S')}")
-                        activities.append({
-                            "type": "Pull Request",
-                            "title": pr["title"],
-                            "created_at": pr["updated_at"],
-                            "description": f"状态: {pr['state']}",
-                            "url": pr.get("url", "")
-                        })
-                        if pr_date > recent_time:
-                            repo_data["has_updates"] = True
-                    
-                    # 处理发布
-                    for release in activity_data.get("activities", {}).get("releases", []):
-                        release_date = DateHandler.parse(release["date"]) #parser.isoparse(release["date"])
-                        logging.info(f"release 日期: {release_date.strftime('%Y-%m-%d %H:%M:%S')}")
-                        activities.append({
-                            "type": "Release",
-                            "title": release["name"],
-                            "created_at": release["date"],
-                            "description": f"标签: {release['tag']}",
-                            "url": release.get("url", "")
-                        })
-                        if release_date > recent_time:
-                            repo_data["has_updates"] = True
-                    
-                    # 按时间排序，最新的在前
-                    activities.sort(key=lambda x: x["created_at"], reverse=True)
-                    repo_data["activities"] = activities
-                    
-                except Exception as e:
-                    print(f"处理仓库 {repo_full_name} 活动数据时出错: {str(e)}")
-            
-            tracked_repos.append(repo_data)
-            
-        return tracked_repos
+        return await response_cache.respond(
+            request,
+            f"tracked-repos:days={days}",
+            lambda: load_tracked_repos(days),
+            ttl=TRACKED_REPOS_CACHE_TTL
+        )
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+async def load_tracked_repos(days: int = 1) -> List[Dict[str, Any]]:
+    """读取已追踪的仓库列表及其最新活动，逐个仓库请求 GitHub 详情，在线程池中执行以免阻塞事件循环
+    
+    Args:
+        days: 获取最近几天的活动，默认为1天
+    """
+    return await asyncio.to_thread(read_tracked_repos, days)
+
+def read_tracked_repos(days: int = 1) -> List[Dict[str, Any]]:
+    """读取已追踪的仓库列表及其最新活动（阻塞调用）
+    
+    Args:
+        days: 获取最近几天的活动，默认为1天
+    """
+    # 从配置文件读取追踪的仓库
+    config_file = base_dir / "config" / "tracked_repos.json"
+    if not config_file.exists():
+        return []
+        
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+        
+    # 获取每个仓库的最新活动
+    tracked_repos = []
+    indexed_repos = []
+    activity_dir = base_dir / "data" / "repo_activities"
+    
+    for repo in config.get('repositories', []):
+        repo_full_name = repo['full_name']
+        
+        # 获取仓库详情信息；获取失败时只用基本信息展示，不写入索引，避免覆盖已收录的描述
+        repo_details = services.github_tracker.fetch_repository_details(repo_full_name)
+        if repo_details is not None:
+            indexed_repos.append(repo_details)
+        else:
+            repo_details = services.github_tracker.placeholder_details(repo_full_name)
+        
+        # 查找该仓库的最新活动文件
+        repo_files = list(activity_dir.glob(f"{repo_full_name.replace('/', '_')}*.json"))
+        repo_files.sort(reverse=True)  # 最新的文件排在前面
+        
+        repo_data = {
+            "full_name": repo_full_name,  # 仓库的完整名称
+            "name": repo_details.get("name", repo_full_name.split("/")[-1]),  # 仓库名称
+            "description": repo_details.get("description", ""),  # 仓库描述
+            "stars": repo_details.get("stars", 0),  # 星标数量
+            "forks": repo_details.get("forks", 0),  # Fork 数量
+            "updated_at": repo_details.get("updated_at", ""),  # 最后更新时间
+            "has_updates": False,  # 是否有更新
+            "last_updated": "",  # 最后更新的时间
+            "activities": []  # 活动列表
+        }
+        
+        if repo_files:
+            try:
+                with open(repo_files[0], 'r', encoding='utf-8') as f:
+                    activity_data = json.load(f)
+                    
+                # 更新仓库信息
+                repo_data["last_updated"] = activity_data.get("timestamp", "")
+                
+                # 检查是否有未读更新（根据传入的days参数）
+                recent_time = DateHandler.get_recent_time(days)  # datetime.now() - timedelta(days=days)
+                logging.info(f"{days}天前的日期: {recent_time.strftime('%Y-%m-%d %H:%M:%S')}")
+                
+                # 处理提交
+                activities = []
+                for commit in activity_data.get("activities", {}).get("commits", []):
+                    commit_date = DateHandler.parse(commit["date"]) #parser.isoparse(commit["date"])
+                    logging.info(f"commit 日期: {commit_date.strftime('%Y-%m-%d %H:%M:%S')}")
+                    activities.append({
+                        "type": "Commit",
+                        "title": commit["message"].split("\n")[0],
+                        "created_at": commit["date"],
+                        "description": f"作者: {commit['author']}",
+                        "url": commit.get("url", "")
+                    })
+                    if commit_date > recent_time:
+                        repo_data["has_updates"] = True
+                
+                # 处理议题
+                for issue in activity_data.get("activities", {}).get("issues", []):
+                    issue_date = DateHandler.parse(issue["updated_at"]) #parser.isoparse(issue["updated_at"])
+                    logging.info(f"issue 日期: {issue_date.strftime('%Y-%m-%d %H:%M:%S')}")
+                    activities.append({
+                        "type": "Issue",
+                        "title": issue["title"],
+                        "created_at": issue["updated_at"],
+                        "description": f"状态: {issue['state']}",
+                        "url": issue.get("url", "")
+                    })
+                    if issue_date > recent_time:
+                        repo_data["has_updates"] = True
+                
+                # 处理PR
+                for pr in activity_data.get("activities", {}).get("pull_requests", []):
+                    pr_date = DateHandler.parse(pr["updated_at"]) #parser.isoparse(pr["updated_at"])
+                    logging.info(f"pr 日期: {pr_date.strftime('%Y-%m-%d %H:%M:%S')}")
+                    activities.append({
+                        "type": "Pull Request",
+                        "title": pr["title"],
+                        "created_at": pr["updated_at"],
+                        "description": f"状态: {pr['state']}",
+                        "url": pr.get("url", "")
+                    })
+                    if pr_date > recent_time:
+                        repo_data["has_updates"] = True
+                
+                # 处理发布
+                for release in activity_data.get("activities", {}).get("releases", []):
+                    release_date = DateHandler.parse(release["date"]) #parser.isoparse(release["date"])
+                    logging.info(f"release 日期: {release_date.strftime('%Y-%m-%d %H:%M:%S')}")
+                    activities.append({
+                        "type": "Release",
+                        "title": release["name"],
+                        "created_at": release["date"],
+                        "description": f"标签: {release['tag']}",
+                        "url": release.get("url", "")
+                    })
+                    if release_date > recent_time:
+                        repo_data["has_updates"] = True
+                
+                # 按时间排序，最新的在前
+                activities.sort(key=lambda x: x["created_at"], reverse=True)
+                repo_data["activities"] = activities
+                
+            except Exception as e:
+                print(f"处理仓库 {repo_full_name} 活动数据时出错: {str(e)}")
+        
+        tracked_repos.append(repo_data)
+        
+    # 已追踪仓库也收录到向量索引，供相似仓库检索
+    index = services.vector_index
+    if index is not None and indexed_repos:
+        try:
+            index.upsert(indexed_repos)
+        except Exception as e:
+            logging.error(f"更新仓库向量索引时出错: {str(e)}")
+            
+    return tracked_repos
+
 @app.post("/api/track-repo")
 async def track_repo(request: RepoTrackRequest):
     """添加要追踪的仓库"""
@@ -267,6 +552,7 @@ async def track_repo(request: RepoTrackRequest):
             # 保存更新后的配置
             with open(config_file, 'w', encoding='utf-8') as f:
                 json.dump(config, f, ensure_ascii=False, indent=2)
+            response_cache.invalidate("tracked-repos")
                 
         return {"message": "Repository tracked successfully"}
     except Exception as e:
@@ -294,6 +580,7 @@ async def untrack_repo(request: RepoTrackRequest):
         # 保存更新后的配置
         with open(config_file, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
+        response_cache.invalidate("tracked-repos")
             
         return {"message": "Repository untracked successfully"}
     except Exception as e:
@@ -303,7 +590,8 @@ async def untrack_repo(request: RepoTrackRequest):
 async def refresh_activities():
     """刷新所有追踪仓库的活动"""
     try:
-        repo_tracker.track_all_repos()
+        services.repo_tracker.track_all_repos()
+        response_cache.invalidate("tracked-repos")
         return {"message": "Activities refreshed successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -317,7 +605,8 @@ async def refresh_activities(days: int = 7):  # 添加 days 参数，默认值
     """
     try:
         # 更新 RepoActivityTracker 中的 get_repo_activities 方法调用
-        repo_tracker.track_all_repos(days=days)  # 传递 days 参数
+        services.repo_tracker.track_all_repos(days=days)  # 传递 days 参数
+        response_cache.invalidate("tracked-repos")
         return {"message": f"Activities refreshed successfully for last {days} days"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -333,9 +622,10 @@ async def refresh_repo_activities(owner: str, repo: str, days: int = 7):
     """
     try:
         repo_full_name = f"{owner}/{repo}"
-        activities = repo_tracker.get_repo_activities(repo_full_name, days)
+        activities = services.repo_tracker.get_repo_activities(repo_full_name, days)
         if activities:
-            repo_tracker.save_activities(activities)
+            services.repo_tracker.save_activities(activities)
+            response_cache.invalidate("tracked-repos")
             return {"message": f"Activities refreshed successfully for {repo_full_name}"}
         else:
             raise HTTPException(
@@ -354,7 +644,7 @@ async def search_repos(query: str = Query(..., description="搜索关键词")) -
     """
     try:
         # 使用 GitHub API 搜索仓库
-        repos = github_tracker.search_repositories(query)
+        repos = services.github_tracker.search_repositories(query)
         
         # 转换数据格式以匹配前端需求
         formatted_repos = []
@@ -373,19 +663,22 @@ async def search_repos(query: str = Query(..., description="搜索关键词")) -
         logging.error(f"搜索仓库时出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+async def load_scheduled_task_list() -> List[Dict[str, Any]]:
+    """从配置文件读取所有定时任务"""
+    config_file = base_dir / "config" / "scheduled_tasks.json"
+    if not config_file.exists():
+        return []
+        
+    with open(config_file, 'r', encoding='utf-8') as f:
+        config = json.load(f)
+        
+    return config.get('tasks', [])
+
 @app.get("/api/scheduled-tasks")
-async def get_scheduled_tasks() -> List[Dict[str, Any]]:
+async def get_scheduled_tasks(request: Request) -> Response:
     """获取所有定时任务"""
     try:
-        # 从配置文件读取定时任务
-        config_file = base_dir / "config" / "scheduled_tasks.json"
-        if not config_file.exists():
-            return []
-            
-        with open(config_file, 'r', encoding='utf-8') as f:
-            config = json.load(f)
-            
-        return config.get('tasks', [])
+        return await response_cache.respond(request, "scheduled-tasks", load_scheduled_task_list)
     except Exception as e:
         logging.error(f"获取定时任务时出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
@@ -429,6 +722,7 @@ async def create_scheduled_task(task: ScheduledTaskRequest) -> Dict[str, Any]:
         # 保存配置
         with open(config_file, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
+        response_cache.invalidate("scheduled-tasks")
             
         # 设置定时任务
         schedule_task(new_task)
@@ -471,13 +765,18 @@ async def delete_scheduled_task(task_id: str) -> Dict[str, Any]:
         # 保存更新后的配置
         with open(config_file, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
+        response_cache.invalidate("scheduled-tasks")
             
         # 从调度器中移除任务
-        if hasattr(scheduler, 'get_job'):
+        if scheduler_running():
             job = scheduler.get_job(task_id)
             if job:
                 scheduler.remove_job(task_id)
-            
+
+        # 删除该任务的已发送事件记录和运行记录
+        services.delivery_ledger.forget(task_id)
+        services.job_run_log.forget(task_id)
+
         return {"message": "Task deleted successfully", "task_id": task_id}
     except HTTPException:
         raise
@@ -526,7 +825,7 @@ async def update_scheduled_task(task_id: str, task: ScheduledTaskRequest) -> Dic
                 task_found = True
                 
                 # 更新调度器中的任务
-                if hasattr(scheduler, 'get_job'):
+                if scheduler_running():
                     job = scheduler.get_job(task_id)
                     if job:
                         scheduler.remove_job(task_id)
@@ -544,6 +843,7 @@ async def update_scheduled_task(task_id: str, task: ScheduledTaskRequest) -> Dic
         # 保存更新后的配置
         with open(config_file, 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=2)
+        response_cache.invalidate("scheduled-tasks")
             
         return updated_task
     except HTTPException:
@@ -588,150 +888,163 @@ async def execute_scheduled_task(task_id: str) -> Dict[str, Any]:
         raise HTTPException(status_code=500, detail=str(e))
 
 async def execute_task(task: Dict[str, Any]):
-    """执行定时任务"""
+    """立即执行定时任务"""
     try:
-        # 获取任务所需的信息
-        email = task['email']
-        repositories = task['repositories']
-        
-        logging.info(f"开始执行定时任务: 任务ID={task.get('id')}, 邮箱={email}")
-        logging.info(f"需要检查的仓库列表: {repositories}")
+        logging.info(f"开始执行定时任务: 任务ID={task.get('id')}, 邮箱={task['email']}")
+        logging.info(f"需要检查的仓库列表: {task['repositories']}")
         
-        # 收集仓库更新信息
-        updates = []
-        for repo_full_name in repositories:
-            try:
-                logging.info(f"正在获取仓库 {repo_full_name} 的活动信息...")
-                # 获取仓库活动
-                activities = repo_tracker.get_repo_activities(repo_full_name, days=7)
-                if activities and 'activities' in activities:
-                    repo_activities = activities['activities']
-                    
-                    # 检查是否有更新
-                    has_commits = bool(repo_activities.get('commits'))
-                    has_issues = bool(repo_activities.get('issues'))
-                    has_prs = bool(repo_activities.get('pull_requests'))
-                    has_releases = bool(repo_activities.get('releases'))
-                    
-                    if has_commits or has_issues or has_prs or has_releases:
-                        logging.info(f"仓库 {repo_full_name} 有更新，获取详细信息...")
-                        # 获取仓库详情
-                        repo_details = github_tracker.get_repository_details(repo_full_name)
-                        
-                        # 添加到更新列表
-                        updates.append({
-                            'repo': repo_details,
-                            'activities': repo_activities
-                        })
-                        logging.info(f"已添加仓库 {repo_full_name} 的更新信息到列表")
-                    else:
-                        logging.info(f"仓库 {repo_full_name} 没有新的活动")
-                else:
-                    logging.warning(f"仓库 {repo_full_name} 未获取到活动信息")
-            except Exception as e:
-                logging.error(f"获取仓库 {repo_full_name} 更新时出错: {str(e)}")
-                
-        # 如果有更新，发送邮件
-        if updates:
-            logging.info(f"共有 {len(updates)} 个仓库有更新，准备发送邮件...")
-            mail_service.send_repo_updates(email, updates)
-            logging.info(f"已向 {email} 发送仓库更新邮件")
+        # 与定时投递走同一流程：抓取订阅的仓库、构建邮件并加入发件队列
+        delivered = await services.delivery_dispatcher.dispatch([task])
+        if delivered.get(task['id']):
+            logging.info(f"共有 {delivered[task['id']]} 个仓库有更新，已将发给 {task['email']} 的邮件加入发件队列")
         else:
             logging.info(f"没有仓库更新，不发送邮件")
     except Exception as e:
         logging.error(f"执行定时任务时出错: {str(e)}")
         raise
 
+def job_policy(kind: str) -> Dict[str, Any]:
+    """
+    获取某类定时任务的执行策略
+    
+    Args:
+        kind: 任务类型（repo_updates、daily_summary、polling、sync_tasks、prefetch）
+        
+    Returns:
+        Dict[str, Any]: misfire_grace_time、coalesce 和 max_instances
+    """
+    policies = services.scheduler_config.get('policies', {})
+    return {**DEFAULT_JOB_POLICY, **(policies.get(kind) or {})}
+
+@lru_cache(maxsize=256)
+def build_trigger(frequency: str, execute_time: str, weekday: Optional[str], month_day: Optional[str]) -> CronTrigger:
+    """
+    根据任务频率和执行时间构建触发器，相同的配置只解析一次
+    
+    Args:
+        frequency: daily、weekly 或 monthly
+        execute_time: 执行时间，格式为 HH:MM
+        weekday: 星期几 (1-7，1代表星期一)，weekly 时使用
+        month_day: 每月几号 (1-31)，monthly 时使用
+    """
+    hour, minute = (int(part) for part in execute_time.split(':'))
+    if frequency == 'daily':
+        return CronTrigger(hour=hour, minute=minute)  # 每天指定时间
+    if frequency == 'weekly':
+        return CronTrigger(day_of_week=int(weekday or '1') - 1, hour=hour, minute=minute)  # 每周指定日指定时间
+    if frequency == 'monthly':
+        return CronTrigger(day=int(month_day or '1'), hour=hour, minute=minute)  # 每月指定日指定时间
+    raise ValueError(f"未知的任务频率: {frequency}")
+
+def ensure_job(func, job_id: str, kind: str, trigger=None, kwargs: Optional[Dict[str, Any]] = None,
+               executor: str = 'default') -> bool:
+    """
+    添加定时任务；任务库中已有相同的任务时保留原任务及其下一次运行时间
+    
+    Args:
+        func: 任务函数（需为模块级函数，才能保存到任务库）
+        job_id: 任务ID
+        kind: 任务类型，决定执行策略
+        trigger: 触发器，为 None 时立即执行一次
+        kwargs: 任务参数
+        executor: 协程任务使用 default（事件循环），阻塞型任务使用 blocking（线程池）
+        
+    Returns:
+        bool: 是否新增或替换了任务
+    """
+    kwargs = kwargs or {}
+    policy = job_policy(kind)
+    job = scheduler.get_job(job_id)
+    if job is not None and (
+        job.func_ref == obj_to_ref(func)
+        and job.kwargs == kwargs
+        and job.executor == executor
+        and (trigger is None or str(job.trigger) == str(trigger))
+        and all(getattr(job, key) == value for key, value in policy.items())
+    ):
+        return False
+    scheduler.add_job(
+        func,
+        trigger if trigger is not None else 'date',  # 未指定触发器时立即执行一次
+        id=job_id,
+        kwargs=kwargs,
+        executor=executor,
+        replace_existing=True,
+        **policy
+    )
+    return True
+
+def immediate_task_ran(task: Dict[str, Any]) -> bool:
+    """
+    立即执行的任务在最近一次创建或修改之后是否已经运行过
+    
+    立即执行的任务运行后即从任务库中删除，只能根据运行记录判断，避免重启或切换主进程后重复发送。
+    
+    Args:
+        task: 任务配置
+    """
+    run = services.job_run_log.get(task['id'])
+    if run is None or run['started_at'] is None:
+        return False
+    changed_at = task.get('updated_at') or task.get('created_at')
+    if not changed_at:
+        return True
+    try:
+        return run['started_at'] >= datetime.fromisoformat(changed_at).timestamp()
+    except ValueError:
+        return True
+
 def schedule_task(task: Dict[str, Any]):
     """设置定时任务"""
+    # 非主进程不运行调度器，由主进程同步任务配置
+    if not scheduler_running():
+        return
+    _synced_tasks[task['id']] = task
+        
     try:
-        # 对于立即执行的任务，直接执行一次
+        # 对于立即执行的任务，直接执行一次；修改前已经运行过的不再执行
         if task['frequency'] == 'immediate':
-            # 创建一个立即执行一次的任务
-            scheduler.add_job(
-                send_repo_update_email,
-                'date',  # 指定日期触发器
-                id=task['id'],
-                kwargs={
-                    'task': task
-                },
-                replace_existing=True
-            )
-            logging.info(f"已添加立即执行任务: {task['id']}")
+            if immediate_task_ran(task):
+                return
+            if ensure_job(send_repo_update_email, task['id'], 'repo_updates', kwargs={'task': task}):
+                logging.info(f"已添加立即执行任务: {task['id']}")
             return
             
-        # 获取执行时间（默认9:00）
-        execute_time = task.get('executeTime', '09:00').split(':')
-        hour = int(execute_time[0])
-        minute = int(execute_time[1])
-            
-        # 根据频率设置触发器
-        if task['frequency'] == 'daily':
-            trigger = CronTrigger(hour=hour, minute=minute)  # 每天指定时间
-        elif task['frequency'] == 'weekly':
-            # 星期几 (1-7，1代表星期一)
-            weekday = int(task.get('weekday', '1'))
-            trigger = CronTrigger(day_of_week=weekday - 1, hour=hour, minute=minute)  # 每周指定日指定时间
-        elif task['frequency'] == 'monthly':
-            # 每月几号 (1-31)
-            day = int(task.get('monthDay', '1'))
-            trigger = CronTrigger(day=day, hour=hour, minute=minute)  # 每月指定日指定时间
-        else:
-            logging.error(f"未知的任务频率: {task['frequency']}")
-            return
+        # 获取执行时间（默认9:00），相同配置的触发器只解析一次
+        execute_time = task.get('executeTime') or '09:00'
+        trigger = build_trigger(task['frequency'], execute_time, task.get('weekday'), task.get('monthDay'))
             
-        # 添加任务到调度器
-        scheduler.add_job(
-            send_repo_update_email,
-            trigger=trigger,
-            id=task['id'],
-            kwargs={
-                'task': task
-            },
-            replace_existing=True
-        )
-        
-        logging.info(f"已添加定时任务: {task['id']}, 频率: {task['frequency']}, 时间: {hour}:{minute}")
+        # 添加任务到调度器，任务库中已有相同任务时不重新注册
+        if ensure_job(send_repo_update_email, task['id'], 'repo_updates', trigger=trigger, kwargs={'task': task}):
+            logging.info(f"已添加定时任务: {task['id']}, 频率: {task['frequency']}, 时间: {execute_time}")
     except Exception as e:
         logging.error(f"设置定时任务时出错: {str(e)}")
 
 async def send_repo_update_email(task: Dict[str, Any]):
-    """发送仓库更新邮件"""
+    """发送仓库更新邮件
+    
+    同一投递窗口内到期的任务合并后统一抓取仓库，每个仓库只抓取一次。
+    """
+    services.delivery_dispatcher.submit(task)
+
+def upcoming_deliveries() -> List[Tuple[datetime, List[str]]]:
+    """任务库中定时邮件任务的下一次投递时间及订阅的仓库（立即执行的任务不需要预抓取）"""
+    func_ref = obj_to_ref(send_repo_update_email)
+    return [
+        (job.next_run_time, job.kwargs['task'].get('repositories', []))
+        for job in scheduler.get_jobs()
+        if job.func_ref == func_ref and job.next_run_time is not None
+        and job.kwargs['task'].get('frequency') != 'immediate'
+    ]
+
+def scheduled_prefetch():
+    """在定时投递前分散抓取订阅的仓库，投递时直接使用已保存的数据"""
     try:
-        # 获取任务信息
-        email = task['email']
-        repositories = task['repositories']
-        
-        # 收集仓库更新信息
-        updates = []
-        for repo_full_name in repositories:
-            try:
-                # 获取仓库活动
-                activities = repo_tracker.get_repo_activities(repo_full_name, days=7)
-                if activities and 'activities' in activities:
-                    repo_activities = activities['activities']
-                    
-                    # 检查是否有更新
-                    if repo_activities.get('commits') or repo_activities.get('issues') or repo_activities.get('pull_requests') or repo_activities.get('releases'):
-                        # 获取仓库详情
-                        repo_details = github_tracker.get_repository_details(repo_full_name)
-                        
-                        # 添加到更新列表
-                        updates.append({
-                            'repo': repo_details,
-                            'activities': repo_activities
-                        })
-            except Exception as e:
-                logging.error(f"获取仓库 {repo_full_name} 更新时出错: {str(e)}")
-                
-        # 如果有更新，发送邮件
-        if updates:
-            mail_service.send_repo_updates(email, updates)
-            logging.info(f"已向 {email} 发送仓库更新邮件")
-        else:
-            logging.info(f"仓库没有更新，不发送邮件")
+        fetched = services.prefetch_planner.run(upcoming_deliveries())
+        if fetched:
+            logging.info(f"已预抓取 {fetched} 个仓库")
     except Exception as e:
-        logging.error(f"发送仓库更新邮件时出错: {str(e)}")
+        logging.error(f"预抓取仓库时出错: {str(e)}")
 
 # 启动时加载已有的定时任务
 def load_scheduled_tasks():
@@ -745,28 +1058,81 @@ def load_scheduled_tasks():
             config = json.load(f)
             
         tasks = config.get('tasks', [])
+        
+        # 移除停机期间已被删除的任务
+        task_ids = {task['id'] for task in tasks}
+        task_func = obj_to_ref(send_repo_update_email)
+        for job in scheduler.get_jobs():
+            if job.func_ref == task_func and job.id not in task_ids:
+                scheduler.remove_job(job.id)
+                services.job_run_log.forget(job.id)
+                
+        # 任务库中已有且配置未变的任务保持不变
         for task in tasks:
             schedule_task(task)
             
+        _synced_tasks_state['mtime'] = config_file.stat().st_mtime
         logging.info(f"已加载 {len(tasks)} 个定时任务")
     except Exception as e:
         logging.error(f"加载定时任务时出错: {str(e)}")
 
+# 主进程已同步的任务快照，用于发现其他工作进程写入的变更
+_synced_tasks: Dict[str, Dict[str, Any]] = {}
+_synced_tasks_state: Dict[str, float] = {'mtime': 0.0}
+
+def sync_scheduled_tasks():
+    """同步其他工作进程对定时任务配置的修改（仅在主进程中运行）"""
+    try:
+        config_file = base_dir / "config" / "scheduled_tasks.json"
+        if not config_file.exists():
+            return
+            
+        mtime = config_file.stat().st_mtime
+        if mtime == _synced_tasks_state['mtime']:
+            return
+            
+        with open(config_file, 'r', encoding='utf-8') as f:
+            config = json.load(f)
+        tasks = {task['id']: task for task in config.get('tasks', [])}
+        
+        # 移除已删除的任务
+        for task_id in list(_synced_tasks):
+            if task_id not in tasks:
+                if scheduler.get_job(task_id):
+                    scheduler.remove_job(task_id)
+                services.job_run_log.forget(task_id)
+                del _synced_tasks[task_id]
+                
+        # 添加新任务或更新有变化的任务
+        for task_id, task in tasks.items():
+            if _synced_tasks.get(task_id) != task:
+                schedule_task(task)
+                
+        _synced_tasks_state['mtime'] = mtime
+        logging.info(f"已同步定时任务配置，共 {len(tasks)} 个任务")
+    except Exception as e:
+        logging.error(f"同步定时任务时出错: {str(e)}")
+
 # 每天自动获取仓库动态的任务
-def scheduled_refresh():
-    """每天自动获取仓库动态的任务"""
-    print("执行定时任务: 自动获取仓库动态")
-    repo_tracker.track_all_repos()
+def scheduled_polling():
+    """按活跃度轮询已到时间的追踪仓库"""
+    try:
+        polled = services.polling_planner.poll_due()
+        if polled:
+            logging.info(f"已轮询 {len(polled)} 个追踪仓库: {', '.join(polled)}")
+            response_cache.invalidate("tracked-repos")
+    except Exception as e:
+        logging.error(f"轮询追踪仓库时出错: {str(e)}")
 
 @app.get("/api/tracked-repos-summary")
 async def get_tracked_repos_summary(days: int = 1) -> Dict[str, Any]:
     """获取已追踪的仓库列表及其总结"""
     try:
         # 获取已追踪的仓库
-        tracked_repos = await get_tracked_repos(days)
+        tracked_repos = await load_tracked_repos(days)
         
         # 生成总结
-        summary = await summary_service.generate_tracked_repos_summary(tracked_repos)
+        summary = await services.summary_service.generate_tracked_repos_summary(tracked_repos)
         
         return {
             "repos": tracked_repos,
@@ -782,13 +1148,14 @@ async def scheduled_daily_summary():
     logging.info("开始执行每日项目总结任务...")
     
     try:
-        # 获取热门项目总结
-        hot_repos_response = await get_hot_repos(False)
-        hot_repos_summary = hot_repos_response["summary"]
-        
-        # 获取已追踪项目总结
-        tracked_repos_response = await get_tracked_repos_summary(days=1)
-        tracked_repos_summary = tracked_repos_response["summary"]
+        with llm_call_site("daily_summary"):
+            # 获取热门项目总结
+            hot_repos_response = await build_hot_repos(False)
+            hot_repos_summary = hot_repos_response["summary"]
+            
+            # 获取已追踪项目总结
+            tracked_repos_response = await get_tracked_repos_summary(days=1)
+            tracked_repos_summary = tracked_repos_response["summary"]
         
         # 从配置文件获取邮件接收者列表
         config_file = base_dir / "config" / "scheduled_tasks.json"
@@ -800,86 +1167,174 @@ async def scheduled_daily_summary():
                 # 获取所有配置了邮箱的用户
                 email_list = set(task['email'] for task in tasks if task.get('email'))
                 
-                # 发送邮件给每个用户
+                # 摘要模式下并入收件人的摘要邮件，否则直接加入发件队列，由后台任务通过同一个SMTP会话发送
+                dispatcher = services.delivery_dispatcher
                 for email in email_list:
-                    mail_service.send_daily_summary(email, hot_repos_summary, tracked_repos_summary)
-                    logging.info(f"成功发送每日总结邮件到 {email}")
+                    if dispatcher.submit_summary(email, hot_repos_summary, tracked_repos_summary):
+                        continue
+                    services.enqueue_mail(services.mail_service.build_daily_summary_message(
+                        email, hot_repos_summary, tracked_repos_summary
+                    ))
+                logging.info(f"已将 {len(email_list)} 位用户的每日总结加入发件队列")
         
     except Exception as e:
         logging.error(f"执行每日项目总结任务时出错: {str(e)}")
 
-# 在应用启动时添加每日总结任务
-@app.on_event("startup")
-def startup_event():
+def start_scheduler():
+    """当选为主进程后启动调度器并同步定时任务（在应用的事件循环中调用）"""
+    global scheduler
+    scheduler = build_scheduler()
+    scheduler.add_listener(services.job_run_log.listener, JOB_EVENTS)
+    
+    # 暂停状态下启动：先按配置同步任务库，再处理停机期间错过的任务
+    scheduler.start(paused=True)
+    
+    # 旧版本的每日全量刷新任务已由自适应轮询取代
+    try:
+        scheduler.remove_job('daily_refresh')
+    except JobLookupError:
+        pass
+    
     # 加载已配置的定时任务
     load_scheduled_tasks()
     
-    # 添加每天自动刷新仓库的任务
-    scheduler.add_job(
-        scheduled_refresh,
-        CronTrigger(hour=3),  # 每天凌晨3点执行
-        id='daily_refresh',
-        replace_existing=True
-    )
+    # 定期同步其他工作进程写入的任务配置
+    ensure_job(sync_scheduled_tasks, 'sync_scheduled_tasks', 'sync_tasks', trigger=IntervalTrigger(seconds=30),
+               executor='blocking')
+    
+    # 按活跃度轮询追踪的仓库，取代原来每天凌晨3点的全量刷新
+    ensure_job(scheduled_polling, 'adaptive_polling', 'polling',
+               trigger=IntervalTrigger(seconds=services.polling_config.get('tick_seconds', 60)), executor='blocking')
+    
+    # 定时投递前分散预抓取订阅的仓库
+    prefetch_config = services.prefetch_config
+    if prefetch_config.get('enabled', True):
+        ensure_job(scheduled_prefetch, 'prefetch', 'prefetch',
+                   trigger=IntervalTrigger(seconds=prefetch_config.get('tick_seconds', 60)), executor='blocking')
+    elif scheduler.get_job('prefetch'):
+        scheduler.remove_job('prefetch')
     
     # 添加每天的项目总结任务
-    scheduler.add_job(
-        lambda: asyncio.create_task(scheduled_daily_summary()),  # 使用asyncio.create_task包装异步函数
-        CronTrigger(hour=10, minute=0),  # 每天早上10点执行
-        id='daily_summary',
-        replace_existing=True
-    )
+    ensure_job(scheduled_daily_summary, 'daily_summary', 'daily_summary',
+               trigger=CronTrigger(hour=10, minute=0))  # 每天早上10点执行
+    
+    scheduler.resume()
     
-    # 启动定时任务调度器
-    scheduler.start()
+    # 发件队列和摘要邮件只由主进程发送，继续投递上一任主进程未完成的摘要
+    services.mail_worker.start()
+    if services.delivery_config.get('digest', False):
+        services.delivery_dispatcher.resume_digests()
+
+def start_leader_duties():
+    """启动调度器；启动失败时停掉已启动的部分并放弃主进程身份，由其他进程接管"""
+    try:
+        start_scheduler()
+    except Exception as e:
+        logging.error(f"调度器启动失败，放弃调度主进程身份: {str(e)}")
+        if scheduler_running():
+            scheduler.shutdown(wait=False)
+        asyncio.get_running_loop().create_task(services.mail_worker.stop())
+        leader_elector.resign()
+
+def on_elected_leader():
+    """当选为主进程（选举线程中回调），调度器需在应用的事件循环中启动"""
+    services.loop.call_soon_threadsafe(start_leader_duties)
+
+# 多个工作进程通过文件锁选出唯一的调度主进程，主进程退出后由其他进程接管
+leader_elector = LeaderElector(base_dir / "data" / "scheduler.lock", on_elected=on_elected_leader)
+
+# 在应用启动时参与调度主进程选举
+@app.on_event("startup")
+async def startup_event():
+    # 尽早发现缺失的配置，服务本身仍按需创建
+    services.github_token
+    activity_broadcaster.attach_loop(asyncio.get_running_loop())
+    services.loop = asyncio.get_running_loop()
+    leader_elector.start()
 
 # 应用关闭时关闭定时任务
 @app.on_event("shutdown")
-def shutdown_scheduler():
-    scheduler.shutdown()
+async def shutdown_scheduler():
+    if scheduler_running():
+        scheduler.shutdown()
+    # 发件任务只在主进程中运行，先停止发送再释放选举锁，避免与接任的主进程重复发送
+    if leader_elector.is_leader:
+        await services.mail_worker.stop()
+    leader_elector.release()
+    await activity_broadcaster.close()
+    await services.close()
 
 @app.post("/api/hot-repos/refresh")
 async def refresh_hot_repos(should_translate: bool = False) -> Dict[str, Any]:
     """刷新热门项目列表和总结"""
     try:
-        # 获取热门仓库
-        repos = github_tracker.get_trending_repositories(should_translate=should_translate)
-        
-        # 生成总结
-        summary = await summary_service.generate_hot_repos_summary(repos)
+        hot_repos = await build_hot_repos(should_translate)
         
-        # 转换数据格式
-        formatted_repos = []
-        for repo in repos:
-            formatted_repos.append({
-                "name": repo["name"].split("/")[-1],
-                "full_name": repo["name"],
-                "description": repo["description"],
-                "description_zh": repo.get("description_zh", ""),
-                "name_zh": repo.get("name_zh", ""),
-                "stars": repo["stars"],
-                "forks": repo["forks"],
-                "updated_at": repo["updated_at"].isoformat(),
-                "url": repo["url"]
-            })
+        # 用最新数据替换缓存，后续轮询直接命中
+        response_cache.invalidate("hot-repos")
+        response_cache.put(f"hot-repos:translate={should_translate}", hot_repos, ttl=hot_repos_ttl(hot_repos))
             
-        return {
-            "repos": formatted_repos,
-            "summary": summary
-        }
+        return hot_repos
     except Exception as e:
         logging.error(f"刷新热门项目时出错: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.websocket("/ws/activities")
+async def activities_websocket(websocket: WebSocket):
+    """推送已追踪仓库的新动态
+    
+    每条消息形如 {"type": "activity", "repo": "owner/repo", "new_events": 3, "counts": {...}}，
+    空闲连接只等待消息，不会产生任何轮询。
+    """
+    await websocket.accept()
+    queue = activity_broadcaster.subscribe()
+    
+    async def push_deltas():
+        while True:
+            await websocket.send_json(await queue.get())
+            
+    sender = asyncio.create_task(push_deltas())
+    try:
+        # 等待客户端断开连接
+        while True:
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                break
+    finally:
+        sender.cancel()
+        activity_broadcaster.unsubscribe(queue)
+
+@app.get("/api/tracked-repos-summary/stream")
+async def stream_tracked_repos_summary(days: int = 1) -> StreamingResponse:
+    """以 SSE 返回已追踪仓库列表和流式生成的总结
+    
+    先发送 repos 事件（仓库列表），随后逐段发送 summary 事件（总结片段），最后发送 done 事件。
+    
+    Args:
+        days: 获取最近几天的活动，默认为1天
+    """
+    async def events():
+        try:
+            tracked_repos = await load_tracked_repos(days)
+            yield sse_event("repos", tracked_repos)
+            async for chunk in services.summary_service.stream_tracked_repos_summary(tracked_repos):
+                yield sse_event("summary", chunk)
+            yield sse_event("done", {})
+        except Exception as e:
+            logging.error(f"流式获取已追踪项目总结时出错: {str(e)}")
+            yield sse_event("error", {"detail": str(e)})
+            
+    return sse_response(events())
+
 @app.get("/api/tracked-repos-summary/content")
 async def get_tracked_repos_summary_content(days: int = 1) -> Dict[str, str]:
     """获取已追踪项目总结内容"""
     try:
         # 获取已追踪的仓库
-        tracked_repos = await get_tracked_repos(days)
+        tracked_repos = await load_tracked_repos(days)
         
         # 生成总结
-        summary = await summary_service.generate_tracked_repos_summary(tracked_repos)
+        summary = await services.summary_service.generate_tracked_repos_summary(tracked_repos)
         
         return {"summary": summary}
     except Exception as e:
@@ -0,0 +1,294 @@
+import os
+import asyncio
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class ServiceContainer:
+    """服务容器
+
+    各个服务在第一次被访问时才构建，并在进程内共享同一个实例。
+    GitHub 客户端、LLM SDK 等较重的依赖因此不会在导入 api_server 时加载。
+    """
+
+    def __init__(self, base_dir: Path):
+        """
+        初始化服务容器
+
+        Args:
+            base_dir: 项目根目录
+        """
+        self.base_dir = base_dir
+        self.config_path = base_dir / "config" / "model_config.yaml"
+        self._instances: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+        
+        # 应用的事件循环，启动时设置，供调度器线程提交异步工作
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        
+        # 仓库活动新动态的监听器，在创建 repo_tracker 时注册
+        self.activity_listeners: List[Callable[[Dict[str, Any]], None]] = []
+
+    def _get(self, name: str, factory: Callable[[], Any]) -> Any:
+        """获取服务实例，不存在时构建（线程安全，调度器线程也会访问）"""
+        instance = self._instances.get(name)
+        if instance is None:
+            with self._lock:
+                instance = self._instances.get(name)
+                if instance is None:
+                    instance = self._instances[name] = factory()
+        return instance
+
+    async def close(self) -> None:
+        """停止发件任务并关闭已创建服务持有的长连接"""
+        mail_worker = self._instances.get('mail_worker')
+        if mail_worker is not None:
+            await mail_worker.stop()
+        llm = self._instances.get('llm')
+        if llm is not None:
+            await llm.close()
+        mail_service = self._instances.get('mail_service')
+        if mail_service is not None:
+            mail_service.close()
+            
+    @property
+    def github_token(self) -> str:
+        """GitHub API 访问令牌"""
+        token = os.getenv('GITHUB_TOKEN')
+        if not token:
+            raise ValueError("请设置 GITHUB_TOKEN 环境变量")
+        return token
+
+    @property
+    def llm(self):
+        """共享的LLM客户端，按延迟和错误率在各模型服务间路由"""
+        def factory():
+            from .llm.llm_router import LLMRouter
+            return LLMRouter(self.config_path)
+        return self._get('llm', factory)
+
+    @property
+    def embeddings_config(self) -> Dict[str, Any]:
+        """仓库向量索引配置"""
+        from .utils.config_loader import load_yaml_config
+        return load_yaml_config(self.config_path).get('embeddings', {})
+
+    @property
+    def vector_index(self):
+        """仓库名称和描述的向量索引，未开启时为 None"""
+        if not self.embeddings_config.get('enabled', True):
+            return None
+        def factory():
+            config = self.embeddings_config
+            from .utils.config_loader import load_yaml_config
+            from .utils.vector_index import VectorIndex, create_embedder
+            storage = load_yaml_config(self.config_path).get('storage', {})
+            index_dir = self.base_dir / storage.get('base_dir', 'data') / storage.get('embeddings_dir', 'embeddings')
+            return VectorIndex(index_dir, create_embedder(config))
+        return self._get('vector_index', factory)
+
+    @property
+    def github_tracker(self):
+        """热门仓库追踪器"""
+        def factory():
+            from .github_tracker import GitHubTracker
+            return GitHubTracker(
+                self.github_token, self.base_dir, llm=self.llm, vector_index=self.vector_index,
+                dedupe_threshold=self.embeddings_config.get('dedupe_threshold', 0.9)
+            )
+        return self._get('github_tracker', factory)
+
+    @property
+    def repo_tracker(self):
+        """仓库活动追踪器"""
+        def factory():
+            from .repo_activity_tracker import RepoActivityTracker
+            tracker = RepoActivityTracker(
+                self.github_token, self.base_dir, keep_files=self.polling_config.get('keep_files', 3)
+            )
+            for listener in self.activity_listeners:
+                tracker.add_listener(listener)
+            return tracker
+        return self._get('repo_tracker', factory)
+
+    @property
+    def mail_service(self):
+        """邮件服务"""
+        def factory():
+            from .mail.mail_service import MailService
+            return MailService()
+        return self._get('mail_service', factory)
+
+    @property
+    def mail_queue_config(self) -> Dict[str, Any]:
+        """发件队列配置"""
+        from .utils.config_loader import load_yaml_config
+        return load_yaml_config(self.config_path).get('mail_queue', {})
+
+    @property
+    def mail_queue(self):
+        """持久化的发件队列，各工作进程共用同一个数据库"""
+        def factory():
+            from .mail.mail_queue import MailQueue
+            config = self.mail_queue_config
+            return MailQueue(
+                self.base_dir / "data" / "mail_queue.sqlite3",
+                max_attempts=config.get('max_attempts', 6),
+                base_delay=config.get('base_delay', 30),
+                max_delay=config.get('max_delay', 3600)
+            )
+        return self._get('mail_queue', factory)
+
+    @property
+    def mail_worker(self):
+        """发件队列的后台发送任务"""
+        def factory():
+            from .mail.mail_queue import MailQueueWorker
+            config = self.mail_queue_config
+            worker = MailQueueWorker(
+                self.mail_queue, self.mail_service,
+                workers=config.get('workers', 1),
+                batch_size=config.get('batch_size', 50),
+                poll_interval=config.get('poll_interval', 5),
+                config_retry_interval=config.get('config_retry_interval', 60)
+            )
+            if self.loop is not None:
+                worker.attach_loop(self.loop)
+            return worker
+        return self._get('mail_worker', factory)
+
+    def enqueue_mail(self, msg) -> int:
+        """将邮件写入持久化发件队列并唤醒发送任务，不等待发送完成"""
+        message_id = self.mail_queue.enqueue(msg)
+        self.mail_worker.wake()
+        return message_id
+
+    def _deliver_updates(self, email: str, updates: List[Dict[str, Any]], digest: bool = False,
+                         summary: Optional[Tuple[str, str]] = None) -> int:
+        """构建仓库更新邮件（摘要模式下为合并摘要邮件）并加入发件队列"""
+        if digest:
+            msg = self.mail_service.build_digest_message(email, updates, summary)
+        else:
+            msg = self.mail_service.build_repo_updates_message(email, updates)
+        return self.enqueue_mail(msg)
+
+    @property
+    def delivery_ledger(self):
+        """各定时任务已发送事件的记录"""
+        def factory():
+            from .utils.config_loader import load_yaml_config
+            from .utils.delivery_ledger import DeliveryLedger
+            config = load_yaml_config(self.config_path).get('delivery', {})
+            return DeliveryLedger(
+                self.base_dir / "data" / "delivery_ledger.sqlite3",
+                capacity=config.get('ledger_capacity', 5000),
+                error_rate=config.get('ledger_error_rate', 0.001)
+            )
+        return self._get('delivery_ledger', factory)
+
+    @property
+    def delivery_config(self) -> Dict[str, Any]:
+        """定时邮件任务投递配置"""
+        from .utils.config_loader import load_yaml_config
+        return load_yaml_config(self.config_path).get('delivery', {})
+
+    @property
+    def digest_store(self):
+        """摘要模式下等待合并投递的条目"""
+        def factory():
+            from .utils.digest_store import DigestStore
+            return DigestStore(self.base_dir / "data" / "delivery_digests.sqlite3")
+        return self._get('digest_store', factory)
+
+    @property
+    def delivery_dispatcher(self):
+        """定时邮件任务的合并投递，每个订阅仓库在一次投递中只抓取一次"""
+        def factory():
+            from .delivery_dispatcher import DeliveryDispatcher
+            config = self.delivery_config
+            dispatcher = DeliveryDispatcher(
+                self.repo_tracker, self.github_tracker,
+                self._deliver_updates,
+                window_seconds=config.get('window_seconds', 5),
+                max_concurrency=config.get('max_concurrency', 4),
+                days=config.get('days', 7),
+                store_max_age=config.get('store_max_age', 1800),
+                ledger=self.delivery_ledger if config.get('only_unseen', True) else None,
+                digest_window=config.get('digest_window', 0) if config.get('digest', False) else 0,
+                digest_store=self.digest_store if config.get('digest', False) else None
+            )
+            if self.loop is not None:
+                dispatcher.attach_loop(self.loop)
+            return dispatcher
+        return self._get('delivery_dispatcher', factory)
+
+    @property
+    def prefetch_config(self) -> Dict[str, Any]:
+        """定时投递前预抓取的配置"""
+        from .utils.config_loader import load_yaml_config
+        return load_yaml_config(self.config_path).get('prefetch', {})
+
+    @property
+    def prefetch_planner(self):
+        """在定时投递前分散抓取订阅仓库，投递时只需渲染和发送"""
+        def factory():
+            from .prefetch_planner import PrefetchPlanner
+            config = self.prefetch_config
+            return PrefetchPlanner(
+                self.repo_tracker, self.github_tracker,
+                window_seconds=config.get('window_seconds', 1500),
+                lead_seconds=config.get('lead_seconds', 120),
+                calls_per_repo=config.get('calls_per_repo', 5),
+                reserve_calls=config.get('reserve_calls', 500),
+                min_interval=config.get('min_interval', 2),
+                tick_seconds=config.get('tick_seconds', 60),
+                days=config.get('days', 7)
+            )
+        return self._get('prefetch_planner', factory)
+
+    @property
+    def scheduler_config(self) -> Dict[str, Any]:
+        """定时任务调度器的线程池和各类任务执行策略配置"""
+        from .utils.config_loader import load_yaml_config
+        return load_yaml_config(self.config_path).get('scheduler', {})
+
+    @property
+    def polling_config(self) -> Dict[str, Any]:
+        """追踪仓库自适应轮询的配置"""
+        from .utils.config_loader import load_yaml_config
+        return load_yaml_config(self.config_path).get('polling', {})
+
+    @property
+    def polling_planner(self):
+        """按仓库活跃度安排追踪仓库的轮询"""
+        def factory():
+            from .polling_planner import PollingPlanner
+            config = self.polling_config
+            return PollingPlanner(
+                self.repo_tracker,
+                min_interval=config.get('min_interval', 3600),
+                max_interval=config.get('max_interval', 259200),
+                target_events=config.get('target_events', 5),
+                days=config.get('days', 7),
+                max_per_tick=config.get('max_per_tick', 10),
+                calls_per_repo=config.get('calls_per_repo', 5),
+                reserve_calls=config.get('reserve_calls', 500)
+            )
+        return self._get('polling_planner', factory)
+
+    @property
+    def job_run_log(self):
+        """定时任务的最近一次运行记录，与任务库使用同一个数据库文件"""
+        def factory():
+            from .utils.job_run_log import JobRunLog
+            return JobRunLog(self.base_dir / "data" / "scheduler_jobs.sqlite3")
+        return self._get('job_run_log', factory)
+
+    @property
+    def summary_service(self):
+        """AI总结服务"""
+        def factory():
+            from .llm.summary_service import SummaryService
+            return SummaryService(self.config_path, llm=self.llm)
+        return self._get('summary_service', factory)
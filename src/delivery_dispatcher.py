@@ -0,0 +1,371 @@
+import json
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+
+class DeliveryDispatcher:
+    """定时邮件任务的合并投递
+
+    同一投递窗口内到期的任务合并为一批，计算所有任务订阅的不同仓库，
+    每个仓库只抓取一次（或读取足够新的已保存活动数据），再分发给订阅它的每个任务。
+    一次投递的 GitHub 调用次数与不同仓库数成正比，而不是订阅数。
+    配置了发送记录时，每封邮件只包含该任务尚未收到过的事件，没有新事件的任务直接跳过。
+    开启摘要模式后，同一收件人在摘要窗口内到期的所有任务（以及每日总结）合并为一封邮件，
+    等待合并的条目保存在摘要条目存储中，重启后由 resume_digests 继续投递。
+    """
+
+    def __init__(self, repo_tracker: Any, github_tracker: Any, deliver: Callable[[str, List[Dict[str, Any]]], Any],
+                 window_seconds: float = 5.0, max_concurrency: int = 4, days: int = 7,
+                 store_max_age: float = 1800.0, ledger: Optional[Any] = None, digest_window: float = 0.0,
+                 digest_store: Optional[Any] = None):
+        """
+        初始化投递调度
+
+        Args:
+            repo_tracker: 仓库活动追踪器
+            github_tracker: 热门仓库追踪器，用于获取仓库详情
+            deliver: 投递函数，参数为收件人邮箱、仓库更新列表，以及关键字参数 digest 和 summary
+            window_seconds: 合并到期任务的窗口（秒）
+            max_concurrency: 同时抓取的仓库数
+            days: 获取最近几天的活动
+            store_max_age: 已保存的活动数据在该秒数内视为最新，直接读取而不重新抓取
+            ledger: 各任务已发送事件的记录，为空时每次发送窗口内的全部活动
+            digest_window: 摘要窗口（秒），大于 0 时按收件人合并该窗口内到期的任务
+            digest_store: 摘要条目存储，开启摘要模式时必须提供
+        """
+        if digest_window > 0 and digest_store is None:
+            raise ValueError("开启摘要模式时必须提供摘要条目存储")
+        self.repo_tracker = repo_tracker
+        self.github_tracker = github_tracker
+        self.deliver = deliver
+        self.window_seconds = window_seconds
+        self.max_concurrency = max_concurrency
+        self.days = days
+        self.store_max_age = store_max_age
+        self.ledger = ledger
+        self.digest_window = digest_window
+        self.digest_store = digest_store
+        self.logger = logging.getLogger(__name__)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._flush_scheduled = False
+        # 最近抓取的结果和正在进行的抓取，各收件人的摘要分别投递时也不会重复抓取同一仓库
+        self._recent: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._lock = threading.Lock()
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """绑定执行投递的事件循环（应用启动时调用）"""
+        self._loop = loop
+
+    def submit(self, task: Dict[str, Any]) -> None:
+        """
+        登记到期的任务，窗口结束后与同一窗口内的其他任务一起投递（可在调度器线程中调用）
+
+        Args:
+            task: 定时任务配置
+        """
+        if self._loop is None or self._loop.is_closed():
+            self.logger.error(f"投递调度未绑定事件循环，无法执行任务 {task.get('id')}")
+            return
+        if self.digest_window > 0:
+            self._add_to_digest(task['email'], task=task)
+            return
+        with self._lock:
+            self._pending[task['id']] = task
+            if self._flush_scheduled:
+                return
+            self._flush_scheduled = True
+        self._loop.call_soon_threadsafe(self._loop.call_later, self.window_seconds, self._start_flush)
+
+    def _start_flush(self) -> None:
+        with self._lock:
+            tasks = list(self._pending.values())
+            self._pending.clear()
+            self._flush_scheduled = False
+        self._loop.create_task(self._flush(tasks))
+
+    async def _flush(self, tasks: List[Dict[str, Any]]) -> None:
+        try:
+            await self.dispatch(tasks)
+        except Exception as e:
+            self.logger.error(f"投递定时任务时出错: {str(e)}")
+
+    def submit_summary(self, email: str, hot_repos_summary: str, tracked_repos_summary: str) -> bool:
+        """
+        将每日总结并入收件人的摘要邮件
+
+        Args:
+            email: 收件人邮箱
+            hot_repos_summary: 热门项目总结
+            tracked_repos_summary: 已追踪项目总结
+
+        Returns:
+            bool: 是否已并入摘要；未开启摘要模式时返回 False，由调用方单独发送
+        """
+        if self.digest_window <= 0 or self._loop is None or self._loop.is_closed():
+            return False
+        self._add_to_digest(email, summary=(hot_repos_summary, tracked_repos_summary))
+        return True
+
+    def _add_to_digest(self, email: str, task: Optional[Dict[str, Any]] = None,
+                       summary: Optional[Tuple[str, str]] = None) -> None:
+        """登记到收件人的摘要，第一项登记时开始计时，窗口结束后统一投递"""
+        if task is not None:
+            due_at, is_new = self.digest_store.add(email, 'task', task, self.digest_window)
+        else:
+            due_at, is_new = self.digest_store.add(email, 'summary', list(summary), self.digest_window)
+        if is_new:
+            self._arm_digest(email, due_at)
+
+    def _arm_digest(self, email: str, due_at: float) -> None:
+        """在投递时间到达时投递收件人的摘要（可在任意线程中调用）"""
+        delay = max(0.0, due_at - time.time())
+        self._loop.call_soon_threadsafe(self._loop.call_later, delay, self._start_digest_flush, email, due_at)
+
+    def resume_digests(self) -> int:
+        """
+        继续投递上次运行时尚未投递的摘要（调度主进程启动时调用），已过投递时间的立即投递
+
+        Returns:
+            int: 等待投递的收件人数
+        """
+        if self.digest_window <= 0 or self._loop is None:
+            return 0
+        pending = self.digest_store.pending()
+        for email, due_at in pending.items():
+            self._arm_digest(email, due_at)
+        if pending:
+            self.logger.info(f"继续投递 {len(pending)} 位收件人未完成的摘要邮件")
+        return len(pending)
+
+    def _start_digest_flush(self, email: str, due_at: float) -> None:
+        self._loop.create_task(self._flush_digest(email, due_at))
+
+    async def _flush_digest(self, email: str, due_at: float) -> None:
+        items = await asyncio.to_thread(self.digest_store.claim, email, due_at)
+        if not items:
+            return
+        tasks: Dict[str, Dict[str, Any]] = {}
+        summary = None
+        for _, kind, payload in items:
+            if kind == 'task':
+                tasks[payload['id']] = payload
+            else:
+                summary = tuple(payload)
+        item_ids = [item_id for item_id, *_ in items]
+        try:
+            await self.dispatch_digest(email, list(tasks.values()), summary)
+        except Exception as e:
+            self.logger.error(f"投递 {email} 的摘要邮件时出错: {str(e)}")
+            # 推迟一个摘要窗口后重试
+            retry_at = time.time() + self.digest_window
+            await asyncio.to_thread(self.digest_store.release, item_ids, retry_at)
+            self._arm_digest(email, retry_at)
+            return
+        # 邮件已进入持久化的发件队列，删除摘要条目
+        await asyncio.to_thread(self.digest_store.delete, item_ids)
+
+    def _read_store(self, repo_full_name: str) -> Optional[Dict[str, Any]]:
+        """读取足够新的已保存活动数据，不存在或已过期时返回 None"""
+        latest = self.repo_tracker.latest_activity_file(repo_full_name)
+        if latest is None or time.time() - latest.stat().st_mtime > self.store_max_age:
+            return None
+        try:
+            with open(latest, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _fetch_repo(self, repo_full_name: str) -> Optional[Dict[str, Any]]:
+        """
+        获取单个仓库的更新信息
+
+        Args:
+            repo_full_name: 仓库全名
+
+        Returns:
+            包含 repo 和 activities 的更新信息，没有新活动时返回 None
+        """
+        activities = self._read_store(repo_full_name)
+        if activities is not None:
+            self.logger.info(f"仓库 {repo_full_name} 使用已保存的活动数据")
+        else:
+            self.logger.info(f"正在获取仓库 {repo_full_name} 的活动信息...")
+            activities = self.repo_tracker.get_repo_activities(repo_full_name, days=self.days)
+        if not activities or 'activities' not in activities:
+            self.logger.warning(f"仓库 {repo_full_name} 未获取到活动信息")
+            return None
+
+        repo_activities = activities['activities']
+        if not any(repo_activities.get(key) for key in self.repo_tracker.EVENT_CATEGORIES):
+            self.logger.info(f"仓库 {repo_full_name} 没有新的活动")
+            return None
+        # 预抓取时已保存仓库详情的直接使用
+        return {
+            'repo': activities.get('repo_details') or self.github_tracker.get_repository_details(repo_full_name),
+            'activities': repo_activities
+        }
+
+    def _unseen_updates(self, task_id: str, updates: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """
+        从仓库更新中去掉已发送给该任务的事件
+
+        Args:
+            task_id: 任务ID
+            updates: 仓库更新列表
+
+        Returns:
+            只包含新事件的仓库更新列表，以及这些事件的ID
+        """
+        tagged = []
+        for update in updates:
+            repo_full_name = update['repo'].get('full_name')
+            for category in self.repo_tracker.EVENT_CATEGORIES:
+                for item in update['activities'].get(category, []):
+                    event_id = f"{repo_full_name}:{category}:{self.repo_tracker.event_id(category, item)}"
+                    tagged.append((update, category, item, event_id))
+
+        unseen = set(self.ledger.unseen(task_id, [event_id for *_, event_id in tagged]))
+        filtered: Dict[int, Dict[str, Any]] = {}
+        for update, category, item, event_id in tagged:
+            if event_id not in unseen:
+                continue
+            entry = filtered.setdefault(id(update), {
+                'repo': update['repo'],
+                'activities': {key: [] for key in self.repo_tracker.EVENT_CATEGORIES}
+            })
+            entry['activities'][category].append(item)
+        # 保持仓库原有顺序
+        new_updates = [filtered[id(update)] for update in updates if id(update) in filtered]
+        return new_updates, [event_id for *_, event_id in tagged if event_id in unseen]
+
+    async def _fetch_all(self, repos: Set[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+        """并发获取多个仓库的更新信息，最近已获取或正在获取的仓库不会重复抓取"""
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        now = time.monotonic()
+        self._recent = {repo: entry for repo, entry in self._recent.items() if now - entry[0] <= self.store_max_age}
+
+        async def fetch(repo_full_name: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return await asyncio.to_thread(self._fetch_repo, repo_full_name)
+                except Exception as e:
+                    self.logger.error(f"获取仓库 {repo_full_name} 更新时出错: {str(e)}")
+                    return None
+
+        async def get(repo_full_name: str) -> Optional[Dict[str, Any]]:
+            if repo_full_name in self._recent:
+                return self._recent[repo_full_name][1]
+            future = self._inflight.get(repo_full_name)
+            if future is None:
+                future = self._inflight[repo_full_name] = asyncio.ensure_future(fetch(repo_full_name))
+                try:
+                    result = await future
+                finally:
+                    del self._inflight[repo_full_name]
+                self._recent[repo_full_name] = (time.monotonic(), result)
+                return result
+            return await asyncio.shield(future)
+
+        ordered = sorted(repos)
+        return dict(zip(ordered, await asyncio.gather(*(get(repo) for repo in ordered))))
+
+    async def _task_updates(self, task: Dict[str, Any],
+                            results: Dict[str, Optional[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """任务订阅仓库的更新，配置了发送记录时只保留未发送过的事件"""
+        updates = [results[repo] for repo in task.get('repositories', []) if results.get(repo)]
+        if self.ledger is None or not updates:
+            return updates, []
+        return await asyncio.to_thread(self._unseen_updates, task['id'], updates)
+
+    async def _mark_sent(self, marks: List[Tuple[str, List[str]]]) -> None:
+        # 邮件已写入持久化发件队列后再记录，避免投递失败时漏发
+        for task_id, event_ids in marks:
+            if event_ids:
+                await asyncio.to_thread(self.ledger.mark_sent, task_id, event_ids)
+
+    async def dispatch(self, tasks: List[Dict[str, Any]]) -> Dict[str, int]:
+        """
+        为一批任务抓取所有订阅仓库（每个仓库一次）并逐个任务投递
+
+        Args:
+            tasks: 定时任务配置列表
+
+        Returns:
+            Dict[str, int]: 任务ID到投递的仓库更新数
+        """
+        repos: Set[str] = {repo for task in tasks for repo in task.get('repositories', [])}
+        self.logger.info(f"投递 {len(tasks)} 个定时任务，共订阅 {len(repos)} 个不同仓库")
+        results = await self._fetch_all(repos)
+
+        delivered = {}
+        for task in tasks:
+            updates, event_ids = await self._task_updates(task, results)
+            delivered[task['id']] = len(updates)
+            if not updates:
+                self.logger.info(f"任务 {task['id']} 订阅的仓库没有新的活动，不发送邮件")
+                continue
+            try:
+                self.deliver(task['email'], updates)
+            except Exception as e:
+                self.logger.error(f"投递任务 {task['id']} 时出错: {str(e)}")
+                continue
+            await self._mark_sent([(task['id'], event_ids)])
+        return delivered
+
+    def _merge_updates(self, updates: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """将多个任务的仓库更新按仓库合并，同一事件只保留一次"""
+        merged: Dict[str, Dict[str, Any]] = {}
+        seen: Dict[str, Set[str]] = {}
+        for update in updates:
+            repo_full_name = update['repo'].get('full_name')
+            entry = merged.get(repo_full_name)
+            if entry is None:
+                entry = merged[repo_full_name] = {
+                    'repo': update['repo'],
+                    'activities': {key: [] for key in self.repo_tracker.EVENT_CATEGORIES}
+                }
+                seen[repo_full_name] = set()
+            for category in self.repo_tracker.EVENT_CATEGORIES:
+                for item in update['activities'].get(category, []):
+                    event_id = f"{category}:{self.repo_tracker.event_id(category, item)}"
+                    if event_id not in seen[repo_full_name]:
+                        seen[repo_full_name].add(event_id)
+                        entry['activities'][category].append(item)
+        return list(merged.values())
+
+    async def dispatch_digest(self, email: str, tasks: List[Dict[str, Any]],
+                              summary: Optional[Tuple[str, str]] = None) -> int:
+        """
+        将同一收件人的多个任务（及每日总结）合并为一封摘要邮件投递
+
+        Args:
+            email: 收件人邮箱
+            tasks: 该收件人在摘要窗口内到期的任务
+            summary: 热门项目总结和已追踪项目总结
+
+        Returns:
+            int: 摘要中的仓库数
+        """
+        repos: Set[str] = {repo for task in tasks for repo in task.get('repositories', [])}
+        results = await self._fetch_all(repos)
+
+        collected, marks = [], []
+        for task in tasks:
+            updates, event_ids = await self._task_updates(task, results)
+            collected.extend(updates)
+            marks.append((task['id'], event_ids))
+        updates = self._merge_updates(collected)
+
+        if not updates and summary is None:
+            self.logger.info(f"{email} 的 {len(tasks)} 个任务没有新的活动，不发送摘要邮件")
+            return 0
+        self.deliver(email, updates, digest=True, summary=summary)
+        self.logger.info(f"已将 {email} 的摘要邮件加入发件队列：{len(tasks)} 个任务，{len(updates)} 个仓库")
+        if self.ledger is not None:
+            await self._mark_sent(marks)
+        return len(updates)
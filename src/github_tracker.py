@@ -1,7 +1,8 @@
 import os
 import json
+import asyncio
 from datetime import datetime, timedelta
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Tuple, Optional
 from github import Github
 from pathlib import Path
 from dotenv import load_dotenv
@@ -13,25 +14,71 @@ from .llm.zhipu_client import ZhipuLLM
 class GitHubTracker:
     """GitHub 数据追踪器"""
     
-    def __init__(self, token: str, base_dir: Path):
+    def __init__(self, token: str, base_dir: Path, llm: Optional[BaseLLM] = None,
+                 vector_index: Optional[Any] = None, dedupe_threshold: float = 0.9):
         """
         初始化 GitHub 追踪器
         
         Args:
             token: GitHub API 访问令牌
             base_dir: 项目根目录
+            llm: 共享的LLM实例，未提供时在首次翻译时创建
+            vector_index: 仓库向量索引，提供时收录热门仓库并合并近似重复的仓库
+            dedupe_threshold: 判定为近似重复的相似度
         """
         self.github = Github(token)
         self.github_token = token  # 保存token
         self.languages = ["python", "java"]
         self.base_dir = base_dir
         self.data_dir = base_dir / "data"
+        self._llm = llm
+        self.vector_index = vector_index
+        self.dedupe_threshold = dedupe_threshold
         
-        # 初始化LLM客户端
-        config_path = base_dir / "config" / "model_config.yaml"
-        self.llm = ZhipuLLM(config_path)
+    @property
+    def llm(self) -> BaseLLM:
+        """LLM客户端，只在需要翻译时才创建"""
+        if self._llm is None:
+            self._llm = ZhipuLLM(self.base_dir / "config" / "model_config.yaml")
+        return self._llm
         
-    def get_trending_repositories(self, should_translate: bool = False) -> List[Dict[str, Any]]:
+    def _search_trending(self) -> List[Dict[str, Any]]:
+        """搜索各语言的热门仓库，收录到向量索引并合并近似重复的仓库（阻塞调用）"""
+        trending_repos = []
+        for language in self.languages:
+            # 搜索过去一周内创建的，按照星标数排序的特定语言仓库
+            created_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
+            query = f"language:{language} created:>{created_date}"
+            repos = self.github.search_repositories(query=query, sort="stars", order="desc")
+            
+            # 获取每种语言的前5个仓库
+            count = 0
+            for repo in repos:
+                if count >= 5:  # 每种语言取前5个，总共10个
+                    break
+                    
+                repo_data = {
+                    "name": repo.full_name,
+                    "description": repo.description,
+                    "stars": repo.stargazers_count,
+                    "forks": repo.forks_count,
+                    "url": repo.html_url,
+                    "language": repo.language,
+                    "updated_at": repo.updated_at
+                }
+                trending_repos.append(repo_data)
+                count += 1
+                
+        # 收录到向量索引，并在翻译前合并近似重复的仓库
+        if self.vector_index is not None:
+            try:
+                self.vector_index.upsert(trending_repos)
+                trending_repos = self.vector_index.dedupe(trending_repos, self.dedupe_threshold)
+            except Exception as e:
+                logging.error(f"更新仓库向量索引时出错: {str(e)}")
+        return trending_repos
+        
+    async def get_trending_repositories(self, should_translate: bool = False) -> List[Dict[str, Any]]:
         """
         获取热门仓库
         
@@ -39,43 +86,20 @@ class GitHubTracker:
             should_translate: 是否翻译仓库名称和描述，默认为False
         """
         try:
-            trending_repos = []
+            # 搜索分页和向量索引更新都是阻塞操作，放到线程池中执行，避免阻塞事件循环
+            trending_repos = await asyncio.to_thread(self._search_trending)
             items_to_translate = []  # 存储需要翻译的项目名称和描述
             
-            for language in self.languages:
-                # 搜索过去一周内创建的，按照星标数排序的特定语言仓库
-                created_date = (datetime.now() - timedelta(days=7)).strftime("%Y-%m-%d")
-                query = f"language:{language} created:>{created_date}"
-                repos = self.github.search_repositories(query=query, sort="stars", order="desc")
-                
-                # 获取每种语言的前5个仓库
-                count = 0
-                for repo in repos:
-                    if count >= 5:  # 每种语言取前5个，总共10个
-                        break
-                        
-                    # 将需要翻译的文本添加到列表中
-                    if should_translate:
-                        items_to_translate.append((
-                            repo.name,  # 仓库名称
-                            repo.description or ""  # 仓库描述，如果为None则使用空字符串
-                        ))
-                    
-                    repo_data = {
-                        "name": repo.full_name,
-                        "description": repo.description,
-                        "stars": repo.stargazers_count,
-                        "forks": repo.forks_count,
-                        "url": repo.html_url,
-                        "language": repo.language,
-                        "updated_at": repo.updated_at
-                    }
-                    trending_repos.append(repo_data)
-                    count += 1
+            # 将需要翻译的文本添加到列表中
+            if should_translate:
+                items_to_translate = [
+                    (repo_data["name"].split("/")[-1], repo_data["description"] or "")
+                    for repo_data in trending_repos
+                ]
             
             # 批量翻译
             if should_translate and items_to_translate:
-                translations = self.llm.batch_translate(items_to_translate)
+                translations = await self.llm.batch_translate(items_to_translate)
                 
                 # 将翻译结果添加到仓库数据中
                 for repo_data, (name_zh, desc_zh) in zip(trending_repos, translations):
@@ -107,7 +131,7 @@ class GitHubTracker:
                         "stars": repo["stars"],
                         "url": repo["url"],
                         "language": repo["language"]
-                    } for repo in self.get_trending_repositories()]
+                    } for repo in asyncio.run(self.get_trending_repositories())]
                 }
             }
             
@@ -201,15 +225,15 @@ class GitHubTracker:
             logging.error(f"搜索GitHub仓库时出错: {str(e)}")
             raise
 
-    def get_repository_details(self, repo_full_name: str) -> Dict[str, Any]:
+    def fetch_repository_details(self, repo_full_name: str) -> Optional[Dict[str, Any]]:
         """
-        获取指定仓库的详细信息
+        获取指定仓库的详细信息，失败时返回 None
         
         Args:
             repo_full_name: 仓库全名，格式为 "owner/repo"
             
         Returns:
-            Dict[str, Any]: 仓库详情
+            Optional[Dict[str, Any]]: 仓库详情，仓库不存在或请求失败（如触发限流）时为 None
         """
         try:
             # 通过PyGitHub库获取仓库信息
@@ -227,16 +251,32 @@ class GitHubTracker:
             }
         except Exception as e:
             logging.error(f"获取仓库 {repo_full_name} 详情时出错: {str(e)}")
-            # 出错时返回基本信息
-            return {
-                "name": repo_full_name.split('/')[-1],
-                "full_name": repo_full_name,
-                "description": "",
-                "stars": 0,
-                "forks": 0,
-                "updated_at": datetime.now().isoformat(),
-                "url": f"https://github.com/{repo_full_name}"
-            }
+            return None
+
+    @staticmethod
+    def placeholder_details(repo_full_name: str) -> Dict[str, Any]:
+        """获取详情失败时用于展示的基本信息，不应写入向量索引等持久化数据"""
+        return {
+            "name": repo_full_name.split('/')[-1],
+            "full_name": repo_full_name,
+            "description": "",
+            "stars": 0,
+            "forks": 0,
+            "updated_at": datetime.now().isoformat(),
+            "url": f"https://github.com/{repo_full_name}"
+        }
+
+    def get_repository_details(self, repo_full_name: str) -> Dict[str, Any]:
+        """
+        获取指定仓库的详细信息，出错时返回基本信息
+        
+        Args:
+            repo_full_name: 仓库全名，格式为 "owner/repo"
+            
+        Returns:
+            Dict[str, Any]: 仓库详情
+        """
+        return self.fetch_repository_details(repo_full_name) or self.placeholder_details(repo_full_name)
 
     @classmethod
     def main(cls):
@@ -1,9 +1,10 @@
-from typing import Dict, Any, List, Optional
+import asyncio
+from typing import Dict, Any, List, Optional, Awaitable, Callable
 from pathlib import Path
-import yaml
 from github import Github
 from ..utils.rate_limiter import RateLimiter
 from ..utils.cache import CacheManager
+from ..utils.config_loader import load_yaml_config
 
 class BaseGitHubClient:
     """GitHub客户端基类"""
@@ -38,8 +39,7 @@ class BaseGitHubClient:
         Returns:
             Dict[str, Any]: 配置信息
         """
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+        return load_yaml_config(config_path)
             
     def _make_request(self, cache_key: str, request_func: callable) -> Any:
         """
@@ -66,4 +66,28 @@ class BaseGitHubClient:
         # 缓存结果
         self.cache.set(cache_key, result)
         
-        return result 
\ No newline at end of file
+        return result
+        
+    async def _make_request_async(self, cache_key: str, request_func: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        执行异步API请求，包含缓存和速率限制
+        
+        Args:
+            cache_key: 缓存键名
+            request_func: 返回协程的请求函数
+            
+        Returns:
+            Any: 请求结果
+        """
+        cached_data = self.cache.get(cache_key)
+        if cached_data is not None:
+            return cached_data
+            
+        # 速率限制可能需要等待，放到线程中执行以免阻塞事件循环
+        await asyncio.to_thread(self.rate_limiter.wait)
+        
+        result = await request_func()
+        
+        self.cache.set(cache_key, result)
+        
+        return result
@@ -1,11 +1,29 @@
+import json
+import time
+import asyncio
+import logging
+from contextvars import ContextVar
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, AsyncIterator
 from pathlib import Path
-import yaml
+from ..utils.config_loader import load_yaml_config
+from ..utils.token_counter import estimate_tokens
+from .translation_cache import TranslationCache
+from .result_cache import LLMResultCache
+from .prompt_registry import prompt_registry
+from .llm_metrics import llm_metrics, llm_call_site
+
+# 服务客户端在 _call_model 中上报的 token 用量，供 _invoke 记录
+_reported_usage: ContextVar[Optional[Tuple[int, int]]] = ContextVar("llm_reported_usage", default=None)
+# 最近一次调用实际作答的模型，经路由调用时可能不是路由的首选模型
+_answered_model: ContextVar[Optional[str]] = ContextVar("llm_answered_model", default=None)
 
 class BaseLLM(ABC):
     """LLM基类"""
     
+    # 调用统计中的服务名称，为 None 时不记录（如路由本身）
+    provider: Optional[str] = "llm"
+    
     def __init__(self, config_path: Path):
         """
         初始化LLM客户端
@@ -16,17 +34,71 @@ class BaseLLM(ABC):
         self.config = self._load_config(config_path)
         self.model_config = self.config.get('llm', {})
         self.prompt_dir = Path(__file__).parent.parent / 'prompt_engineering'
+        self.base_dir = Path(config_path).parent.parent
+        self.logger = logging.getLogger(__name__)
+        self._translation_cache: Optional[TranslationCache] = None
+        self._result_cache: Optional[LLMResultCache] = None
+        # 正在生成中的提示词，相同提示词的并发请求共享同一次调用
+        self._inflight: Dict[str, asyncio.Task] = {}
+        llm_metrics.configure(self.model_config.get('pricing'))
+        
+    @property
+    def translation_cache(self) -> Optional[TranslationCache]:
+        """翻译结果缓存，配置中关闭时返回 None"""
+        cache_config = self.model_config.get('translation_cache', {})
+        if not cache_config.get('enabled', True):
+            return None
+        if self._translation_cache is None:
+            storage = self.config.get('storage', {})
+            cache_dir = self.base_dir / storage.get('base_dir', 'data') / storage.get('cache_dir', 'cache')
+            self._translation_cache = TranslationCache(
+                cache_dir / "translations.sqlite3",
+                max_entries=cache_config.get('max_entries', 20000)
+            )
+        return self._translation_cache
+        
+    @property
+    def result_cache(self) -> Optional[LLMResultCache]:
+        """生成结果缓存，配置中关闭时返回 None"""
+        cache_config = self.model_config.get('result_cache', {})
+        if not cache_config.get('enabled', True):
+            return None
+        if self._result_cache is None:
+            storage = self.config.get('storage', {})
+            cache_dir = self.base_dir / storage.get('base_dir', 'data') / storage.get('cache_dir', 'cache')
+            self._result_cache = LLMResultCache(
+                cache_dir / "llm_results.sqlite3",
+                max_entries=cache_config.get('max_entries', 2000),
+                ttl=cache_config.get('ttl', 21600)
+            )
+        return self._result_cache
+        
+    def cache_params(self) -> Dict[str, Any]:
+        """影响生成结果的调用参数，参与结果缓存键的计算"""
+        return {}
+        
+    def cache_models(self) -> List[str]:
+        """可能作答的模型，按优先顺序排列，按模型区分的缓存依次查找"""
+        return [getattr(self, 'model', '')]
+        
+    def answered_model(self) -> str:
+        """当前上下文中最近一次调用实际作答的模型，用作按模型区分的缓存的键"""
+        return _answered_model.get() or getattr(self, 'model', '')
+        
+    def _result_key(self, prompt: str) -> str:
+        return LLMResultCache.make_key(getattr(self, 'model', type(self).__name__), self.cache_params(), prompt)
         
     def _load_config(self, config_path: Path) -> Dict[str, Any]:
         """加载配置文件"""
-        with open(config_path, 'r', encoding='utf-8') as f:
-            return yaml.safe_load(f)
+        return load_yaml_config(config_path)
             
     def _load_prompt(self, template_name: str) -> str:
-        """加载提示词模板"""
-        template_path = self.prompt_dir / f"{template_name}.txt"
-        with open(template_path, 'r', encoding='utf-8') as f:
-            return f.read().strip()
+        """从模板注册表获取提示词模板"""
+        return prompt_registry.get(template_name)
+        
+    async def close(self) -> None:
+        """释放长连接等资源，应用关闭时调用"""
+        pass
             
     @abstractmethod
     async def _call_model(self, prompt: str) -> str:
@@ -40,6 +112,163 @@ class BaseLLM(ABC):
             str: 模型返回的文本
         """
         pass
+        
+    async def _stream_model(self, prompt: str) -> AsyncIterator[str]:
+        """
+        以流式方式调用模型，逐段返回生成的文本
+        
+        默认实现一次性返回完整结果，支持流式输出的客户端应覆盖此方法。
+        
+        Args:
+            prompt: 提示词
+            
+        Yields:
+            str: 新生成的文本片段
+        """
+        yield await self._call_model(prompt)
+            
+    def _report_usage(self, prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        """服务客户端上报接口返回的 token 用量，未上报时按文本估算"""
+        if prompt_tokens is not None and completion_tokens is not None:
+            _reported_usage.set((prompt_tokens, completion_tokens))
+            
+    def _report_answer(self, model: str) -> None:
+        """记录实际作答的模型，供调用方按模型写入缓存"""
+        _answered_model.set(model)
+            
+    def _record(self, prompt: str, completion: str, started: float, error: bool = False) -> None:
+        """记录一次模型调用的耗时、token 数和结果"""
+        if self.provider is None:
+            return
+        usage = _reported_usage.get()
+        if usage is None:
+            usage = (estimate_tokens(prompt), estimate_tokens(completion))
+        llm_metrics.record(
+            self.provider, getattr(self, 'model', ''), time.monotonic() - started,
+            prompt_tokens=usage[0], completion_tokens=usage[1], error=error
+        )
+        
+    async def _invoke(self, prompt: str) -> str:
+        """
+        调用模型并记录调用统计，内部调用模型时应使用此方法而不是直接调用 _call_model
+        
+        Args:
+            prompt: 提示词
+            
+        Returns:
+            str: 模型返回的文本
+        """
+        started = time.monotonic()
+        _reported_usage.set(None)
+        _answered_model.set(None)
+        try:
+            result = await self._call_model(prompt)
+        except Exception:
+            self._record(prompt, "", started, error=True)
+            raise
+        self._record(prompt, result or "", started)
+        if self.provider is not None:
+            self._report_answer(getattr(self, 'model', ''))
+        return result
+        
+    async def _invoke_stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        流式调用模型并在结束后记录调用统计
+        
+        Args:
+            prompt: 提示词
+            
+        Yields:
+            str: 新生成的文本片段
+        """
+        started = time.monotonic()
+        _reported_usage.set(None)
+        _answered_model.set(None)
+        chunks = []
+        try:
+            async for chunk in self._stream_model(prompt):
+                chunks.append(chunk)
+                yield chunk
+        except Exception:
+            self._record(prompt, "".join(chunks), started, error=True)
+            raise
+        self._record(prompt, "".join(chunks), started)
+        if self.provider is not None:
+            self._report_answer(getattr(self, 'model', ''))
+        
+    async def _invoke_answered(self, prompt: str) -> Tuple[str, str]:
+        """调用模型，返回结果和实际作答的模型"""
+        result = await self._invoke(prompt)
+        return result, self.answered_model()
+        
+    async def generate(self, prompt: str) -> str:
+        """
+        调用模型生成文本，相同的模型、参数和提示词在缓存有效期内只调用一次模型
+        
+        Args:
+            prompt: 提示词
+            
+        Returns:
+            str: 模型返回的文本
+        """
+        result, _ = await self.generate_answered(prompt)
+        return result
+        
+    async def generate_answered(self, prompt: str) -> Tuple[str, str]:
+        """
+        与 generate 相同，同时返回实际作答的模型，供调用方按模型写入自己的缓存
+        
+        Args:
+            prompt: 提示词
+            
+        Returns:
+            Tuple[str, str]: 模型返回的文本和作答的模型
+        """
+        cache = self.result_cache
+        if cache is None:
+            return await self._invoke_answered(prompt)
+            
+        key = self._result_key(prompt)
+        cached = cache.get(key)
+        if cached is not None:
+            self.logger.info("命中模型结果缓存")
+            return cached
+            
+        # 同一事件循环中相同提示词的并发请求等待同一次调用
+        task = self._inflight.get(key)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._invoke_answered(prompt))
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._inflight.pop(key, None) if self._inflight.get(key) is t else None)
+        result, model = await asyncio.shield(task)
+        cache.set(key, result, model)
+        return result, model
+        
+    async def generate_stream(self, prompt: str) -> AsyncIterator[str]:
+        """
+        以流式方式生成文本，命中缓存时一次性返回缓存结果，完整生成后写入缓存
+        
+        Args:
+            prompt: 提示词
+            
+        Yields:
+            str: 新生成的文本片段
+        """
+        cache = self.result_cache
+        key = self._result_key(prompt) if cache is not None else None
+        if cache is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                self.logger.info("命中模型结果缓存")
+                yield cached[0]
+                return
+                
+        chunks = []
+        async for chunk in self._invoke_stream(prompt):
+            chunks.append(chunk)
+            yield chunk
+        if cache is not None:
+            cache.set(key, "".join(chunks), self.answered_model())
             
     async def translate(self, text: str, from_lang: str = "en", to_lang: str = "zh") -> str:
         """
@@ -62,7 +291,8 @@ class BaseLLM(ABC):
             from_lang=from_lang,
             to_lang=to_lang
         )
-        return await self._call_model(prompt)
+        with llm_call_site("translate"):
+            return await self._invoke(prompt)
         
     async def summarize(self, text: str) -> str:
         """
@@ -79,7 +309,8 @@ class BaseLLM(ABC):
             
         template = self._load_prompt("summarize")
         prompt = template.format(text=text)
-        return await self._call_model(prompt)
+        with llm_call_site("summarize"):
+            return await self.generate(prompt)
         
     async def batch_translate(self, items: List[Tuple[str, str]], from_lang: str = "en", to_lang: str = "zh") -> List[Tuple[str, str]]:
         """
@@ -96,49 +327,206 @@ class BaseLLM(ABC):
         if not items:
             return []
             
-        # 构建批量翻译的提示词
-        texts = []
-        for i, (name, desc) in enumerate(items, 1):
+        with llm_call_site("batch_translate"):
+            return await self._batch_translate(items, from_lang, to_lang)
+            
+    async def _batch_translate(self, items: List[Tuple[str, str]], from_lang: str, to_lang: str) -> List[Tuple[str, str]]:
+        """先查翻译缓存，只把未命中的文本交给模型翻译"""
+        cache = self.translation_cache
+        if cache is None:
+            return await self._translate_items(items, from_lang, to_lang)
+            
+        texts = [text for item in items for text in item if text]
+        # 译文按实际作答的模型保存，依次查找各模型的缓存
+        cached = {}
+        for model in self.cache_models():
+            remaining = [text for text in texts if text not in cached]
+            if not remaining:
+                break
+            cached.update(cache.lookup(remaining, from_lang, to_lang, model))
+        
+        miss_indexes = []
+        miss_items = []
+        for i, (name, desc) in enumerate(items):
+            name_miss = name if name and name not in cached else ""
+            desc_miss = desc if desc and desc not in cached else ""
+            if name_miss or desc_miss:
+                miss_indexes.append(i)
+                miss_items.append((name_miss, desc_miss))
+                
+        translated = dict(cached)
+        if miss_items:
+            answered: Dict[int, str] = {}
+            miss_translations = await self._translate_items(miss_items, from_lang, to_lang, answered)
+            new_entries: Dict[str, Dict[str, str]] = {}
+            for i, ((name, desc), (name_zh, desc_zh)) in enumerate(zip(miss_items, miss_translations)):
+                entries = new_entries.setdefault(answered.get(i, self.answered_model()), {})
+                if name and name_zh:
+                    entries[name] = name_zh
+                if desc and desc_zh:
+                    entries[desc] = desc_zh
+            for model, entries in new_entries.items():
+                cache.save(entries, from_lang, to_lang, model)
+                translated.update(entries)
+            
+        stats = cache.stats()
+        self.logger.info(
+            f"翻译缓存命中 {len(cached)}/{len(set(texts))} 条，累计命中率 {stats['hit_rate']:.1%}"
+        )
+        
+        # 按原顺序合并缓存结果和新翻译结果
+        return [
+            (translated.get(name) if name else None, translated.get(desc) if desc else None)
+            for name, desc in items
+        ]
+        
+    async def _translate_items(self, items: List[Tuple[str, str]], from_lang: str, to_lang: str,
+                               answered: Optional[Dict[int, str]] = None) -> List[Tuple[str, str]]:
+        """
+        调用模型批量翻译文本
+        
+        按 token 预算将文本切分成多个分块并发翻译，要求模型按项目编号返回JSON，
+        校验失败的项目单独重试。
+        
+        Args:
+            items: 要翻译的文本列表，每个元素是(name, description)元组
+            from_lang: 源语言
+            to_lang: 目标语言
+            answered: 可选，填入翻译成功的项目位置到实际作答模型的映射
+            
+        Returns:
+            List[Tuple[str, str]]: 翻译后的文本列表
+        """
+        batch_config = self.model_config.get('batch_translate', {})
+        chunk_tokens = batch_config.get('chunk_tokens', 450)
+        semaphore = asyncio.Semaphore(batch_config.get('max_concurrency', 4))
+        max_retries = batch_config.get('max_retries', 2)
+        
+        # 以输入位置作为项目编号，空文本不参与翻译
+        entries = {}
+        for i, (name, desc) in enumerate(items):
+            entry = {}
             if name:
-                texts.append(f"项目{i}名称: {name}")
+                entry["name"] = name
             if desc:
-                texts.append(f"项目{i}描述: {desc}")
+                entry["description"] = desc
+            if entry:
+                entries[str(i + 1)] = entry
                 
-        if not texts:
+        if not entries:
             return [(None, None)] * len(items)
             
-        template = self._load_prompt("translate")
-        prompt = template.format(
-            text="\n".join(texts),
-            from_lang=from_lang,
-            to_lang=to_lang
-        )
+        chunks = self._split_chunks(entries, chunk_tokens)
+        results = await asyncio.gather(*(
+            self._translate_chunk(chunk, from_lang, to_lang, semaphore, max_retries)
+            for chunk in chunks
+        ))
         
-        # 调用模型获取翻译结果
-        response = await self._call_model(prompt)
+        translated = {}
+        for result, models in results:
+            translated.update(result)
+            if answered is not None:
+                answered.update({int(item_id) - 1: model for item_id, model in models.items()})
+            
+        return [
+            (translated.get(str(i + 1), {}).get("name"), translated.get(str(i + 1), {}).get("description"))
+            for i in range(len(items))
+        ]
         
-        # 解析翻译结果
-        translations = []
-        current_item = {"name": None, "desc": None}
+    @staticmethod
+    def _split_chunks(entries: Dict[str, Dict[str, str]], chunk_tokens: int) -> List[Dict[str, Dict[str, str]]]:
+        """按估算的 token 数切分待翻译项目，单个超出预算的项目独占一个分块"""
+        chunks = []
+        current = {}
+        current_tokens = 0
+        for item_id, entry in entries.items():
+            tokens = estimate_tokens(json.dumps({item_id: entry}, ensure_ascii=False))
+            if current and current_tokens + tokens > chunk_tokens:
+                chunks.append(current)
+                current = {}
+                current_tokens = 0
+            current[item_id] = entry
+            current_tokens += tokens
+        if current:
+            chunks.append(current)
+        return chunks
         
-        for line in response.split("\n"):
-            line = line.strip()
-            if not line:
-                continue
-                
-            if line.startswith("项目") and "名称:" in line:
-                if current_item["name"] is not None:
-                    translations.append((current_item["name"], current_item["desc"]))
-                    current_item = {"name": None, "desc": None}
-                current_item["name"] = line.split(":", 1)[1].strip()
-            elif line.startswith("项目") and "描述:" in line:
-                current_item["desc"] = line.split(":", 1)[1].strip()
+    async def _translate_chunk(self, chunk: Dict[str, Dict[str, str]], from_lang: str, to_lang: str,
+                               semaphore: asyncio.Semaphore, max_retries: int) -> Tuple[Dict[str, Dict[str, str]], Dict[str, str]]:
+        """
+        翻译一个分块，只重试未通过校验的项目
+        
+        Args:
+            chunk: 项目编号到待翻译字段的映射
+            from_lang: 源语言
+            to_lang: 目标语言
+            semaphore: 限制同时进行的模型请求数
+            max_retries: 最大重试次数
+            
+        Returns:
+            Tuple[Dict[str, Dict[str, str]], Dict[str, str]]: 通过校验的项目编号到译文字段的映射，
+            以及这些项目编号到实际作答模型的映射
+        """
+        template = self._load_prompt("batch_translate")
+        translated = {}
+        models = {}
+        pending = dict(chunk)
+        
+        for attempt in range(max_retries + 1):
+            if attempt:
+                llm_metrics.record_retry(self.provider or type(self).__name__, getattr(self, 'model', ''))
+            prompt = template.format(
+                items=json.dumps(pending, ensure_ascii=False, indent=1),
+                from_lang=from_lang,
+                to_lang=to_lang
+            )
+            try:
+                async with semaphore:
+                    response = await self._invoke(prompt)
+                valid = self._parse_translation_json(response, pending)
+                models.update(dict.fromkeys(valid, self.answered_model()))
+            except Exception as e:
+                self.logger.warning(f"翻译分块失败（第 {attempt + 1} 次）: {str(e)}")
+                valid = {}
                 
-        if current_item["name"] is not None or current_item["desc"] is not None:
-            translations.append((current_item["name"], current_item["desc"]))
+            translated.update(valid)
+            pending = {item_id: entry for item_id, entry in pending.items() if item_id not in valid}
+            if not pending:
+                break
+            self.logger.warning(f"{len(pending)} 个项目的翻译结果未通过校验，准备重试")
             
-        # 确保返回结果数量与输入一致
-        while len(translations) < len(items):
-            translations.append((None, None))
+        if pending:
+            self.logger.error(f"{len(pending)} 个项目在 {max_retries} 次重试后仍未翻译成功: {list(pending)}")
+        return translated, models
+        
+    @staticmethod
+    def _parse_translation_json(response: str, expected: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+        """
+        解析并校验模型返回的JSON翻译结果
+        
+        Args:
+            response: 模型返回的文本
+            expected: 本次请求的项目编号到待翻译字段的映射
+            
+        Returns:
+            Dict[str, Dict[str, str]]: 字段齐全的项目编号到译文字段的映射
+        """
+        # 兼容模型在JSON外包裹代码块或说明文字的情况
+        start, end = response.find("{"), response.rfind("}")
+        if start == -1 or end <= start:
+            return {}
+        try:
+            data = json.loads(response[start:end + 1])
+        except json.JSONDecodeError:
+            return {}
+        if not isinstance(data, dict):
+            return {}
             
-        return translations[:len(items)] 
\ No newline at end of file
+        valid = {}
+        for item_id, entry in expected.items():
+            result = data.get(item_id)
+            if not isinstance(result, dict):
+                continue
+            if all(isinstance(result.get(field), str) and result[field].strip() for field in entry):
+                valid[item_id] = {field: result[field].strip() for field in entry}
+        return valid
@@ -1,8 +1,11 @@
-from datetime import datetime, timedelta
-from typing import Dict, Any, List, Optional, Tuple
+import asyncio
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Any, List, Optional, Tuple, Callable, Iterable
 from pathlib import Path
 from .base import BaseGitHubClient
 from .base_llm import BaseLLM
+from .prompt_compactor import PromptCompactor
 
 class GitHubClient(BaseGitHubClient):
     """GitHub客户端"""
@@ -17,6 +20,7 @@ class GitHubClient(BaseGitHubClient):
         """
         super().__init__(config_path)
         self.llm = llm
+        self.compactor = PromptCompactor.from_config(llm.model_config, 'activity_summary_tokens')
         
     def get_repos_with_translation(self, repos: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
@@ -100,10 +104,84 @@ class GitHubClient(BaseGitHubClient):
             
         return self._make_request(f"tracked_repos_{','.join(repo_names)}", _get_repos)
         
-    def get_repo_activities_with_translation(self, repo_name: str, days: int = 7) -> Dict[str, Any]:
+    async def _fetch_and_translate(self, fetch: Callable[[], Iterable[Any]],
+                                   to_record: Callable[[Any], Optional[Dict[str, Any]]],
+                                   source_fields: Tuple[str, Optional[str]],
+                                   target_fields: Tuple[str, Optional[str]]) -> List[Dict[str, Any]]:
+        """
+        单次遍历分页列表构建记录，每凑满一批就开始翻译，翻译与后续分页的下载同时进行
+        
+        Args:
+            fetch: 返回分页列表的函数（在线程中遍历，分页按需下载）
+            to_record: 将 API 对象转换为记录，返回 None 时停止遍历
+            source_fields: 记录中要翻译的（标题, 正文）字段，正文字段可为 None
+            target_fields: 译文写入的（标题, 正文）字段
+            
+        Returns:
+            List[Dict[str, Any]]: 按原顺序排列、已填入译文的记录
+        """
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        stopped = threading.Event()
+        batch_size = self.config['github'].get('activity_batch_size', 30)
+        
+        def produce():
+            # 分页列表是同步迭代器，在线程中遍历，每凑满一批交给事件循环
+            batch = []
+            try:
+                for item in fetch():
+                    if stopped.is_set():
+                        break
+                    record = to_record(item)
+                    if record is None:
+                        break
+                    batch.append(record)
+                    if len(batch) >= batch_size:
+                        loop.call_soon_threadsafe(queue.put_nowait, batch)
+                        batch = []
+                if batch:
+                    loop.call_soon_threadsafe(queue.put_nowait, batch)
+            except Exception as e:
+                loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                loop.call_soon_threadsafe(queue.put_nowait, finished)
+                
+        producer = loop.run_in_executor(None, produce)
+        title_field, body_field = source_fields
+        batches = []
+        try:
+            while True:
+                batch = await queue.get()
+                if batch is finished:
+                    break
+                if isinstance(batch, Exception):
+                    raise batch
+                items = [(record[title_field], (record[body_field] if body_field else "") or "") for record in batch]
+                batches.append((batch, asyncio.ensure_future(self.llm.batch_translate(items))))
+                
+            records = []
+            title_zh_field, body_zh_field = target_fields
+            for batch, translation in batches:
+                for record, (title_zh, body_zh) in zip(batch, await translation):
+                    record[title_zh_field] = title_zh
+                    if body_zh_field:
+                        record[body_zh_field] = body_zh
+                    records.append(record)
+            return records
+        finally:
+            # 下载或翻译出错、调用方取消时停止遍历分页，并取消已开始的翻译，不留下无人等待的任务
+            stopped.set()
+            for _, translation in batches:
+                translation.cancel()
+            await asyncio.gather(producer, *(translation for _, translation in batches), return_exceptions=True)
+        
+    async def get_repo_activities_with_translation(self, repo_name: str, days: int = 7) -> Dict[str, Any]:
         """
         获取仓库活动，包含中文翻译和总结
         
+        每类活动的分页列表只下载一次，四类活动并发获取，翻译与下载重叠进行。
+        
         Args:
             repo_name: 仓库全名
             days: 获取最近几天的活动
@@ -111,148 +189,138 @@ class GitHubClient(BaseGitHubClient):
         Returns:
             Dict[str, Any]: 活动信息
         """
-        def _get_activities():
-            repo = self.github.get_repo(repo_name)
-            activities = {
-                "timestamp": datetime.now().isoformat(),
-                "activities": {
-                    "commits": [],
-                    "issues": [],
-                    "pull_requests": [],
-                    "releases": []
-                },
-                "summary": ""
-            }
-            
-            # 获取提交
-            commits_to_translate = []
-            for commit in repo.get_commits(since=datetime.now() - timedelta(days=days)):
-                commits_to_translate.append((
-                    commit.commit.message,
-                    ""  # 提交信息不需要描述
-                ))
-            
-            # 批量翻译提交信息
-            commit_translations = self.llm.batch_translate(commits_to_translate)
+        async def _get_activities():
+            repo = await asyncio.to_thread(self.github.get_repo, repo_name)
+            # PyGithub 返回带时区的时间，比较时使用 UTC 时间
+            since = datetime.now(timezone.utc) - timedelta(days=days)
             
-            for commit, (message_zh, _) in zip(repo.get_commits(since=datetime.now() - timedelta(days=days)), commit_translations):
-                commit_data = {
+            def commit_record(commit):
+                return {
                     "sha": commit.sha,
                     "message": commit.commit.message,
-                    "message_zh": message_zh,
+                    "message_zh": None,
                     "author": commit.commit.author.name,
                     "date": commit.commit.author.date.isoformat(),
                     "url": commit.html_url
                 }
-                activities["activities"]["commits"].append(commit_data)
                 
-            # 获取议题
-            issues_to_translate = []
-            for issue in repo.get_issues(state='all', since=datetime.now() - timedelta(days=days)):
-                issues_to_translate.append((
-                    issue.title,
-                    issue.body or ""
-                ))
-            
-            # 批量翻译议题
-            issue_translations = self.llm.batch_translate(issues_to_translate)
-            
-            for issue, (title_zh, body_zh) in zip(repo.get_issues(state='all', since=datetime.now() - timedelta(days=days)), issue_translations):
-                issue_data = {
+            def issue_record(issue):
+                return {
                     "number": issue.number,
                     "title": issue.title,
-                    "title_zh": title_zh,
+                    "title_zh": None,
                     "body": issue.body,
-                    "body_zh": body_zh,
+                    "body_zh": None,
                     "state": issue.state,
                     "created_at": issue.created_at.isoformat(),
                     "updated_at": issue.updated_at.isoformat(),
                     "url": issue.html_url
                 }
-                activities["activities"]["issues"].append(issue_data)
                 
-            # 获取PR
-            prs_to_translate = []
-            for pr in repo.get_pulls(state='all', sort='updated', direction='desc'):
-                if pr.updated_at < datetime.now() - timedelta(days=days):
-                    break
-                prs_to_translate.append((
-                    pr.title,
-                    pr.body or ""
-                ))
-            
-            # 批量翻译PR
-            pr_translations = self.llm.batch_translate(prs_to_translate)
-            
-            for pr, (title_zh, body_zh) in zip(repo.get_pulls(state='all', sort='updated', direction='desc'), pr_translations):
-                if pr.updated_at < datetime.now() - timedelta(days=days):
-                    break
-                pr_data = {
+            def pr_record(pr):
+                # PR 按更新时间倒序排列，早于起始时间时停止
+                if pr.updated_at < since:
+                    return None
+                return {
                     "number": pr.number,
                     "title": pr.title,
-                    "title_zh": title_zh,
+                    "title_zh": None,
                     "body": pr.body,
-                    "body_zh": body_zh,
+                    "body_zh": None,
                     "state": pr.state,
                     "created_at": pr.created_at.isoformat(),
                     "updated_at": pr.updated_at.isoformat(),
                     "url": pr.html_url
                 }
-                activities["activities"]["pull_requests"].append(pr_data)
                 
-            # 获取发布
-            releases_to_translate = []
-            for release in repo.get_releases():
-                if release.created_at < datetime.now() - timedelta(days=days):
-                    break
-                releases_to_translate.append((
-                    release.title,
-                    release.body or ""
-                ))
-            
-            # 批量翻译发布
-            release_translations = self.llm.batch_translate(releases_to_translate)
-            
-            for release, (title_zh, body_zh) in zip(repo.get_releases(), release_translations):
-                if release.created_at < datetime.now() - timedelta(days=days):
-                    break
-                release_data = {
+            def release_record(release):
+                if release.created_at < since:
+                    return None
+                return {
                     "tag": release.tag_name,
                     "name": release.title,
-                    "name_zh": title_zh,
+                    "name_zh": None,
                     "body": release.body,
-                    "body_zh": body_zh,
+                    "body_zh": None,
                     "date": release.created_at.isoformat(),
                     "url": release.html_url
                 }
-                activities["activities"]["releases"].append(release_data)
                 
-            # 生成总结
-            activities_text = f"""
-            最近{days}天的更新：
-            
-            提交：{len(activities['activities']['commits'])}个
-            议题：{len(activities['activities']['issues'])}个
-            PR：{len(activities['activities']['pull_requests'])}个
-            发布：{len(activities['activities']['releases'])}个
-            
-            主要更新内容：
+            streams = [asyncio.ensure_future(stream) for stream in (
+                self._fetch_and_translate(lambda: repo.get_commits(since=since), commit_record,
+                                          ("message", None), ("message_zh", None)),
+                self._fetch_and_translate(lambda: repo.get_issues(state='all', since=since), issue_record,
+                                          ("title", "body"), ("title_zh", "body_zh")),
+                self._fetch_and_translate(lambda: repo.get_pulls(state='all', sort='updated', direction='desc'),
+                                          pr_record, ("title", "body"), ("title_zh", "body_zh")),
+                self._fetch_and_translate(repo.get_releases, release_record,
+                                          ("name", "body"), ("name_zh", "body_zh")),
+            )]
+            try:
+                commits, issues, pull_requests, releases = await asyncio.gather(*streams)
+            finally:
+                # 一类活动获取失败时取消其余仍在进行的获取
+                for stream in streams:
+                    stream.cancel()
+                await asyncio.gather(*streams, return_exceptions=True)
             
-            1. 提交：
-            {chr(10).join(f'- {c["message"]}' for c in activities['activities']['commits'][:5])}
-            
-            2. 议题：
-            {chr(10).join(f'- {i["title"]}' for i in activities['activities']['issues'][:5])}
+            activities = {
+                "timestamp": datetime.now().isoformat(),
+                "activities": {
+                    "commits": commits,
+                    "issues": issues,
+                    "pull_requests": pull_requests,
+                    "releases": releases
+                },
+                "summary": ""
+            }
             
-            3. PR：
-            {chr(10).join(f'- {p["title"]}' for p in activities['activities']['pull_requests'][:5])}
+            # 生成总结
+            activities["summary"] = await self.llm.summarize(self._build_summary_text(activities["activities"], days))
             
-            4. 发布：
-            {chr(10).join(f'- {r["name"]}' for r in activities['activities']['releases'][:5])}
-            """
+            return activities
             
-            activities["summary"] = self.llm.summarize(activities_text)
+        return await self._make_request_async(f"activities_{repo_name.replace('/', '_')}_{days}", _get_activities)
+        
+    def _build_summary_text(self, activities: Dict[str, List[Dict[str, Any]]], days: int) -> str:
+        """
+        构建仓库活动总结的输入文本，活动经过去重、截断和取舍以控制 token 数
+        
+        Args:
+            activities: 按类型分组的活动
+            days: 统计的天数
             
-            return activities
+        Returns:
+            str: 总结输入文本
+        """
+        items = []
+        for commit in activities['commits']:
+            title, _, body = commit['message'].partition('\n')
+            items.append({"type": "Commit", "title": title, "description": body.strip(), "author": commit['author']})
+        for issue in activities['issues']:
+            items.append({"type": "Issue", "title": issue['title'], "description": issue['body']})
+        for pr in activities['pull_requests']:
+            items.append({"type": "Pull Request", "title": pr['title'], "description": pr['body']})
+        for release in activities['releases']:
+            items.append({"type": "Release", "title": release['name'] or release['tag'], "description": release['body']})
             
-        return self._make_request(f"activities_{repo_name}_{days}", _get_activities) 
\ No newline at end of file
+        compacted, _ = self.compactor.compact(items)
+        
+        sections = [("提交", "Commit"), ("议题", "Issue"), ("PR", "Pull Request"), ("发布", "Release")]
+        text = f"""最近{days}天的更新：
+
+提交：{len(activities['commits'])}个
+议题：{len(activities['issues'])}个
+PR：{len(activities['pull_requests'])}个
+发布：{len(activities['releases'])}个
+
+主要更新内容：
+"""
+        for number, (label, activity_type) in enumerate(sections, 1):
+            text += f"\n{number}. {label}：\n"
+            for item in compacted:
+                if item['type'] == activity_type:
+                    text += f"- {item['title']}\n"
+                    if item.get('description'):
+                        text += f"  {item['description']}\n"
+        return text
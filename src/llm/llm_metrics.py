@@ -0,0 +1,178 @@
+import threading
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# 当前 LLM 调用所属的功能或任务，嵌套时以冒号连接，例如 "daily_summary:hot_repos_summary"
+_call_site: ContextVar[str] = ContextVar("llm_call_site", default="")
+
+
+@contextmanager
+def llm_call_site(name: str) -> Iterator[None]:
+    """
+    标记代码块内 LLM 调用的来源，asyncio 任务和 to_thread 会继承该标记
+
+    Args:
+        name: 功能或任务名称
+    """
+    parent = _call_site.get()
+    token = _call_site.set(f"{parent}:{name}" if parent else name)
+    try:
+        yield
+    finally:
+        _call_site.reset(token)
+
+
+def current_call_site() -> str:
+    return _call_site.get() or "unknown"
+
+
+class _Rollup:
+    """单个 (调用来源, 服务, 模型) 组合的累计统计"""
+
+    def __init__(self, window: int):
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.latency_sum = 0.0
+        self.cost = 0.0
+        self.latencies = deque(maxlen=window)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+class LLMMetrics:
+    """LLM 调用统计
+
+    按调用来源、服务和模型累计调用次数、错误、重试、token 数、延迟和费用，
+    支持以 JSON 查询和以 Prometheus 文本格式导出。统计只在当前进程内有效。
+    """
+
+    def __init__(self, window: int = 500):
+        """
+        初始化调用统计
+
+        Args:
+            window: 计算延迟分位数时保留的最近调用次数
+        """
+        self.window = window
+        self.pricing: Dict[str, Dict[str, float]] = {}
+        self._rollups: Dict[Tuple[str, str, str], _Rollup] = {}
+        self._lock = threading.Lock()
+
+    def configure(self, pricing: Optional[Dict[str, Dict[str, float]]]) -> None:
+        """
+        设置各模型每千 token 的价格
+
+        Args:
+            pricing: 模型名到 {"prompt": 价格, "completion": 价格} 的映射
+        """
+        if pricing:
+            self.pricing = pricing
+
+    def _rollup(self, provider: str, model: str) -> _Rollup:
+        key = (current_call_site(), provider, model)
+        rollup = self._rollups.get(key)
+        if rollup is None:
+            rollup = self._rollups[key] = _Rollup(self.window)
+        return rollup
+
+    def record(self, provider: str, model: str, latency: float, prompt_tokens: int = 0,
+               completion_tokens: int = 0, error: bool = False) -> None:
+        """
+        记录一次模型调用
+
+        Args:
+            provider: 服务名称
+            model: 模型名称
+            latency: 耗时（秒）
+            prompt_tokens: 输入 token 数
+            completion_tokens: 输出 token 数
+            error: 调用是否失败
+        """
+        price = self.pricing.get(model, {})
+        with self._lock:
+            rollup = self._rollup(provider, model)
+            rollup.calls += 1
+            rollup.errors += int(error)
+            rollup.prompt_tokens += prompt_tokens
+            rollup.completion_tokens += completion_tokens
+            rollup.latency_sum += latency
+            rollup.latencies.append(latency)
+            rollup.cost += (prompt_tokens * price.get('prompt', 0.0)
+                            + completion_tokens * price.get('completion', 0.0)) / 1000
+
+    def record_retry(self, provider: str, model: str) -> None:
+        """记录一次重试（翻译校验失败重试、切换到其他服务等）"""
+        with self._lock:
+            self._rollup(provider, model).retries += 1
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """按总耗时从高到低返回各组合的统计"""
+        with self._lock:
+            rows = []
+            for (site, provider, model), rollup in self._rollups.items():
+                p50, p95 = rollup.percentile(0.5), rollup.percentile(0.95)
+                rows.append({
+                    "site": site,
+                    "provider": provider,
+                    "model": model,
+                    "calls": rollup.calls,
+                    "errors": rollup.errors,
+                    "retries": rollup.retries,
+                    "prompt_tokens": rollup.prompt_tokens,
+                    "completion_tokens": rollup.completion_tokens,
+                    "latency_total_s": round(rollup.latency_sum, 3),
+                    "latency_p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+                    "latency_p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+                    "cost": round(rollup.cost, 6),
+                })
+        return sorted(rows, key=lambda row: row['latency_total_s'], reverse=True)
+
+    @staticmethod
+    def _labels(site: str, provider: str, model: str, **extra: str) -> str:
+        def escape(value: str) -> str:
+            return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        labels = {"site": site, "provider": provider, "model": model, **extra}
+        return "{" + ",".join(f'{key}="{escape(str(value))}"' for key, value in labels.items()) + "}"
+
+    def prometheus(self) -> str:
+        """以 Prometheus 文本格式导出统计"""
+        counters = [
+            ("llm_calls_total", "LLM调用次数", "calls"),
+            ("llm_errors_total", "LLM调用失败次数", "errors"),
+            ("llm_retries_total", "LLM调用重试次数", "retries"),
+            ("llm_prompt_tokens_total", "输入token数", "prompt_tokens"),
+            ("llm_completion_tokens_total", "输出token数", "completion_tokens"),
+            ("llm_cost_total", "估算费用", "cost"),
+        ]
+        with self._lock:
+            items = list(self._rollups.items())
+            lines = []
+            for metric, help_text, attr in counters:
+                lines.append(f"# HELP {metric} {help_text}")
+                lines.append(f"# TYPE {metric} counter")
+                for key, rollup in items:
+                    lines.append(f"{metric}{self._labels(*key)} {getattr(rollup, attr)}")
+
+            lines.append("# HELP llm_latency_seconds LLM调用耗时")
+            lines.append("# TYPE llm_latency_seconds summary")
+            for key, rollup in items:
+                for q in (0.5, 0.95):
+                    value = rollup.percentile(q)
+                    if value is not None:
+                        lines.append(f"llm_latency_seconds{self._labels(*key, quantile=str(q))} {value}")
+                lines.append(f"llm_latency_seconds_sum{self._labels(*key)} {rollup.latency_sum}")
+                lines.append(f"llm_latency_seconds_count{self._labels(*key)} {rollup.calls}")
+        return "\n".join(lines) + "\n"
+
+
+# 进程内共享的调用统计
+llm_metrics = LLMMetrics()
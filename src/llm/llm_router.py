@@ -0,0 +1,256 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from .base_llm import BaseLLM
+from .llm_metrics import llm_metrics
+
+
+class ProviderStats:
+    """单个模型服务的滚动延迟与错误统计"""
+
+    def __init__(self, window: int = 50):
+        """
+        初始化统计
+
+        Args:
+            window: 滚动窗口内保留的调用次数
+        """
+        self.latencies = deque(maxlen=window)
+        self.outcomes = deque(maxlen=window)
+        self.consecutive_failures = 0
+        self.cooldown_until = 0.0
+
+    def record_success(self, latency: float) -> None:
+        self.latencies.append(latency)
+        self.outcomes.append(True)
+        self.consecutive_failures = 0
+
+    def record_abandoned(self, latency: float) -> None:
+        # 被对冲请求抢先的调用，已耗时作为延迟下限计入，避免慢服务永远没有样本
+        self.latencies.append(latency)
+
+    def record_failure(self, latency: float, failure_threshold: int, cooldown: float) -> None:
+        self.outcomes.append(False)
+        self.consecutive_failures += 1
+        # 连续失败达到阈值后暂时摘除该服务
+        if self.consecutive_failures >= failure_threshold:
+            self.cooldown_until = time.monotonic() + cooldown
+
+    def is_available(self) -> bool:
+        return time.monotonic() >= self.cooldown_until
+
+    def percentile(self, q: float) -> Optional[float]:
+        """计算延迟分位数（秒），无数据时返回 None"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    @property
+    def error_rate(self) -> float:
+        if not self.outcomes:
+            return 0.0
+        return self.outcomes.count(False) / len(self.outcomes)
+
+    def snapshot(self) -> Dict[str, Any]:
+        p50, p95 = self.percentile(0.5), self.percentile(0.95)
+        return {
+            "calls": len(self.outcomes),
+            "p50_ms": round(p50 * 1000, 1) if p50 is not None else None,
+            "p95_ms": round(p95 * 1000, 1) if p95 is not None else None,
+            "error_rate": round(self.error_rate, 4),
+            "available": self.is_available(),
+        }
+
+
+class LLMRouter(BaseLLM):
+    """多模型服务路由
+
+    根据滚动延迟和错误率选择模型服务，失败时自动切换到下一个服务；
+    可选地在主请求超过期限后向本地 Ollama 发出对冲请求，取先返回的结果。
+    调用统计由各服务自行记录，路由本身不重复记录。
+    model 为首选服务的模型，实际作答的模型通过 answered_model 获取。
+    """
+
+    provider = None
+
+    def __init__(self, config_path: Path, providers: Optional[Dict[str, BaseLLM]] = None):
+        """
+        初始化路由
+
+        Args:
+            config_path: 配置文件路径
+            providers: 服务名到LLM实例的映射，未提供时按配置创建
+        """
+        super().__init__(config_path)
+        self.logger = logging.getLogger(__name__)
+
+        router_config = self.model_config.get('router', {})
+        self.window = router_config.get('window', 50)
+        self.failure_threshold = router_config.get('failure_threshold', 3)
+        self.cooldown = router_config.get('cooldown_seconds', 60)
+        self.latency_prior = router_config.get('latency_prior_seconds', 5.0)
+        self.error_penalty = router_config.get('error_penalty', 4.0)
+
+        hedge_config = router_config.get('hedge', {})
+        self.hedge_enabled = hedge_config.get('enabled', False)
+        self.hedge_after = hedge_config.get('after_seconds', 8.0)
+        self.hedge_provider = hedge_config.get('provider', 'ollama')
+
+        if providers is None:
+            default = self.model_config.get('default', 'zhipu')
+            names = router_config.get('providers') or [default]
+            providers = {name: self._create_provider(name, config_path) for name in names}
+        self.providers = providers
+        self.order = list(providers)
+        self.stats = {name: ProviderStats(self.window) for name in providers}
+        self.model = getattr(providers[self.order[0]], 'model', self.order[0])
+
+    @staticmethod
+    def _create_provider(name: str, config_path: Path) -> BaseLLM:
+        """按名称创建模型服务客户端"""
+        if name == 'zhipu':
+            from .zhipu_client import ZhipuLLM
+            return ZhipuLLM(config_path)
+        if name == 'ollama':
+            from .ollama_client import OllamaAI
+            return OllamaAI(config_path)
+        raise ValueError(f"未知的LLM服务: {name}")
+
+    def _ranked(self) -> List[str]:
+        """按得分排序可用的服务，全部不可用时退回到全部服务"""
+        def score(name: str):
+            stats = self.stats[name]
+            p50 = stats.percentile(0.5)
+            latency = p50 if p50 is not None else self.latency_prior
+            return (latency * (1 + self.error_penalty * stats.error_rate), self.order.index(name))
+
+        available = [name for name in self.order if self.stats[name].is_available()]
+        return sorted(available or self.order, key=score)
+
+    async def _timed_call(self, name: str, prompt: str) -> str:
+        """调用指定服务并记录延迟和结果"""
+        start = time.monotonic()
+        try:
+            result = await self.providers[name]._invoke(prompt)
+        except asyncio.CancelledError:
+            self.stats[name].record_abandoned(time.monotonic() - start)
+            raise
+        except Exception:
+            self.stats[name].record_failure(time.monotonic() - start, self.failure_threshold, self.cooldown)
+            raise
+        self.stats[name].record_success(time.monotonic() - start)
+        return result
+
+    async def _hedged_call(self, name: str, prompt: str) -> Tuple[str, str]:
+        """主请求超过期限仍未返回时，向对冲服务再发一次请求，取先成功的结果，同时返回作答的服务"""
+        hedge = self.hedge_provider
+        if (not self.hedge_enabled or hedge == name or hedge not in self.providers
+                or not self.stats[hedge].is_available()):
+            return name, await self._timed_call(name, prompt)
+
+        primary = asyncio.ensure_future(self._timed_call(name, prompt))
+        done, _ = await asyncio.wait({primary}, timeout=self.hedge_after)
+        if done:
+            return name, primary.result()
+
+        self.logger.info(f"{name} 超过 {self.hedge_after} 秒未返回，向 {hedge} 发出对冲请求")
+        owners = {primary: name, asyncio.ensure_future(self._timed_call(hedge, prompt)): hedge}
+        pending = set(owners)
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return owners[task], task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def _call_model(self, prompt: str) -> str:
+        """
+        按路由策略调用模型，失败时依次切换到其他服务
+
+        Args:
+            prompt: 提示词
+
+        Returns:
+            str: 模型返回的文本
+        """
+        last_error: Optional[Exception] = None
+        for attempt, name in enumerate(self._ranked()):
+            if attempt:
+                llm_metrics.record_retry(name, getattr(self.providers[name], 'model', name))
+            try:
+                answered, result = await self._hedged_call(name, prompt)
+            except Exception as e:
+                last_error = e
+                self.logger.warning(f"LLM服务 {name} 调用失败，尝试下一个服务: {str(e)}")
+                continue
+            # 对冲请求在独立的任务中运行，由路由记录实际作答的模型
+            self._report_answer(self._provider_model(answered))
+            return result
+        raise last_error
+
+    async def _stream_model(self, prompt: str) -> AsyncIterator[str]:
+        """
+        按路由策略流式调用模型，尚未输出任何内容前失败时切换到其他服务
+
+        Args:
+            prompt: 提示词
+
+        Yields:
+            str: 新生成的文本片段
+        """
+        last_error: Optional[Exception] = None
+        for attempt, name in enumerate(self._ranked()):
+            if attempt:
+                llm_metrics.record_retry(name, getattr(self.providers[name], 'model', name))
+            start = time.monotonic()
+            started = False
+            try:
+                async for chunk in self.providers[name]._invoke_stream(prompt):
+                    if not started:
+                        # 流式调用以首个片段的到达时间作为延迟
+                        self.stats[name].record_success(time.monotonic() - start)
+                        started = True
+                    yield chunk
+                self._report_answer(self._provider_model(name))
+                return
+            except Exception as e:
+                if started:
+                    raise
+                self.stats[name].record_failure(time.monotonic() - start, self.failure_threshold, self.cooldown)
+                last_error = e
+                self.logger.warning(f"LLM服务 {name} 流式调用失败，尝试下一个服务: {str(e)}")
+        raise last_error
+
+    def _provider_model(self, name: str) -> str:
+        return getattr(self.providers[name], 'model', name)
+
+    def cache_models(self) -> List[str]:
+        """各服务的模型，按配置顺序排列"""
+        return list(dict.fromkeys(self._provider_model(name) for name in self.order))
+
+    def cache_params(self) -> Dict[str, Any]:
+        """各服务的模型和调用参数，任何一个变化都会使缓存失效"""
+        return {
+            name: {"model": getattr(provider, 'model', name), **provider.cache_params()}
+            for name, provider in self.providers.items()
+        }
+
+    def provider_stats(self) -> Dict[str, Dict[str, Any]]:
+        """各服务的 p50/p95 延迟、错误率和可用状态"""
+        return {name: self.stats[name].snapshot() for name in self.order}
+
+    async def close(self) -> None:
+        """关闭所有服务的连接"""
+        for provider in self.providers.values():
+            await provider.close()
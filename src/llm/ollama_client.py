@@ -1,12 +1,15 @@
+import json
 import aiohttp
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional, AsyncIterator
 from pathlib import Path
 from .base_llm import BaseLLM
 
 class OllamaAI(BaseLLM):
     """Ollama客户端"""
     
+    provider = "ollama"
+    
     def __init__(self, config_path: Path):
         """
         初始化Ollama客户端
@@ -18,6 +21,20 @@ class OllamaAI(BaseLLM):
         self.base_url = self.model_config['ollama'].get('base_url', 'http://localhost:11434')
         self.model = self.model_config['ollama'].get('model', 'llama2')
         self.logger = logging.getLogger(__name__)
+        self._session: Optional[aiohttp.ClientSession] = None
+        
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取长期复用的会话，连接池保持 keep-alive"""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=10, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector)
+        return self._session
+        
+    async def close(self) -> None:
+        """关闭会话及其连接池"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
         
     async def _call_model(self, prompt: str) -> str:
         """
@@ -30,21 +47,60 @@ class OllamaAI(BaseLLM):
             str: 模型返回的文本
         """
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    f"{self.base_url}/api/generate",
-                    json={
-                        "model": self.model,
-                        "prompt": prompt,
-                        "stream": False
-                    }
-                ) as response:
-                    if response.status == 200:
-                        result = await response.json()
-                        return result['response']
-                    else:
-                        error_text = await response.text()
-                        raise Exception(f"Ollama API调用失败: {error_text}")
+            session = self._get_session()
+            async with session.post(
+                f"{self.base_url}/api/generate",
+                json={
+                    "model": self.model,
+                    "prompt": prompt,
+                    "stream": False
+                }
+            ) as response:
+                if response.status == 200:
+                    result = await response.json()
+                    self._report_usage(result.get('prompt_eval_count'), result.get('eval_count'))
+                    return result['response']
+                else:
+                    error_text = await response.text()
+                    raise Exception(f"Ollama API调用失败: {error_text}")
         except Exception as e:
             self.logger.error(f"调用Ollama模型时出错: {str(e)}")
+            raise
+            
+    async def _stream_model(self, prompt: str) -> AsyncIterator[str]:
+        """
+        以流式方式调用Ollama API
+        
+        Args:
+            prompt: 提示词
+            
+        Yields:
+            str: 新生成的文本片段
+        """
+        try:
+            session = self._get_session()
+            async with session.post(
+                f"{self.base_url}/api/generate",
+                json={
+                    "model": self.model,
+                    "prompt": prompt,
+                    "stream": True
+                }
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    raise Exception(f"Ollama API调用失败: {error_text}")
+                    
+                # 流式响应每行是一个JSON对象
+                async for line in response.content:
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if data.get('response'):
+                        yield data['response']
+                    if data.get('done'):
+                        self._report_usage(data.get('prompt_eval_count'), data.get('eval_count'))
+                        break
+        except Exception as e:
+            self.logger.error(f"流式调用Ollama模型时出错: {str(e)}")
             raise 
\ No newline at end of file
@@ -0,0 +1,160 @@
+import re
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from ..utils.token_counter import estimate_tokens
+
+# 活动类型的重要程度，预算不足时优先保留得分高的条目
+TYPE_WEIGHTS = {
+    "Release": 5.0,
+    "Pull Request": 3.0,
+    "Issue": 2.0,
+    "Commit": 1.0,
+}
+
+_BOT_PATTERN = re.compile(r'\[bot\]|dependabot|renovate|github-actions|pre-commit-ci', re.IGNORECASE)
+_MERGE_PATTERN = re.compile(r'^merge (pull request|branch|remote-tracking branch)\b', re.IGNORECASE)
+_SHA_PATTERN = re.compile(r'\b[0-9a-f]{7,40}\b')
+_NUMBER_PATTERN = re.compile(r'\d+(?:\.\d+)*')
+
+
+class PromptCompactor:
+    """提示词压缩
+
+    对活动列表去重、截断正文并按重要程度排序，使其放入给定的 token 预算。
+    活动格式为 {"type", "title", "description", "author"(可选)}。
+    """
+
+    def __init__(self, budget_tokens: int = 1500, max_body_chars: int = 300, enabled: bool = True):
+        """
+        初始化提示词压缩
+
+        Args:
+            budget_tokens: 每个提示词中活动部分的 token 预算
+            max_body_chars: 单条活动正文保留的最大字符数
+            enabled: 为 False 时原样返回活动
+        """
+        self.budget_tokens = budget_tokens
+        self.max_body_chars = max_body_chars
+        self.enabled = enabled
+        self.total_saved = 0
+        self.logger = logging.getLogger(__name__)
+
+    @classmethod
+    def from_config(cls, model_config: Dict[str, Any], budget_key: str) -> 'PromptCompactor':
+        """
+        按 llm.prompt_compaction 配置创建
+
+        Args:
+            model_config: llm 配置
+            budget_key: 预算对应的配置项
+        """
+        config = model_config.get('prompt_compaction', {})
+        return cls(
+            budget_tokens=config.get(budget_key, 1500),
+            max_body_chars=config.get('max_body_chars', 300),
+            enabled=config.get('enabled', True)
+        )
+
+    @staticmethod
+    def format_activity(activity: Dict[str, Any]) -> str:
+        """活动在提示词中的文本形式，用于估算 token"""
+        text = f"- [{activity['type']}] {activity['title']}\n"
+        if activity.get('description'):
+            text += f"  {activity['description']}\n"
+        return text
+
+    @staticmethod
+    def _dedupe_key(activity: Dict[str, Any]) -> Tuple[str, str]:
+        """相似活动的归并键
+
+        只归并近似重复的提交：机器人提交和合并提交各归为一类，其余提交按去掉编号和 SHA 后的标题归并。
+        发布、议题和拉取请求的编号和版本号本身有意义，只归并标题完全相同的条目。
+        """
+        title = (activity.get('title') or '').strip()
+        if activity['type'] != "Commit":
+            return activity['type'], title
+        author_text = f"{activity.get('author', '')} {activity.get('description', '')}"
+        if _BOT_PATTERN.search(author_text) or _BOT_PATTERN.search(title):
+            return activity['type'], "<bot>"
+        if _MERGE_PATTERN.match(title):
+            return activity['type'], "<merge>"
+        normalized = _SHA_PATTERN.sub('<sha>', title.lower())
+        normalized = _NUMBER_PATTERN.sub('<n>', normalized)
+        return activity['type'], normalized
+
+    def _truncate(self, text: Optional[str]) -> Optional[str]:
+        if not text:
+            return text
+        text = " ".join(text.split())
+        if len(text) > self.max_body_chars:
+            text = text[:self.max_body_chars].rstrip() + "…"
+        return text
+
+    def compact(self, activities: List[Dict[str, Any]],
+                budget_tokens: Optional[int] = None) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        压缩活动列表
+
+        Args:
+            activities: 活动列表（按时间从新到旧）
+            budget_tokens: 本次调用的 token 预算，默认使用初始化时的预算
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, int]]: 压缩后的活动列表（保持原有顺序）和
+                原始/压缩后/节省的 token 数统计；归并的说明文字可能使压缩后的 token 数多于原始值，
+                此时节省的 token 数为负。dropped 为没有单独列出的活动数（包括被归并的活动）
+        """
+        original_tokens = sum(estimate_tokens(self.format_activity(a)) for a in activities)
+        if not self.enabled:
+            return activities, {"original_tokens": original_tokens, "compacted_tokens": original_tokens,
+                                "saved_tokens": 0, "dropped": 0}
+        budget = budget_tokens if budget_tokens is not None else self.budget_tokens
+
+        # 归并相似活动，保留最新的一条并记录归并数量
+        groups: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for activity in activities:
+            key = self._dedupe_key(activity)
+            if key in groups:
+                groups[key]['count'] += 1
+                continue
+            compacted = dict(activity)
+            compacted['title'] = " ".join((activity.get('title') or '').split("\n")[0].split())
+            compacted['description'] = self._truncate(activity.get('description'))
+            groups[key] = {"activity": compacted, "count": 1, "noise": key[1] in ("<bot>", "<merge>"),
+                           "index": len(groups)}
+
+        candidates = []
+        for group in groups.values():
+            activity = group['activity']
+            if group['count'] > 1:
+                activity['title'] += f"（及另外 {group['count'] - 1} 条相似{activity['type']}）"
+            # 机器人和合并提交权重最低，被多次提及的主题略微加权
+            weight = 0.5 if group['noise'] else TYPE_WEIGHTS.get(activity['type'], 1.0)
+            score = weight * (1 + 0.1 * min(group['count'] - 1, 10))
+            candidates.append((score, group['index'], activity))
+
+        # 按得分从高到低贪心放入预算，同分时保留较新的条目
+        kept = []
+        used = 0
+        for score, index, activity in sorted(candidates, key=lambda c: (-c[0], c[1])):
+            tokens = estimate_tokens(self.format_activity(activity))
+            if used + tokens > budget and kept:
+                continue
+            kept.append((index, activity))
+            used += tokens
+        result = [activity for _, activity in sorted(kept, key=lambda k: k[0])]
+
+        stats = {
+            "original_tokens": original_tokens,
+            "compacted_tokens": used,
+            "saved_tokens": original_tokens - used,
+            "dropped": len(activities) - len(result),
+        }
+        self.total_saved += stats['saved_tokens']
+        if stats['saved_tokens'] or stats['dropped']:
+            self.logger.info(
+                f"提示词压缩: {original_tokens} -> {used} tokens，节省 {stats['saved_tokens']} tokens，"
+                f"省略 {stats['dropped']} 条活动"
+            )
+        return result, stats
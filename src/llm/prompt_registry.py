@@ -0,0 +1,81 @@
+import string
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+# 各模板必须包含的占位符
+REQUIRED_FIELDS: Dict[str, Set[str]] = {
+    "translate": {"text", "from_lang", "to_lang"},
+    "batch_translate": {"items", "from_lang", "to_lang"},
+    "summarize": {"text"},
+}
+
+
+class PromptRegistry:
+    """提示词模板注册表
+
+    首次使用时一次性加载目录下的全部模板并校验占位符，之后直接从内存读取。
+    """
+
+    def __init__(self, prompt_dir: Path, required_fields: Optional[Dict[str, Set[str]]] = None):
+        """
+        初始化模板注册表
+
+        Args:
+            prompt_dir: 模板目录
+            required_fields: 模板名到必需占位符的映射
+        """
+        self.prompt_dir = prompt_dir
+        self.required_fields = required_fields if required_fields is not None else REQUIRED_FIELDS
+        self._templates: Optional[Dict[str, str]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _placeholders(template: str) -> Set[str]:
+        """提取模板中的占位符名称"""
+        return {field for _, field, _, _ in string.Formatter().parse(template) if field}
+
+    def _load_all(self) -> Dict[str, str]:
+        """加载并校验全部模板"""
+        templates = {}
+        for template_path in sorted(self.prompt_dir.glob("*.txt")):
+            with open(template_path, 'r', encoding='utf-8') as f:
+                template = f.read().strip()
+
+            name = template_path.stem
+            placeholders = self._placeholders(template)
+            required = self.required_fields.get(name)
+            if required is not None and placeholders != required:
+                raise ValueError(
+                    f"提示词模板 {template_path.name} 的占位符 {sorted(placeholders)} "
+                    f"与预期 {sorted(required)} 不一致"
+                )
+            templates[name] = template
+
+        missing = set(self.required_fields) - set(templates)
+        if missing:
+            raise ValueError(f"缺少提示词模板: {sorted(missing)}")
+        return templates
+
+    def get(self, name: str) -> str:
+        """
+        获取模板内容
+
+        Args:
+            name: 模板名称（不含扩展名）
+
+        Returns:
+            str: 模板内容
+        """
+        if self._templates is None:
+            with self._lock:
+                if self._templates is None:
+                    self._templates = self._load_all()
+        try:
+            return self._templates[name]
+        except KeyError:
+            raise KeyError(f"提示词模板不存在: {name}") from None
+
+
+# 进程内共享的模板注册表
+prompt_registry = PromptRegistry(Path(__file__).parent.parent / 'prompt_engineering')
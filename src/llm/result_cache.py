@@ -0,0 +1,47 @@
+import json
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from ..utils.sqlite_cache import SQLiteCache
+
+
+class LLMResultCache:
+    """模型生成结果缓存
+
+    以模型、调用参数和完整提示词的哈希作为键持久化生成结果及实际作答的模型，
+    相同输入在有效期内直接返回缓存，重启后依然有效。
+    """
+
+    def __init__(self, db_path: Path, max_entries: int = 2000, ttl: Optional[int] = 21600):
+        """
+        初始化结果缓存
+
+        Args:
+            db_path: 数据库文件路径
+            max_entries: 最多保存的结果条数
+            ttl: 结果有效期（秒）
+        """
+        self.store = SQLiteCache(db_path, max_entries=max_entries, ttl=ttl)
+
+    @staticmethod
+    def make_key(model: str, params: Dict[str, Any], prompt: str) -> str:
+        """根据模型、调用参数和提示词生成缓存键"""
+        raw = json.dumps([model, params, prompt], ensure_ascii=False, sort_keys=True)
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[Tuple[str, str]]:
+        """返回缓存的生成结果和作答的模型"""
+        value = self.store.get(key)
+        # 只有结果没有模型的旧条目视为未命中
+        if not isinstance(value, list):
+            return None
+        return value[0], value[1]
+
+    def set(self, key: str, result: str, model: str) -> None:
+        if result:
+            self.store.set(key, [result, model])
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存条目数和命中率"""
+        return self.store.stats()
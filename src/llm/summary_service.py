@@ -1,39 +1,60 @@
+import json
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional, AsyncIterator
 from pathlib import Path
+from .base_llm import BaseLLM
 from .zhipu_client import ZhipuLLM
+from .prompt_compactor import PromptCompactor
+from .llm_metrics import llm_call_site
+from ..utils.sqlite_cache import SQLiteCache
+from ..utils.token_counter import estimate_tokens
+
+NO_UPDATES_SUMMARY = "已跟踪的项目在该时间段内没有新的活动。"
 
 class SummaryService:
     """AI总结服务类"""
     
-    def __init__(self, config_path: Path):
+    # 生成失败时返回的提示，调用方据此判断结果不应缓存
+    ERROR_SUMMARY = "生成总结时出错，请稍后重试。"
+    
+    def __init__(self, config_path: Path, llm: Optional[BaseLLM] = None):
         """初始化AI总结服务
         
         Args:
             config_path: 模型配置文件路径
+            llm: 共享的LLM实例，未提供时创建新的智谱AI客户端
         """
-        self.llm = ZhipuLLM(config_path)
+        self.llm = llm or ZhipuLLM(config_path)
         self.logger = logging.getLogger(__name__)
+        self.tracked_config = self.llm.model_config.get('tracked_summary', {})
+        self._repo_summary_cache: Optional[SQLiteCache] = None
+        self.repo_compactor = PromptCompactor.from_config(self.llm.model_config, 'repo_summary_tokens')
         
-    async def generate_hot_repos_summary(self, repos: List[Dict[str, Any]]) -> str:
-        """生成热门仓库总结
+    @property
+    def repo_summary_cache(self) -> SQLiteCache:
+        """单个仓库总结的缓存，键为仓库活动内容的摘要"""
+        if self._repo_summary_cache is None:
+            storage = self.llm.config.get('storage', {})
+            cache_dir = self.llm.base_dir / storage.get('base_dir', 'data') / storage.get('cache_dir', 'cache')
+            self._repo_summary_cache = SQLiteCache(
+                cache_dir / "repo_summaries.sqlite3",
+                max_entries=self.tracked_config.get('cache_max_entries', 2000)
+            )
+        return self._repo_summary_cache
         
-        Args:
-            repos: 热门仓库列表
+    def _build_hot_repos_prompt(self, repos: List[Dict[str, Any]]) -> str:
+        """构建热门仓库总结的提示词"""
+        # 准备用于总结的内容
+        summary_content = ""
+        for repo in repos:
+            summary_content += f"项目名称: {repo['name']}\n"
+            summary_content += f"描述: {repo['description']}\n"
+            summary_content += f"Stars: {repo['stars']}, Forks: {repo['forks']}\n"
+            summary_content += f"最近更新: {repo['updated_at']}\n\n"
             
-        Returns:
-            str: 总结内容
-        """
-        try:
-            # 准备用于总结的内容
-            summary_content = ""
-            for repo in repos:
-                summary_content += f"项目名称: {repo['name']}\n"
-                summary_content += f"描述: {repo['description']}\n"
-                summary_content += f"Stars: {repo['stars']}, Forks: {repo['forks']}\n"
-                summary_content += f"最近更新: {repo['updated_at']}\n\n"
-                
-            prompt = f"""请分析以下GitHub热门项目列表，生成一个简洁的总结报告。重点关注：
+        return f"""请分析以下GitHub热门项目列表，生成一个简洁的总结报告。重点关注：
 1. 项目的主要类型和领域分布
 2. 最受关注的项目及其特点
 3. 当前技术趋势分析
@@ -43,11 +64,200 @@ class SummaryService:
 
 请用中文生成总结报告。
 """
-            return await self.llm._call_model(prompt)
+        
+    def _repo_activities(self, repo: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """参与总结的仓库活动"""
+        return repo['activities'][:self.tracked_config.get('max_activities', 50)]
+        
+    def _repo_summary_keys(self, repo: Dict[str, Any]) -> Dict[str, str]:
+        """根据仓库和活动内容为每个可能作答的模型生成缓存键，活动不变时键不变
+        
+        Args:
+            repo: 仓库数据
+            
+        Returns:
+            Dict[str, str]: 模型到缓存键的映射，按模型优先顺序排列
+        """
+        activities = [
+            [activity.get('type'), activity.get('title'), activity.get('description'), activity.get('created_at')]
+            for activity in self._repo_activities(repo)
+        ]
+        return {
+            model: hashlib.sha256(
+                json.dumps([model, repo['full_name'], activities], ensure_ascii=False, sort_keys=True).encode('utf-8')
+            ).hexdigest()
+            for model in self.llm.cache_models()
+        }
+        
+    def _build_repo_prompt(self, repo: Dict[str, Any]) -> str:
+        """构建单个仓库总结（map 阶段）的提示词"""
+        activities, _ = self.repo_compactor.compact(self._repo_activities(repo))
+        activity_content = "".join(PromptCompactor.format_activity(activity) for activity in activities)
+                
+        return f"""请总结GitHub项目 {repo['full_name']} 的最新活动，用2到4句话说明主要更新内容，
+并指出其中重要的版本发布、重大更新或值得关注的问题和PR。
+
+最新活动：
+{activity_content}
+请用中文回答，不要输出标题。
+"""
+        
+    def _build_reduce_prompt(self, parts: List[str], final: bool) -> str:
+        """构建合并各仓库总结（reduce 阶段）的提示词"""
+        content = "\n\n".join(parts)
+        if not final:
+            return f"""请将以下多个GitHub项目的更新总结合并压缩为一段，保留项目名称和重要的版本发布、重大更新：
+
+{content}
+
+请用中文回答。
+"""
+        return f"""以下是各个GitHub已跟踪项目的更新总结，请据此生成一个简洁的总结报告。重点关注：
+1. 最活跃的项目及其主要更新内容
+2. 重要的版本发布、重大更新
+3. 值得关注的问题和PR
+
+各项目总结：
+{content}
+
+请用中文生成总结报告。
+"""
+        
+    @staticmethod
+    def _fallback_repo_summary(repo: Dict[str, Any]) -> str:
+        """模型调用失败时，直接列出活动标题作为该仓库的总结"""
+        titles = [f"[{activity['type']}] {activity['title']}" for activity in repo['activities'][:5]]
+        return "；".join(titles)
+        
+    async def _summarize_repos(self, repos: List[Dict[str, Any]]) -> List[str]:
+        """
+        map 阶段：并发总结每个有更新的仓库，活动未变化的仓库直接使用缓存
+        
+        Args:
+            repos: 已追踪仓库列表
+            
+        Returns:
+            List[str]: 每个仓库一段的总结
+        """
+        updated = [repo for repo in repos if repo['has_updates'] and repo['activities']]
+        keys = {repo['full_name']: self._repo_summary_keys(repo) for repo in updated}
+        found = self.repo_summary_cache.get_many(key for repo_keys in keys.values() for key in repo_keys.values())
+        # 总结按实际作答的模型缓存，取优先顺序中第一个命中的
+        cached = {}
+        for name, repo_keys in keys.items():
+            hit = next((key for key in repo_keys.values() if key in found), None)
+            if hit is not None:
+                cached[name] = found[hit]
+        
+        stale = [repo for repo in updated if repo['full_name'] not in cached]
+        if updated:
+            self.logger.info(f"仓库总结缓存命中 {len(updated) - len(stale)} 个，需要重新总结 {len(stale)} 个")
+            
+        semaphore = asyncio.Semaphore(self.tracked_config.get('max_concurrency', 4))
+        
+        async def summarize(repo: Dict[str, Any]) -> str:
+            async with semaphore:
+                try:
+                    with llm_call_site("repo_summary"):
+                        summary, model = await self.llm.generate_answered(self._build_repo_prompt(repo))
+                except Exception as e:
+                    self.logger.error(f"总结仓库 {repo['full_name']} 时出错: {str(e)}")
+                    return self._fallback_repo_summary(repo)
+            key = keys[repo['full_name']].get(model)
+            if key is not None:
+                self.repo_summary_cache.set(key, summary)
+            return summary
+            
+        fresh = await asyncio.gather(*(summarize(repo) for repo in stale))
+        summaries = dict(zip([repo['full_name'] for repo in stale], fresh))
+        
+        parts = []
+        for repo in repos:
+            name = repo['full_name']
+            if name in keys:
+                summary = summaries.get(name) or cached[name]
+                parts.append(f"项目名称: {name}\n{summary.strip()}")
+            else:
+                parts.append(f"项目名称: {name}\n暂无更新")
+        return parts
+        
+    async def _reduce_parts(self, parts: List[str]) -> List[str]:
+        """
+        各仓库总结超出 token 预算时，分组合并为中间总结，直到可以放入最终提示词
+        
+        Args:
+            parts: 各仓库的总结
+            
+        Returns:
+            List[str]: 可以直接放入最终提示词的总结
+        """
+        budget = self.tracked_config.get('reduce_tokens', 3000)
+        semaphore = asyncio.Semaphore(self.tracked_config.get('max_concurrency', 4))
+        
+        async def combine(group: List[str]) -> str:
+            if len(group) == 1:
+                return group[0]
+            async with semaphore:
+                with llm_call_site("reduce"):
+                    return await self.llm.generate(self._build_reduce_prompt(group, final=False))
+                
+        while len(parts) > 1 and sum(estimate_tokens(part) for part in parts) > budget:
+            groups: List[List[str]] = [[]]
+            used = 0
+            for part in parts:
+                tokens = estimate_tokens(part)
+                if groups[-1] and used + tokens > budget:
+                    groups.append([])
+                    used = 0
+                groups[-1].append(part)
+                used += tokens
+            if len(groups) == len(parts):
+                # 每组只剩一项时无法继续合并
+                break
+            parts = list(await asyncio.gather(*(combine(group) for group in groups)))
+        return parts
+        
+    async def _build_tracked_repos_prompt(self, repos: List[Dict[str, Any]]) -> Optional[str]:
+        """构建已追踪仓库总结的最终提示词，没有任何更新时返回 None"""
+        if not any(repo['has_updates'] and repo['activities'] for repo in repos):
+            return None
+        parts = await self._reduce_parts(await self._summarize_repos(repos))
+        return self._build_reduce_prompt(parts, final=True)
+        
+    async def generate_hot_repos_summary(self, repos: List[Dict[str, Any]]) -> str:
+        """生成热门仓库总结
+        
+        Args:
+            repos: 热门仓库列表
+            
+        Returns:
+            str: 总结内容
+        """
+        try:
+            with llm_call_site("hot_repos_summary"):
+                return await self.llm.generate(self._build_hot_repos_prompt(repos))
             
         except Exception as e:
             self.logger.error(f"生成热门仓库总结时出错: {str(e)}")
-            return "生成总结时出错，请稍后重试。"
+            return self.ERROR_SUMMARY
+            
+    async def stream_hot_repos_summary(self, repos: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """流式生成热门仓库总结
+        
+        Args:
+            repos: 热门仓库列表
+            
+        Yields:
+            str: 新生成的总结片段
+        """
+        try:
+            with llm_call_site("hot_repos_summary"):
+                async for chunk in self.llm.generate_stream(self._build_hot_repos_prompt(repos)):
+                    yield chunk
+                
+        except Exception as e:
+            self.logger.error(f"流式生成热门仓库总结时出错: {str(e)}")
+            yield self.ERROR_SUMMARY
             
     async def generate_tracked_repos_summary(self, repos: List[Dict[str, Any]]) -> str:
         """生成已追踪仓库总结
@@ -59,30 +269,34 @@ class SummaryService:
             str: 总结内容
         """
         try:
-            # 准备用于总结的内容
-            summary_content = ""
-            for repo in repos:
-                summary_content += f"项目名称: {repo['full_name']}\n"
-                if repo['has_updates']:
-                    summary_content += "最新活动:\n"
-                    for activity in repo['activities'][:5]:  # 只取最新的5条活动
-                        summary_content += f"- [{activity['type']}] {activity['title']}\n"
-                        if activity.get('description'):
-                            summary_content += f"  {activity['description']}\n"
-                summary_content += "\n"
-                
-            prompt = f"""请分析以下GitHub已跟踪项目的更新情况，生成一个简洁的总结报告。重点关注：
-1. 最活跃的项目及其主要更新内容
-2. 重要的版本发布、重大更新
-3. 值得关注的问题和PR
-
-更新列表：
-{summary_content}
-
-请用中文生成总结报告。
-"""
-            return await self.llm._call_model(prompt)
+            with llm_call_site("tracked_repos_summary"):
+                prompt = await self._build_tracked_repos_prompt(repos)
+                if prompt is None:
+                    return NO_UPDATES_SUMMARY
+                return await self.llm.generate(prompt)
             
         except Exception as e:
             self.logger.error(f"生成已追踪仓库总结时出错: {str(e)}")
-            return "生成总结时出错，请稍后重试。" 
\ No newline at end of file
+            return self.ERROR_SUMMARY
+            
+    async def stream_tracked_repos_summary(self, repos: List[Dict[str, Any]]) -> AsyncIterator[str]:
+        """流式生成已追踪仓库总结
+        
+        Args:
+            repos: 已追踪仓库列表
+            
+        Yields:
+            str: 新生成的总结片段
+        """
+        try:
+            with llm_call_site("tracked_repos_summary"):
+                prompt = await self._build_tracked_repos_prompt(repos)
+                if prompt is None:
+                    yield NO_UPDATES_SUMMARY
+                    return
+                async for chunk in self.llm.generate_stream(prompt):
+                    yield chunk
+                
+        except Exception as e:
+            self.logger.error(f"流式生成已追踪仓库总结时出错: {str(e)}")
+            yield self.ERROR_SUMMARY
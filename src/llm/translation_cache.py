@@ -0,0 +1,65 @@
+import hashlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from ..utils.sqlite_cache import SQLiteCache
+
+
+class TranslationCache:
+    """翻译结果缓存
+
+    以原文、语言对和模型的哈希作为键持久化翻译结果，热门项目连续多天重复出现时无需再次调用模型。
+    """
+
+    def __init__(self, db_path: Path, max_entries: int = 20000):
+        """
+        初始化翻译缓存
+
+        Args:
+            db_path: 数据库文件路径
+            max_entries: 最多保存的翻译条数
+        """
+        self.store = SQLiteCache(db_path, max_entries=max_entries)
+
+    @staticmethod
+    def make_key(text: str, from_lang: str, to_lang: str, model: str) -> str:
+        """根据原文、语言对和模型生成缓存键"""
+        raw = "\x1f".join([model, from_lang, to_lang, text])
+        return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+    def lookup(self, texts: List[str], from_lang: str, to_lang: str, model: str) -> Dict[str, str]:
+        """
+        批量查询翻译
+
+        Args:
+            texts: 原文列表
+            from_lang: 源语言
+            to_lang: 目标语言
+            model: 模型名称
+
+        Returns:
+            Dict[str, str]: 命中的原文到译文的映射
+        """
+        keys = {self.make_key(text, from_lang, to_lang, model): text for text in texts}
+        found = self.store.get_many(keys)
+        return {keys[key]: value for key, value in found.items()}
+
+    def save(self, translations: Dict[str, str], from_lang: str, to_lang: str, model: str) -> None:
+        """
+        保存翻译结果
+
+        Args:
+            translations: 原文到译文的映射
+            from_lang: 源语言
+            to_lang: 目标语言
+            model: 模型名称
+        """
+        self.store.set_many({
+            self.make_key(text, from_lang, to_lang, model): translated
+            for text, translated in translations.items()
+            if translated
+        })
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存条目数和命中率"""
+        return self.store.stats()
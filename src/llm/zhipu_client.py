@@ -1,13 +1,16 @@
-from zhipuai import ZhipuAI
-from typing import Dict, Any
+from typing import Dict, Any, List, AsyncIterator
 from pathlib import Path
 from .base_llm import BaseLLM
 import os
+import asyncio
 import logging
+import threading
 
 class ZhipuLLM(BaseLLM):
     """智谱AI客户端"""
     
+    provider = "zhipu"
+    
     def __init__(self, config_path: Path):
         """
         初始化智谱AI客户端
@@ -17,8 +20,34 @@ class ZhipuLLM(BaseLLM):
         """
         super().__init__(config_path)
         self.zhipuai_api_key = os.getenv('ZHIPU_API_KEY')
-        self.model = self.model_config['zhipu'].get('model', 'chatglm_turbo')
+        zhipu_config = self.model_config['zhipu']
+        self.model = zhipu_config.get('model', 'chatglm_turbo')
+        self.base_url = zhipu_config.get('base_url')
+        # 生成参数同时用于请求和缓存键，只在这里从配置读取
+        self.generation_params = {
+            "top_p": zhipu_config.get('top_p', 0.7),
+            "temperature": zhipu_config.get('temperature', 0.95),
+            "max_tokens": zhipu_config.get('max_tokens', 1024),
+        }
         self.logger = logging.getLogger(__name__)
+        self._client = None
+        self._client_lock = threading.Lock()
+        
+    def _get_client(self):
+        """获取长期复用的客户端实例，底层 HTTP 连接保持复用"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    # 延迟导入 SDK，避免拖慢应用启动
+                    from zhipuai import ZhipuAI
+                    self._client = ZhipuAI(api_key=self.zhipuai_api_key, base_url=self.base_url)
+        return self._client
+        
+    async def close(self) -> None:
+        """关闭客户端连接"""
+        if self._client is not None:
+            self._client.close()
+            self._client = None
         
     async def _call_model(self, prompt: str) -> str:
         """
@@ -31,69 +60,103 @@ class ZhipuLLM(BaseLLM):
             str: 模型返回的文本
         """
         try:
-            # 创建客户端实例
-            client = ZhipuAI(api_key=self.zhipuai_api_key)
-            
-            # 构建消息列表
-            messages = [
-                {
-                    "role": "system",
-                    "content": "你是一个乐于解答各种问题的助手，你的任务是为用户提供专业、准确、有见地的建议。"
-                },
-                {
-                    "role": "user",
-                    "content": prompt
-                }
-            ]
+            client = self._get_client()
             
-            # 调用智谱AI的chat API
-            response = await client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                top_p=0.7,
-                temperature=0.95,
-                max_tokens=1024,
-                # tools=[{"type": "web_search", "web_search": {"search_result": True, "search_engine": "search-std"}}],
+            # 调用智谱AI的chat API，SDK 为同步接口，放到线程中执行以免阻塞事件循环
+            response = await asyncio.to_thread(
+                client.chat.completions.create,
+                **self._build_request(prompt),
                 stream=False
             )
             
             # 处理响应
+            usage = getattr(response, 'usage', None)
+            if usage is not None:
+                self._report_usage(usage.prompt_tokens, usage.completion_tokens)
             return response.choices[0].message.content
             
         except Exception as e:
             self.logger.error(f"调用智谱AI模型时出错: {str(e)}")
             raise
             
-    def translate(self, text: str, from_lang: str = "en", to_lang: str = "zh") -> str:
+    async def _stream_model(self, prompt: str) -> AsyncIterator[str]:
         """
-        文本翻译
+        以流式方式调用智谱AI API
         
         Args:
-            text: 要翻译的文本
-            from_lang: 源语言
-            to_lang: 目标语言
+            prompt: 提示词
             
-        Returns:
-            str: 翻译后的文本
+        Yields:
+            str: 新生成的文本片段
         """
-        template = self._load_prompt("translate")
-        prompt = template.format(
-            text=text,
-            from_lang=from_lang,
-            to_lang=to_lang
-        )
-        return self._call_model(prompt)
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        finished = object()
+        stopped = threading.Event()
+        client = self._get_client()
         
-    def summarize(self, text: str) -> str:
-        """
-        文本总结
-        
-        Args:
-            text: 要总结的文本
+        def produce():
+            # SDK 的流式响应是同步迭代器，在线程中读取并转交给事件循环
+            stream = None
+            try:
+                stream = client.chat.completions.create(**self._build_request(prompt), stream=True)
+                for chunk in stream:
+                    if stopped.is_set():
+                        break
+                    content = chunk.choices[0].delta.content if chunk.choices else None
+                    if content:
+                        loop.call_soon_threadsafe(queue.put_nowait, content)
+            except Exception as e:
+                if not stopped.is_set():
+                    loop.call_soon_threadsafe(queue.put_nowait, e)
+            finally:
+                if stream is not None:
+                    # 提前结束时关闭连接，服务端随之停止生成
+                    stream.response.close()
+                if not stopped.is_set():
+                    loop.call_soon_threadsafe(queue.put_nowait, finished)
+                    
+        producer = loop.run_in_executor(None, produce)
+        completed = False
+        try:
+            while True:
+                item = await queue.get()
+                if item is finished:
+                    completed = True
+                    break
+                if isinstance(item, Exception):
+                    completed = True
+                    self.logger.error(f"流式调用智谱AI模型时出错: {str(item)}")
+                    raise item
+                yield item
+        finally:
+            if completed:
+                await producer
+            else:
+                # 调用方提前结束（如 SSE 客户端断开）时不等待剩余内容生成完毕，
+                # 线程读到下一个片段后即关闭流式响应并退出
+                stopped.set()
             
-        Returns:
-            str: 总结后的文本
-        """
-        template = self._load_prompt("summarize")
-        prompt = template.format(text=text)
-        return self._call_model(prompt) 
\ No newline at end of file
+    def cache_params(self) -> Dict[str, Any]:
+        """影响生成结果的调用参数"""
+        return dict(self.generation_params)
+        
+    def _build_request(self, prompt: str) -> Dict[str, Any]:
+        """构建 chat API 的请求参数"""
+        # 构建消息列表
+        messages: List[Dict[str, str]] = [
+            {
+                "role": "system",
+                "content": "你是一个乐于解答各种问题的助手，你的任务是为用户提供专业、准确、有见地的建议。"
+            },
+            {
+                "role": "user",
+                "content": prompt
+            }
+        ]
+        return {
+            "model": self.model,
+            "messages": messages,
+            **self.cache_params(),
+            # "tools": [{"type": "web_search", "web_search": {"search_result": True, "search_engine": "search-std"}}],
+        }
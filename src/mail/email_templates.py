@@ -0,0 +1,265 @@
+import html
+import threading
+from collections import OrderedDict
+from string import Template
+from typing import Any, Dict, List, Optional, Tuple
+
+# 模板在导入时编译一次，渲染时只做变量替换
+UPDATES_HTML = Template(
+    "<html><body>"
+    "<h2>GitHub 项目更新通知</h2>"
+    "<p>以下是您关注的项目在最近一周的更新动态：</p>"
+    "$fragments"
+    "<p>此邮件由 GitHub 项目追踪器自动发送，请勿直接回复。</p>"
+    "</body></html>"
+)
+UPDATES_TEXT = Template(
+    "GitHub 项目更新通知\n\n"
+    "以下是您关注的项目在最近一周的更新动态：\n\n"
+    "$fragments"
+    "此邮件由 GitHub 项目追踪器自动发送，请勿直接回复。\n"
+)
+REPO_HTML = Template(
+    "<h3>$name ($full_name)</h3>"
+    "<p>Stars: $stars, Forks: $forks</p>"
+    "$sections"
+    "<p><a href=\"$url\">访问仓库</a></p>"
+    "<hr/>"
+)
+REPO_TEXT = Template(
+    "## $name ($full_name)\n"
+    "Stars: $stars, Forks: $forks\n"
+    "$sections"
+    "访问仓库: $url\n"
+    "----------------------------------------\n\n"
+)
+SECTION_HTML = Template("<h4>$title</h4><ul>$items</ul>")
+SECTION_TEXT = Template("\n$title:\n$items")
+ITEM_HTML = Template("<li>$text</li>")
+ITEM_TEXT = Template("  - $text\n")
+SUMMARY_SECTIONS_HTML = Template(
+    "<h3>热门项目总结</h3>"
+    "<p style=\"white-space: pre-wrap\">$hot</p>"
+    "<h3>已追踪项目更新总结</h3>"
+    "<p style=\"white-space: pre-wrap\">$tracked</p>"
+)
+SUMMARY_SECTIONS_TEXT = Template(
+    "热门项目总结\n$hot\n\n"
+    "已追踪项目更新总结\n$tracked\n"
+)
+SUMMARY_HTML = Template("<html><body><h2>GitHub 项目每日总结</h2>$sections</body></html>")
+SUMMARY_TEXT = Template("GitHub 项目每日总结\n\n$sections")
+DIGEST_HTML = Template(
+    "<html><body>"
+    "<h2>GitHub 项目摘要</h2>"
+    "$summary"
+    "$updates"
+    "<p>此邮件由 GitHub 项目追踪器自动发送，请勿直接回复。</p>"
+    "</body></html>"
+)
+DIGEST_TEXT = Template(
+    "GitHub 项目摘要\n\n"
+    "$summary"
+    "$updates"
+    "此邮件由 GitHub 项目追踪器自动发送，请勿直接回复。\n"
+)
+DIGEST_UPDATES_HTML = Template("<h3>项目更新动态</h3><p>以下是您关注的项目最近的更新动态：</p>$fragments")
+DIGEST_UPDATES_TEXT = Template("项目更新动态\n\n以下是您关注的项目最近的更新动态：\n\n$fragments")
+
+# 每类活动在邮件中最多列出的条数
+MAX_ITEMS = 5
+
+
+def _describe_commit(commit: Dict[str, Any]) -> str:
+    message = commit['message'].split('\n')[0]
+    return f"{message} (作者: {commit['author']})"
+
+
+def _describe_state(item: Dict[str, Any]) -> str:
+    return f"{item['title']} (状态: {item['state']})"
+
+
+def _describe_release(release: Dict[str, Any]) -> str:
+    return f"{release['name']} (标签: {release['tag']})"
+
+
+# (活动类型, 标题, 条目文本, 剩余数量的单位)
+SECTIONS = (
+    ('commits', "最新提交", _describe_commit, "个提交"),
+    ('issues', "最新议题", _describe_state, "个议题"),
+    ('pull_requests', "最新拉取请求", _describe_state, "个拉取请求"),
+    ('releases', "最新发布", _describe_release, "个发布"),
+)
+
+
+class EmailRenderer:
+    """邮件模板渲染
+
+    每个仓库的更新片段（HTML 和纯文本）按仓库和活动条目的对象标识缓存，关注相同仓库的收件人
+    引用同一批对象，复用同一片段，命中时不需要格式化条目文本，
+    渲染开销与不同仓库的数量成正比，而不是收件人数乘以仓库数。
+    """
+
+    def __init__(self, max_fragments: int = 512):
+        """
+        初始化渲染器
+
+        Args:
+            max_fragments: 最多缓存的仓库片段数
+        """
+        self.max_fragments = max_fragments
+        self.hits = 0
+        self.misses = 0
+        # 键 -> (片段, 键中对象)，持有对象保证缓存期间其标识不会被复用
+        self._fragments: "OrderedDict[Tuple, Tuple[Tuple[str, str], Tuple]]" = OrderedDict()
+        self._summary: Optional[Tuple[Tuple[str, str], Tuple[str, str]]] = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _section_lines(activities: Dict[str, Any]) -> List[Tuple[str, List[str]]]:
+        """每类活动的标题和要列出的条目文本"""
+        sections = []
+        for key, title, describe, unit in SECTIONS:
+            items = activities.get(key)
+            if not items:
+                continue
+            lines = [describe(item) for item in items[:MAX_ITEMS]]
+            if len(items) > MAX_ITEMS:
+                lines.append(f"... 还有 {len(items) - MAX_ITEMS} {unit}")
+            sections.append((title, lines))
+        return sections
+
+    @staticmethod
+    def _fragment_key(repo: Dict[str, Any], activities: Dict[str, Any]) -> Tuple[Tuple, Tuple]:
+        """
+        按仓库信息和要列出的活动条目的对象标识生成键
+
+        同一轮投递中，各收件人的更新（包括按发送记录过滤、按仓库合并后的更新）引用同一批
+        仓库信息和活动条目对象，因此不需要先格式化条目文本就能判断片段是否相同。
+
+        Returns:
+            Tuple[Tuple, Tuple]: 缓存键，以及键中标识对应的对象
+        """
+        shown = tuple(tuple((activities.get(key) or ())[:MAX_ITEMS]) for key, *_ in SECTIONS)
+        counts = tuple(len(activities.get(key) or ()) for key, *_ in SECTIONS)
+        key = (id(repo), counts, tuple(tuple(id(item) for item in items) for items in shown))
+        return key, (repo, shown)
+
+    def render_repo(self, update: Dict[str, Any]) -> Tuple[str, str]:
+        """
+        渲染单个仓库的更新片段，内容相同时直接返回缓存
+
+        Args:
+            update: 包含 repo 和 activities 的仓库更新信息
+
+        Returns:
+            Tuple[str, str]: HTML 片段和纯文本片段
+        """
+        repo = update['repo']
+        key, pinned = self._fragment_key(repo, update['activities'])
+        with self._lock:
+            cached = self._fragments.get(key)
+            if cached is not None:
+                self._fragments.move_to_end(key)
+                self.hits += 1
+                return cached[0]
+
+        sections = self._section_lines(update['activities'])
+
+        escape = html.escape
+        fields = {
+            "name": repo['name'],
+            "full_name": repo['full_name'],
+            "stars": repo['stars'],
+            "forks": repo['forks'],
+            "url": repo['url'],
+        }
+        html_sections = "".join(
+            SECTION_HTML.substitute(title=title, items="".join(ITEM_HTML.substitute(text=escape(line)) for line in lines))
+            for title, lines in sections
+        )
+        text_sections = "".join(
+            SECTION_TEXT.substitute(title=title, items="".join(ITEM_TEXT.substitute(text=line) for line in lines))
+            for title, lines in sections
+        )
+        fragment = (
+            REPO_HTML.substitute({k: escape(str(v)) for k, v in fields.items()}, sections=html_sections),
+            REPO_TEXT.substitute(fields, sections=text_sections + ("\n" if text_sections else "")),
+        )
+        with self._lock:
+            self.misses += 1
+            self._fragments[key] = (fragment, pinned)
+            if len(self._fragments) > self.max_fragments:
+                self._fragments.popitem(last=False)
+        return fragment
+
+    def render_updates(self, updates: List[Dict[str, Any]]) -> Tuple[str, str]:
+        """
+        用缓存的仓库片段组装更新邮件
+
+        Args:
+            updates: 仓库更新信息列表
+
+        Returns:
+            Tuple[str, str]: HTML 正文和纯文本正文
+        """
+        fragments = [self.render_repo(update) for update in updates]
+        return (
+            UPDATES_HTML.substitute(fragments="".join(part for part, _ in fragments)),
+            UPDATES_TEXT.substitute(fragments="".join(part for _, part in fragments)),
+        )
+
+    def _summary_sections(self, hot_repos_summary: str, tracked_repos_summary: str) -> Tuple[str, str]:
+        """每日总结部分，同一批收件人只渲染一次"""
+        key = (hot_repos_summary, tracked_repos_summary)
+        with self._lock:
+            if self._summary is not None and self._summary[0] == key:
+                return self._summary[1]
+        sections = (
+            SUMMARY_SECTIONS_HTML.substitute(hot=html.escape(hot_repos_summary), tracked=html.escape(tracked_repos_summary)),
+            SUMMARY_SECTIONS_TEXT.substitute(hot=hot_repos_summary, tracked=tracked_repos_summary),
+        )
+        with self._lock:
+            self._summary = (key, sections)
+        return sections
+
+    def render_daily_summary(self, hot_repos_summary: str, tracked_repos_summary: str) -> Tuple[str, str]:
+        """
+        渲染每日总结邮件
+
+        Args:
+            hot_repos_summary: 热门项目总结
+            tracked_repos_summary: 已追踪项目总结
+
+        Returns:
+            Tuple[str, str]: HTML 正文和纯文本正文
+        """
+        html_sections, text_sections = self._summary_sections(hot_repos_summary, tracked_repos_summary)
+        return SUMMARY_HTML.substitute(sections=html_sections), SUMMARY_TEXT.substitute(sections=text_sections)
+
+    def render_digest(self, updates: List[Dict[str, Any]], summary: Optional[Tuple[str, str]] = None) -> Tuple[str, str]:
+        """
+        渲染合并摘要邮件：可选的每日总结加上各仓库的更新片段
+
+        Args:
+            updates: 仓库更新信息列表（已按仓库去重）
+            summary: 热门项目总结和已追踪项目总结
+
+        Returns:
+            Tuple[str, str]: HTML 正文和纯文本正文
+        """
+        html_summary, text_summary = self._summary_sections(*summary) if summary else ("", "")
+        html_updates, text_updates = "", ""
+        if updates:
+            fragments = [self.render_repo(update) for update in updates]
+            html_updates = DIGEST_UPDATES_HTML.substitute(fragments="".join(part for part, _ in fragments))
+            text_updates = DIGEST_UPDATES_TEXT.substitute(fragments="".join(part for _, part in fragments))
+        return (
+            DIGEST_HTML.substitute(summary=html_summary, updates=html_updates),
+            DIGEST_TEXT.substitute(summary=text_summary + ("\n" if text_summary else ""), updates=text_updates),
+        )
+
+    def stats(self) -> Dict[str, int]:
+        """仓库片段缓存的条目数和命中次数"""
+        with self._lock:
+            return {"fragments": len(self._fragments), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,319 @@
+import time
+import email
+import random
+import asyncio
+import logging
+import sqlite3
+import smtplib
+import threading
+from email.message import Message
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+# 认证失败等 5xx 错误与具体邮件无关，按临时错误重试
+_NON_PERMANENT_CODES = {530, 534, 535}
+
+
+def is_permanent_error(error: Exception) -> bool:
+    """判断发送错误是否为永久失败（如收件人不存在），永久失败的邮件不再重试"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(code >= 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return error.smtp_code >= 500 and error.smtp_code not in _NON_PERMANENT_CODES
+    return False
+
+
+class MailQueue:
+    """基于 SQLite 的持久化发件队列
+
+    邮件先写入队列再由后台任务发送，失败时按指数退避重试，
+    超过最大次数或永久失败的邮件转入死信状态，保留以便排查和手动重发。
+    """
+
+    def __init__(self, db_path: Path, max_attempts: int = 6, base_delay: float = 30.0,
+                 max_delay: float = 3600.0, lease_seconds: float = 300.0):
+        """
+        初始化发件队列
+
+        Args:
+            db_path: 数据库文件路径
+            max_attempts: 最大发送次数，超过后转入死信
+            base_delay: 第一次重试前的等待时间（秒），之后逐次翻倍
+            max_delay: 重试等待时间上限（秒）
+            lease_seconds: 取出后未确认的邮件在该时间后可被重新取出（发送进程崩溃时）
+        """
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self.sent = 0
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS outbox (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                recipient TEXT NOT NULL,
+                subject TEXT,
+                message TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                next_attempt_at REAL NOT NULL,
+                last_error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(status, next_attempt_at)")
+        self._conn.commit()
+
+    def enqueue(self, msg: Message) -> int:
+        """
+        将邮件写入队列
+
+        Args:
+            msg: 邮件消息对象
+
+        Returns:
+            int: 队列中的邮件ID
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO outbox (recipient, subject, message, next_attempt_at, created_at, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (msg['To'], msg['Subject'], msg.as_string(), now, now, now)
+            )
+            self._conn.commit()
+            return cursor.lastrowid
+
+    def claim(self, limit: int) -> List[Tuple[int, Message]]:
+        """
+        取出到期的邮件并加租约，租约期间其他发送任务不会重复取出
+
+        Args:
+            limit: 最多取出的邮件数
+
+        Returns:
+            List[Tuple[int, Message]]: 邮件ID和邮件消息对象
+        """
+        now = time.time()
+        with self._lock:
+            # 立即获取写锁，避免多个进程取出同一封邮件
+            self._conn.execute("BEGIN IMMEDIATE")
+            rows = self._conn.execute(
+                "SELECT id, message FROM outbox WHERE status IN ('pending', 'sending') AND next_attempt_at <= ? "
+                "ORDER BY next_attempt_at LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            self._conn.executemany(
+                "UPDATE outbox SET status = 'sending', next_attempt_at = ?, updated_at = ? WHERE id = ?",
+                [(now + self.lease_seconds, now, row[0]) for row in rows]
+            )
+            self._conn.commit()
+        return [(row_id, email.message_from_string(raw)) for row_id, raw in rows]
+
+    def mark_sent(self, message_id: int) -> None:
+        """发送成功，从队列中删除"""
+        with self._lock:
+            self._conn.execute("DELETE FROM outbox WHERE id = ?", (message_id,))
+            self._conn.commit()
+            self.sent += 1
+
+    def mark_failed(self, message_id: int, error: Exception) -> str:
+        """
+        记录发送失败，按指数退避安排重试或转入死信
+
+        Args:
+            message_id: 邮件ID
+            error: 发送错误
+
+        Returns:
+            str: 邮件的新状态（pending 或 dead）
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT attempts FROM outbox WHERE id = ?", (message_id,)).fetchone()
+            if row is None:
+                return "missing"
+            attempts = row[0] + 1
+            if is_permanent_error(error) or attempts >= self.max_attempts:
+                status, next_attempt_at = "dead", now
+            else:
+                # 指数退避并加入随机抖动，避免大量邮件同时重试
+                delay = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+                status, next_attempt_at = "pending", now + delay * random.uniform(0.8, 1.2)
+            self._conn.execute(
+                "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, last_error = ?, updated_at = ? "
+                "WHERE id = ?",
+                (status, attempts, next_attempt_at, str(error)[:1000], now, message_id)
+            )
+            self._conn.commit()
+        return status
+
+    def requeue(self, message_id: int) -> bool:
+        """将死信重新放回队列，立即重试"""
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = 0, next_attempt_at = ?, updated_at = ? "
+                "WHERE id = ? AND status = 'dead'",
+                (now, now, message_id)
+            )
+            self._conn.commit()
+            return cursor.rowcount > 0
+
+    def dead_letters(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """最近的死信列表"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, recipient, subject, attempts, last_error, created_at, updated_at FROM outbox "
+                "WHERE status = 'dead' ORDER BY updated_at DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        keys = ("id", "recipient", "subject", "attempts", "last_error", "created_at", "updated_at")
+        return [dict(zip(keys, row)) for row in rows]
+
+    def stats(self) -> Dict[str, Any]:
+        """队列深度：各状态的邮件数、到期待发数和最早待发邮件的等待时间"""
+        now = time.time()
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+            due, oldest = self._conn.execute(
+                "SELECT COUNT(*), MIN(created_at) FROM outbox WHERE status IN ('pending', 'sending') "
+                "AND next_attempt_at <= ?",
+                (now,)
+            ).fetchone()
+        return {
+            "pending": counts.get("pending", 0),
+            "sending": counts.get("sending", 0),
+            "dead": counts.get("dead", 0),
+            "due": due,
+            "oldest_due_age_seconds": round(now - oldest, 1) if oldest else 0.0,
+            "sent": self.sent,
+        }
+
+
+class MailQueueWorker:
+    """发件队列的后台发送任务
+
+    在事件循环中运行若干个发送任务，每次取出一批到期邮件，在线程中通过复用的 SMTP 会话发送。
+    """
+
+    def __init__(self, queue: MailQueue, mail_service: Any, workers: int = 1,
+                 batch_size: int = 50, poll_interval: float = 5.0, config_retry_interval: float = 60.0):
+        """
+        初始化发送任务
+
+        Args:
+            queue: 发件队列
+            mail_service: 邮件服务，提供 validate_config 和复用的 SMTP 会话 pool
+            workers: 发送任务数
+            batch_size: 每次取出的邮件数
+            poll_interval: 队列为空时的轮询间隔（秒）
+            config_retry_interval: 邮件配置不完整时重新检查配置的间隔（秒）
+        """
+        self.queue = queue
+        self.mail_service = mail_service
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.config_retry_interval = config_retry_interval
+        self.logger = logging.getLogger(__name__)
+        self._config_valid: Optional[bool] = None
+        self._config_checked_at = 0.0
+        self._tasks: List[asyncio.Task] = []
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """绑定运行发送任务的事件循环（应用启动时调用）"""
+        self._loop = loop
+
+    def start(self) -> None:
+        """在绑定的事件循环中启动发送任务（可在任意线程调用，如调度主进程选举线程）"""
+        if self._loop is None or self._loop.is_closed():
+            self.logger.warning("发件队列未绑定事件循环，无法启动发送任务")
+            return
+        self._loop.call_soon_threadsafe(self._start_tasks)
+
+    def _start_tasks(self) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._tasks = [self._loop.create_task(self._run()) for _ in range(self.workers)]
+        self.logger.info(f"发件队列已启动 {self.workers} 个发送任务")
+
+    def wake(self) -> None:
+        """有新邮件入队时立即唤醒发送任务（可在任意线程调用）"""
+        if self._loop is not None and self._wakeup is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def stop(self) -> None:
+        """停止发送任务"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                processed = await self.drain_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"处理发件队列时出错: {str(e)}")
+                processed = 0
+            if processed == 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                self._wakeup.clear()
+
+    def _send(self, batch: List[Tuple[int, Message]]) -> None:
+        """在线程中发送一批邮件并更新队列状态"""
+        results = self.mail_service.pool.send_many([msg for _, msg in batch])
+        for (message_id, msg), (_, error) in zip(batch, results):
+            if error is None:
+                self.queue.mark_sent(message_id)
+                self.logger.info(f"成功发送邮件到 {msg['To']}")
+            else:
+                status = self.queue.mark_failed(message_id, error)
+                if status == "dead":
+                    self.logger.error(f"邮件 {message_id}（{msg['To']}）发送失败，已转入死信: {str(error)}")
+
+    def _config_ready(self) -> bool:
+        """邮件配置是否完整；不完整时每隔 config_retry_interval 重新检查一次，期间邮件保留在队列中"""
+        now = time.monotonic()
+        if self._config_valid is None or (
+            not self._config_valid and now - self._config_checked_at >= self.config_retry_interval
+        ):
+            valid = self.mail_service.validate_config()
+            if not valid and self._config_valid is None:
+                self.logger.warning("邮件配置不完整，发件队列中的邮件将保留到配置完成后再发送")
+            elif valid and self._config_valid is False:
+                self.logger.info("邮件配置已完整，开始发送发件队列中的邮件")
+            self._config_valid = valid
+            self._config_checked_at = now
+        return self._config_valid
+
+    async def drain_once(self) -> int:
+        """
+        取出并发送一批到期邮件（邮件配置不完整时不取出）
+
+        Returns:
+            int: 本次处理的邮件数
+        """
+        if not self._config_ready():
+            return 0
+        batch = await asyncio.to_thread(self.queue.claim, self.batch_size)
+        if batch:
+            await asyncio.to_thread(self._send, batch)
+        return len(batch)
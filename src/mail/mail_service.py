@@ -1,9 +1,10 @@
 import os
 import logging
-import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
+from .smtp_pool import SMTPPool
+from .email_templates import EmailRenderer
 
 class MailService:
     """邮件服务类"""
@@ -14,9 +15,27 @@ class MailService:
         self.smtp_port = int(os.getenv('SMTP_PORT', '587'))
         self.smtp_username = os.getenv('SMTP_USERNAME')
         self.smtp_password = os.getenv('SMTP_PASSWORD')
+        self.smtp_use_tls = os.getenv('SMTP_USE_TLS', 'true').lower() != 'false'
+        self.smtp_max_messages = int(os.getenv('SMTP_MAX_MESSAGES_PER_SESSION', '100'))
         
         # 配置日志
         self.logger = logging.getLogger(__name__)
+        self._pool: Optional[SMTPPool] = None
+        self.renderer = EmailRenderer()
+        
+    @property
+    def pool(self) -> SMTPPool:
+        """复用的 SMTP 会话，首次发送时创建"""
+        if self._pool is None:
+            self._pool = SMTPPool(
+                self.smtp_server,
+                self.smtp_port,
+                username=self.smtp_username,
+                password=self.smtp_password,
+                use_tls=self.smtp_use_tls,
+                max_messages=self.smtp_max_messages
+            )
+        return self._pool
         
     def validate_config(self) -> bool:
         """验证邮件配置是否完整"""
@@ -39,18 +58,8 @@ class MailService:
             return
             
         try:
-            # 创建邮件
-            msg = MIMEMultipart()
-            msg['From'] = self.smtp_username
-            msg['To'] = to_email
-            msg['Subject'] = 'GitHub 项目更新通知'
-            
-            # 构建邮件内容
-            email_body = self._build_update_email_body(updates)
-            msg.attach(MIMEText(email_body, 'html'))
-            
             # 发送邮件
-            self._send_email(msg)
+            self._send_email(self.build_repo_updates_message(to_email, updates))
             self.logger.info(f"成功发送邮件到 {to_email}")
             
         except Exception as e:
@@ -71,101 +80,95 @@ class MailService:
             return
             
         try:
-            # 创建邮件
-            msg = MIMEMultipart()
-            msg['From'] = self.smtp_username
-            msg['To'] = to_email
-            msg['Subject'] = 'GitHub 项目每日总结'
-            
-            # 构建邮件内容
-            email_body = "<html><body>"
-            email_body += "<h2>GitHub 项目每日总结</h2>"
-            
-            email_body += "<h3>热门项目总结</h3>"
-            email_body += f"<p>{hot_repos_summary}</p>"
-            
-            email_body += "<h3>已追踪项目更新总结</h3>"
-            email_body += f"<p>{tracked_repos_summary}</p>"
-            
-            email_body += "</body></html>"
-            
-            msg.attach(MIMEText(email_body, 'html'))
-            
             # 发送邮件
-            self._send_email(msg)
+            self._send_email(self.build_daily_summary_message(to_email, hot_repos_summary, tracked_repos_summary))
             self.logger.info(f"成功发送每日总结邮件到 {to_email}")
             
         except Exception as e:
             self.logger.error(f"发送每日总结邮件时出错: {str(e)}")
             raise
             
-    def _build_update_email_body(self, updates: List[Dict[str, Any]]) -> str:
-        """构建更新邮件内容
+    def _build_message(self, to_email: str, subject: str, body: Tuple[str, str]) -> MIMEMultipart:
+        """构建同时包含纯文本和 HTML 正文的邮件
+        
+        Args:
+            to_email: 接收者邮箱
+            subject: 邮件主题
+            body: HTML 正文和纯文本正文
+            
+        Returns:
+            MIMEMultipart: 邮件消息对象
+        """
+        html_body, text_body = body
+        msg = MIMEMultipart('alternative')
+        msg['From'] = self.smtp_username
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        # 客户端优先显示最后一个可识别的部分，HTML 放在最后
+        msg.attach(MIMEText(text_body, 'plain', 'utf-8'))
+        msg.attach(MIMEText(html_body, 'html', 'utf-8'))
+        return msg
+        
+    def build_repo_updates_message(self, to_email: str, updates: List[Dict[str, Any]]) -> MIMEMultipart:
+        """构建仓库更新邮件，各仓库的更新片段在收件人之间共享
         
         Args:
+            to_email: 接收者邮箱
             updates: 仓库更新信息列表
             
         Returns:
-            str: HTML格式的邮件内容
+            MIMEMultipart: 邮件消息对象
         """
-        email_body = "<html><body>"
-        email_body += "<h2>GitHub 项目更新通知</h2>"
-        email_body += f"<p>以下是您关注的项目在最近一周的更新动态：</p>"
+        return self._build_message(to_email, 'GitHub 项目更新通知', self.renderer.render_updates(updates))
+        
+    def build_daily_summary_message(self, to_email: str, hot_repos_summary: str, tracked_repos_summary: str) -> MIMEMultipart:
+        """构建每日总结邮件
         
-        for update in updates:
-            repo = update['repo']
-            activities = update['activities']
+        Args:
+            to_email: 接收者邮箱
+            hot_repos_summary: 热门项目总结
+            tracked_repos_summary: 已追踪项目总结
             
-            self.logger.info(f"添加仓库 {repo['full_name']} 的更新信息到邮件内容")
+        Returns:
+            MIMEMultipart: 邮件消息对象
+        """
+        return self._build_message(
+            to_email, 'GitHub 项目每日总结',
+            self.renderer.render_daily_summary(hot_repos_summary, tracked_repos_summary)
+        )
+        
+    def build_digest_message(self, to_email: str, updates: List[Dict[str, Any]],
+                             summary: Optional[Tuple[str, str]] = None) -> MIMEMultipart:
+        """构建合并摘要邮件，包含同一收件人在摘要窗口内到期的所有任务
+        
+        Args:
+            to_email: 接收者邮箱
+            updates: 按仓库去重后的仓库更新信息列表
+            summary: 热门项目总结和已追踪项目总结，没有时为 None
             
-            email_body += f"<h3>{repo['name']} ({repo['full_name']})</h3>"
-            email_body += f"<p>Stars: {repo['stars']}, Forks: {repo['forks']}</p>"
+        Returns:
+            MIMEMultipart: 邮件消息对象
+        """
+        return self._build_message(to_email, 'GitHub 项目摘要', self.renderer.render_digest(updates, summary))
+        
+    def send_batch(self, messages: List[MIMEMultipart]) -> List[Tuple[str, Optional[str]]]:
+        """通过同一个已登录的会话批量发送邮件
+        
+        会话达到单会话发送上限或连接断开时自动重连，单封邮件失败不影响其余邮件。
+        
+        Args:
+            messages: 邮件消息对象列表
             
-            # 提交信息
-            if activities.get('commits'):
-                email_body += "<h4>最新提交</h4><ul>"
-                for commit in activities['commits'][:5]:
-                    message = commit['message'].split('\n')[0]
-                    email_body += f"<li>{message} (作者: {commit['author']})</li>"
-                if len(activities['commits']) > 5:
-                    email_body += f"<li>... 还有 {len(activities['commits']) - 5} 个提交</li>"
-                email_body += "</ul>"
-                
-            # Issue信息
-            if activities.get('issues'):
-                email_body += "<h4>最新议题</h4><ul>"
-                for issue in activities['issues'][:5]:
-                    email_body += f"<li>{issue['title']} (状态: {issue['state']})</li>"
-                if len(activities['issues']) > 5:
-                    email_body += f"<li>... 还有 {len(activities['issues']) - 5} 个议题</li>"
-                email_body += "</ul>"
-                
-            # PR信息
-            if activities.get('pull_requests'):
-                email_body += "<h4>最新拉取请求</h4><ul>"
-                for pr in activities['pull_requests'][:5]:
-                    email_body += f"<li>{pr['title']} (状态: {pr['state']})</li>"
-                if len(activities['pull_requests']) > 5:
-                    email_body += f"<li>... 还有 {len(activities['pull_requests']) - 5} 个拉取请求</li>"
-                email_body += "</ul>"
-                
-            # 发布信息
-            if activities.get('releases'):
-                email_body += "<h4>最新发布</h4><ul>"
-                for release in activities['releases'][:5]:
-                    email_body += f"<li>{release['name']} (标签: {release['tag']})</li>"
-                if len(activities['releases']) > 5:
-                    email_body += f"<li>... 还有 {len(activities['releases']) - 5} 个发布</li>"
-                email_body += "</ul>"
-                
-            # 添加仓库链接
-            email_body += f"<p><a href=\"{repo['url']}\">访问仓库</a></p>"
-            email_body += "<hr/>"
+        Returns:
+            List[Tuple[str, Optional[str]]]: 每封邮件的接收者及错误信息（成功时为 None）
+        """
+        if not self.validate_config():
+            return [(msg['To'], "邮件服务器配置不完整") for msg in messages]
             
-        email_body += "<p>此邮件由 GitHub 项目追踪器自动发送，请勿直接回复。</p>"
-        email_body += "</body></html>"
-        
-        return email_body
+        results = self.pool.send_many(messages)
+        sent = sum(1 for _, error in results if error is None)
+        self.logger.info(f"批量发送邮件完成: 成功 {sent}/{len(results)}，共建立 {self.pool.sessions_opened} 次SMTP会话")
+        return [(msg['To'], str(error) if error else None) for msg, error in results]
         
     def _send_email(self, msg: MIMEMultipart) -> None:
         """发送邮件
@@ -174,18 +177,13 @@ class MailService:
             msg: 邮件消息对象
         """
         try:
-            self.logger.info(f"连接到SMTP服务器 {self.smtp_server}:{self.smtp_port}...")
-            server = smtplib.SMTP(self.smtp_server, self.smtp_port)
-            self.logger.info("启用TLS加密...")
-            server.ehlo()
-            server.starttls()
-            server.ehlo()
-            self.logger.info("尝试登录SMTP服务器...")
-            server.login(self.smtp_username, self.smtp_password)
-            self.logger.info("登录成功，发送邮件...")
-            server.send_message(msg)
-            self.logger.info("邮件发送完成，关闭SMTP连接...")
-            server.quit()
+            # 复用已登录的会话，断开时自动重连
+            self.pool.send(msg)
         except Exception as e:
             self.logger.error(f"发送邮件时出错: {str(e)}")
-            raise 
\ No newline at end of file
+            raise
+            
+    def close(self) -> None:
+        """关闭复用的 SMTP 会话"""
+        if self._pool is not None:
+            self._pool.close()
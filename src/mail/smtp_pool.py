@@ -0,0 +1,142 @@
+import time
+import socket
+import logging
+import smtplib
+import threading
+from email.message import Message
+from typing import Iterable, List, Optional, Tuple
+
+# 连接被断开或超时时重新连接后重试，其余错误（如收件人被拒绝）直接返回
+_RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, socket.timeout)
+
+
+class SMTPPool:
+    """复用的 SMTP 会话
+
+    连接、STARTTLS 和登录只在建立会话时进行一次，之后的邮件复用同一会话。
+    每个会话最多发送 max_messages 封邮件，空闲超过 idle_timeout 秒或连接断开时自动重连。
+    """
+
+    def __init__(self, host: str, port: int, username: Optional[str] = None, password: Optional[str] = None,
+                 use_tls: bool = True, max_messages: int = 100, idle_timeout: float = 60.0,
+                 max_retries: int = 2, timeout: float = 30.0):
+        """
+        初始化 SMTP 会话池
+
+        Args:
+            host: SMTP 服务器地址
+            port: SMTP 服务器端口
+            username: 登录用户名，为空时不登录
+            password: 登录密码
+            use_tls: 是否启用 STARTTLS
+            max_messages: 单个会话最多发送的邮件数，达到后重新建立会话
+            idle_timeout: 会话空闲超过该秒数后重新建立，避免使用已被服务器关闭的连接
+            max_retries: 连接断开时的最大重试次数
+            timeout: 网络操作超时（秒）
+        """
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.use_tls = use_tls
+        self.max_messages = max_messages
+        self.idle_timeout = idle_timeout
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.logger = logging.getLogger(__name__)
+        self.sessions_opened = 0
+
+        self._server: Optional[smtplib.SMTP] = None
+        self._sent = 0
+        self._last_used = 0.0
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        """建立新会话：连接、STARTTLS、登录"""
+        self.logger.info(f"连接到SMTP服务器 {self.host}:{self.port}...")
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        try:
+            server.ehlo()
+            if self.use_tls:
+                server.starttls()
+                server.ehlo()
+            if self.username:
+                server.login(self.username, self.password)
+        except Exception:
+            server.close()
+            raise
+        self._server = server
+        self._sent = 0
+        self.sessions_opened += 1
+
+    def _disconnect(self) -> None:
+        if self._server is None:
+            return
+        try:
+            self._server.quit()
+        except Exception:
+            self._server.close()
+        self._server = None
+
+    def _ensure_session(self) -> smtplib.SMTP:
+        """获取可用会话，达到发送上限或空闲过久时重新建立"""
+        if self._server is not None:
+            if self._sent >= self.max_messages or time.monotonic() - self._last_used > self.idle_timeout:
+                self._disconnect()
+        if self._server is None:
+            self._connect()
+        return self._server
+
+    def send(self, msg: Message) -> None:
+        """
+        通过复用的会话发送一封邮件，连接断开时重连后重试
+
+        Args:
+            msg: 邮件消息对象
+        """
+        with self._lock:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self._ensure_session().send_message(msg)
+                    self._sent += 1
+                    self._last_used = time.monotonic()
+                    return
+                except _RECONNECT_ERRORS as e:
+                    if self._server is not None:
+                        self._server.close()
+                        self._server = None
+                    if attempt >= self.max_retries:
+                        raise
+                    self.logger.warning(f"SMTP连接已断开，重新连接后重试（第 {attempt + 1} 次）: {str(e)}")
+                except smtplib.SMTPException:
+                    # 单封邮件被拒绝不影响会话本身，重置事务状态后继续使用
+                    try:
+                        self._server.rset()
+                    except Exception:
+                        self._disconnect()
+                    raise
+
+    def send_many(self, messages: Iterable[Message]) -> List[Tuple[Message, Optional[Exception]]]:
+        """
+        依次发送多封邮件，单封失败不影响其余邮件
+
+        Args:
+            messages: 邮件列表
+
+        Returns:
+            List[Tuple[Message, Optional[Exception]]]: 每封邮件及其错误（成功时为 None）
+        """
+        results = []
+        for msg in messages:
+            try:
+                self.send(msg)
+                results.append((msg, None))
+            except Exception as e:
+                self.logger.error(f"发送邮件到 {msg.get('To')} 时出错: {str(e)}")
+                results.append((msg, e))
+        return results
+
+    def close(self) -> None:
+        """关闭当前会话"""
+        with self._lock:
+            self._disconnect()
@@ -0,0 +1,164 @@
+import json
+import time
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from .utils.rate_limiter import github_quota
+
+
+class PollingPlanner:
+    """按仓库活跃度自适应的轮询计划
+
+    每个仓库的事件速率取自最近一次保存的活动数据：活动窗口内的事件数除以窗口长度。
+    轮询间隔使每次轮询平均能发现 target_events 个新事件，并限制在最短和最长间隔之间，
+    活跃的仓库轮询得更频繁，冷清的仓库轮询得更少，API 配额用在有变化的仓库上。
+    上次轮询时间取自活动数据文件的修改时间，预抓取和手动刷新也计入。
+    """
+
+    def __init__(self, repo_tracker: Any, min_interval: float = 3600.0, max_interval: float = 259200.0,
+                 target_events: float = 5.0, days: int = 7, max_per_tick: int = 10,
+                 calls_per_repo: int = 5, reserve_calls: int = 500):
+        """
+        初始化轮询计划
+
+        Args:
+            repo_tracker: 仓库活动追踪器
+            min_interval: 最短轮询间隔（秒）
+            max_interval: 最长轮询间隔（秒），应小于活动窗口，避免漏掉窗口外的事件
+            target_events: 每次轮询期望发现的新事件数
+            days: 每次轮询获取最近几天的活动，也是估计事件速率的窗口
+            max_per_tick: 每轮最多轮询的仓库数
+            calls_per_repo: 轮询一个仓库大约消耗的 API 调用次数
+            reserve_calls: 为接口请求和预抓取保留的 API 调用次数
+        """
+        self.repo_tracker = repo_tracker
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_events = target_events
+        self.days = days
+        self.max_per_tick = max_per_tick
+        self.calls_per_repo = calls_per_repo
+        self.reserve_calls = reserve_calls
+        self.logger = logging.getLogger(__name__)
+        # 活动数据文件 -> 事件速率（每小时），文件名带时间戳，内容不会变化
+        self._rates: Dict[str, float] = {}
+        self._config_mtime: Optional[float] = None
+        # 仓库 -> 最近一次轮询失败的时间，失败后按最短间隔重试
+        self._failed: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def _tracked_repos(self) -> List[str]:
+        """追踪的仓库列表，配置文件修改后重新读取"""
+        config_file = self.repo_tracker.config_file
+        mtime = config_file.stat().st_mtime if config_file.exists() else None
+        if mtime != self._config_mtime:
+            self._config_mtime = mtime
+            self.repo_tracker.reload_tracked_repos()
+        return [repo['full_name'] for repo in self.repo_tracker.tracked_repos]
+
+    def _event_rate(self, path: Path) -> float:
+        """根据活动数据文件估计仓库的事件速率（每小时）"""
+        key = str(path)
+        rate = self._rates.get(key)
+        if rate is None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    activities = json.load(f).get('activities', {})
+            except (OSError, json.JSONDecodeError) as e:
+                self.logger.warning(f"读取活动数据 {path.name} 时出错: {str(e)}")
+                activities = {}
+            events = sum(len(activities.get(category, [])) for category in self.repo_tracker.EVENT_CATEGORIES)
+            rate = events / (self.days * 24)
+            self._rates[key] = rate
+        return rate
+
+    def interval_for(self, rate: float) -> float:
+        """
+        根据事件速率计算轮询间隔
+
+        Args:
+            rate: 每小时的事件数
+
+        Returns:
+            float: 轮询间隔（秒）
+        """
+        if rate <= 0:
+            return self.max_interval
+        return min(self.max_interval, max(self.min_interval, self.target_events / rate * 3600))
+
+    def plan(self, now: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        计算每个追踪仓库的下一次轮询时间
+
+        Args:
+            now: 当前时间戳，默认为现在
+
+        Returns:
+            List[Dict[str, Any]]: 每个仓库的事件速率、轮询间隔、上次和下次轮询时间，按下次轮询时间排序
+        """
+        now = now if now is not None else time.time()
+        plan = []
+        with self._lock:
+            repos = self._tracked_repos()
+            latest_files = set()
+            for repo in repos:
+                latest = self.repo_tracker.latest_activity_file(repo)
+                retry_at = self._failed.get(repo, now - self.min_interval) + self.min_interval
+                if latest is None:
+                    # 从未轮询过的仓库立即轮询
+                    plan.append({"repo": repo, "events_per_day": None, "interval_seconds": None,
+                                 "last_polled": None, "next_poll": max(now, retry_at)})
+                    continue
+                latest_files.add(str(latest))
+                rate = self._event_rate(latest)
+                interval = self.interval_for(rate)
+                last_polled = latest.stat().st_mtime
+                plan.append({"repo": repo, "events_per_day": round(rate * 24, 2), "interval_seconds": round(interval),
+                             "last_polled": last_polled, "next_poll": max(last_polled + interval, retry_at)})
+            # 只保留各仓库最新文件的速率
+            self._rates = {key: rate for key, rate in self._rates.items() if key in latest_files}
+        return sorted(plan, key=lambda entry: entry["next_poll"])
+
+    def _budget(self, now: float) -> int:
+        """本轮可以轮询的仓库数，配额不足时为 0"""
+        remaining, reset_at = github_quota(self.repo_tracker.github)
+        available = remaining - self.reserve_calls
+        if available < self.calls_per_repo:
+            self.logger.warning(f"GitHub API 剩余配额 {remaining}，轮询推迟到配额重置后")
+            return 0
+        minutes_left = max((reset_at - now) / 60, 1.0)
+        return min(self.max_per_tick, max(1, int(available / self.calls_per_repo / minutes_left)))
+
+    def poll_due(self, now: Optional[float] = None) -> List[str]:
+        """
+        轮询已到时间的仓库（由调度器定期调用），最久未轮询的优先
+
+        Args:
+            now: 当前时间戳，默认为现在
+
+        Returns:
+            List[str]: 成功轮询并保存的仓库
+        """
+        now = now if now is not None else time.time()
+        due = [entry["repo"] for entry in self.plan(now) if entry["next_poll"] <= now]
+        if not due:
+            return []
+
+        budget = self._budget(now)
+        polled = []
+        for repo in due[:budget]:
+            try:
+                activities = self.repo_tracker.get_repo_activities(repo, days=self.days)
+                if activities and self.repo_tracker.save_activities(activities):
+                    polled.append(repo)
+                    self._failed.pop(repo, None)
+                    continue
+                self.logger.warning(f"未能获取仓库 {repo} 的活动数据")
+            except Exception as e:
+                self.logger.error(f"轮询仓库 {repo} 时出错: {str(e)}")
+            self._failed[repo] = now
+        if len(due) > budget:
+            self.logger.info(f"{len(due) - budget} 个到期仓库顺延到下一轮轮询")
+        return polled
@@ -0,0 +1,150 @@
+import time
+import random
+import logging
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from .utils.rate_limiter import github_quota
+
+
+class PrefetchPlanner:
+    """定时投递前的仓库预抓取计划
+
+    在每个投递时间之前的窗口内，把该次投递订阅的仓库均匀分散到不同时刻抓取，
+    每个仓库再加上稳定的随机抖动，避免所有任务在同一分钟访问 GitHub API。
+    抓取前按剩余的 API 配额控制节奏，配额不足时推迟到配额重置后。
+    抓取结果写入活动数据存储，投递时直接读取，只需渲染和发送。
+    """
+
+    def __init__(self, repo_tracker: Any, github_tracker: Any, window_seconds: float = 1500.0,
+                 lead_seconds: float = 120.0, calls_per_repo: int = 5, reserve_calls: int = 500,
+                 min_interval: float = 2.0, tick_seconds: float = 60.0, days: int = 7):
+        """
+        初始化预抓取计划
+
+        Args:
+            repo_tracker: 仓库活动追踪器
+            github_tracker: 热门仓库追踪器，用于获取仓库详情
+            window_seconds: 投递前多长时间内开始预抓取（秒），应小于投递读取存储数据的有效期
+            lead_seconds: 最晚在投递前多少秒完成预抓取
+            calls_per_repo: 抓取一个仓库大约消耗的 API 调用次数
+            reserve_calls: 为接口请求等其他用途保留的 API 调用次数
+            min_interval: 两次抓取之间的最小间隔（秒），避免触发 GitHub 的次级限流
+            tick_seconds: 调度器调用 run 的间隔（秒），单轮抓取不超过该时长
+            days: 获取最近几天的活动
+        """
+        self.repo_tracker = repo_tracker
+        self.github_tracker = github_tracker
+        self.window_seconds = window_seconds
+        self.lead_seconds = lead_seconds
+        self.calls_per_repo = calls_per_repo
+        self.reserve_calls = reserve_calls
+        self.min_interval = min_interval
+        self.tick_seconds = tick_seconds
+        self.days = days
+        self.logger = logging.getLogger(__name__)
+        # 已完成预抓取的 (仓库, 投递时间)
+        self._done: Set[Tuple[str, datetime]] = set()
+        self._last_fetch = 0.0
+        self._lock = threading.Lock()
+
+    def plan(self, deliveries: Iterable[Tuple[datetime, List[str]]]) -> List[Tuple[datetime, str, datetime]]:
+        """
+        为即将到来的投递安排预抓取时间
+
+        同一仓库被多次投递订阅时只为最早的一次安排。每次投递的仓库按顺序均匀占据窗口中的时段，
+        在各自时段内按仓库和投递时间取稳定的随机偏移，重新计划时时间不会变化。
+
+        Args:
+            deliveries: (投递时间, 订阅的仓库列表)
+
+        Returns:
+            List[Tuple[datetime, str, datetime]]: (抓取时间, 仓库, 投递时间)，按抓取时间排序
+        """
+        earliest: Dict[str, datetime] = {}
+        for run_time, repos in deliveries:
+            for repo in repos:
+                if repo not in earliest or run_time < earliest[repo]:
+                    earliest[repo] = run_time
+
+        by_delivery: Dict[datetime, List[str]] = {}
+        for repo, run_time in earliest.items():
+            by_delivery.setdefault(run_time, []).append(repo)
+
+        span = max(self.window_seconds - self.lead_seconds, 1.0)
+        schedule = []
+        for run_time, repos in by_delivery.items():
+            window_start = run_time - timedelta(seconds=self.window_seconds)
+            slot = span / len(repos)
+            for index, repo in enumerate(sorted(repos)):
+                jitter = random.Random(f"{repo}@{run_time.isoformat()}").uniform(0, slot)
+                schedule.append((window_start + timedelta(seconds=index * slot + jitter), repo, run_time))
+        return sorted(schedule)
+
+    def _budget(self, now: float) -> int:
+        """本轮可以抓取的仓库数：把剩余配额平均分配到配额重置前的每一分钟"""
+        remaining, reset_at = github_quota(self.repo_tracker.github)
+        available = remaining - self.reserve_calls
+        if available < self.calls_per_repo:
+            self.logger.warning(f"GitHub API 剩余配额 {remaining}，预抓取推迟到配额重置后")
+            return 0
+        minutes_left = max((reset_at - now) / 60, 1.0)
+        return max(1, int(available / self.calls_per_repo / minutes_left))
+
+    def _fetch(self, repo_full_name: str) -> bool:
+        """抓取仓库活动和详情并写入活动数据存储"""
+        activities = self.repo_tracker.get_repo_activities(repo_full_name, days=self.days)
+        if not activities:
+            return False
+        # 仓库详情一并保存，投递时不再请求 GitHub；获取失败时不保存，投递时重新获取
+        details = self.github_tracker.fetch_repository_details(repo_full_name)
+        if details is not None:
+            activities['repo_details'] = details
+        return self.repo_tracker.save_activities(activities) is not None
+
+    def run(self, deliveries: List[Tuple[datetime, List[str]]], now: Optional[datetime] = None) -> int:
+        """
+        执行已到时间的预抓取（由调度器定期调用）
+
+        Args:
+            deliveries: (投递时间, 订阅的仓库列表)
+            now: 当前时间，默认为现在
+
+        Returns:
+            int: 本轮抓取的仓库数
+        """
+        now = now or datetime.now(timezone.utc)
+        horizon = now + timedelta(seconds=self.window_seconds)
+        upcoming = [(run_time, repos) for run_time, repos in deliveries if now < run_time <= horizon]
+
+        with self._lock:
+            # 清理已过投递时间的记录
+            self._done = {(repo, run_time) for repo, run_time in self._done if run_time > now}
+            due = [(repo, run_time) for fetch_at, repo, run_time in self.plan(upcoming)
+                   if fetch_at <= now and (repo, run_time) not in self._done]
+            if not due:
+                return 0
+
+            budget = self._budget(now.timestamp())
+            deadline = time.monotonic() + self.tick_seconds
+            fetched = attempted = 0
+            for repo, run_time in due[:budget]:
+                if time.monotonic() >= deadline:
+                    break
+                attempted += 1
+                wait = self.min_interval - (time.monotonic() - self._last_fetch)
+                if wait > 0:
+                    time.sleep(wait)
+                try:
+                    if self._fetch(repo):
+                        fetched += 1
+                except Exception as e:
+                    self.logger.error(f"预抓取仓库 {repo} 时出错: {str(e)}")
+                finally:
+                    self._last_fetch = time.monotonic()
+                    # 失败的仓库不重试，投递时会重新抓取
+                    self._done.add((repo, run_time))
+            if len(due) > attempted:
+                self.logger.info(f"预抓取受 API 配额限制，{len(due) - attempted} 个仓库顺延到下一轮")
+            return fetched
@@ -1,25 +1,120 @@
+import re
 import json
 from datetime import datetime, timedelta, timezone
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Callable, Dict, List, Any, Optional, Set
 from github import Github
 
 class RepoActivityTracker:
     """追踪特定GitHub仓库的活动"""
     
-    def __init__(self, token: str, base_dir: Path):
+    def __init__(self, token: str, base_dir: Path, keep_files: Optional[int] = None):
         """
         初始化仓库活动追踪器
         
         Args:
             token: GitHub API 访问令牌
             base_dir: 项目根目录
+            keep_files: 每个仓库保留的最近活动数据文件数，为 None 时全部保留
         """
         self.github = Github(token)
         self.base_dir = base_dir
+        self.keep_files = keep_files
         self.data_dir = base_dir / "data" / "repo_activities"
         self.config_file = base_dir / "config" / "tracked_repos.json"
         self.tracked_repos = self._load_tracked_repos()
+        self.listeners: List[Callable[[Dict[str, Any]], None]] = []
+        
+    def add_listener(self, listener: Callable[[Dict[str, Any]], None]) -> None:
+        """注册新动态监听器，保存活动数据发现新事件时调用
+        
+        Args:
+            listener: 接收增量消息的回调
+        """
+        self.listeners.append(listener)
+        
+    # 参与新事件判断的活动类型
+    EVENT_CATEGORIES = ("commits", "issues", "pull_requests", "releases")
+    
+    @staticmethod
+    def event_id(category: str, item: Dict[str, Any]) -> str:
+        """单个活动的事件ID，议题和拉取请求更新后视为新事件
+        
+        Args:
+            category: 活动类型
+            item: 活动数据
+        """
+        if category == "commits":
+            return item["sha"]
+        if category == "releases":
+            return item["tag"]
+        return f"{item['number']}@{item['updated_at']}"
+        
+    @classmethod
+    def activity_event_ids(cls, activities: Dict[str, Any]) -> Dict[str, Set[str]]:
+        """提取各类活动的事件ID，用于判断哪些事件是新的
+        
+        Args:
+            activities: get_repo_activities 返回结果中的 activities 字段
+        """
+        return {
+            category: {cls.event_id(category, item) for item in activities.get(category, [])}
+            for category in cls.EVENT_CATEGORIES
+        }
+        
+    def activity_files(self, repo_full_name: str) -> List[Path]:
+        """仓库的所有活动数据文件，按保存时间从旧到新排列
+        
+        Args:
+            repo_full_name: 仓库全名
+        """
+        repo_name = repo_full_name.replace('/', '_')
+        pattern = re.compile(rf"^{re.escape(repo_name)}_\d{{8}}_\d{{6}}\.json$")
+        return sorted((f for f in self.data_dir.glob(f"{repo_name}_*.json") if pattern.match(f.name)), key=lambda f: f.name)
+        
+    def latest_activity_file(self, repo_full_name: str) -> Optional[Path]:
+        """查找仓库最新的活动数据文件
+        
+        Args:
+            repo_full_name: 仓库全名
+        """
+        files = self.activity_files(repo_full_name)
+        return files[-1] if files else None
+        
+    def _prune_activity_files(self, repo_full_name: str) -> None:
+        """删除超出保留数量的旧活动数据文件（轮询每小时都可能写入新文件）"""
+        if not self.keep_files:
+            return
+        for old_file in self.activity_files(repo_full_name)[:-self.keep_files]:
+            try:
+                old_file.unlink()
+            except OSError as e:
+                print(f"删除旧活动数据 {old_file.name} 时出错: {str(e)}")
+        
+    def _compute_delta(self, activities: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """与上一次保存的数据比较，计算新增事件数"""
+        previous_ids = {key: set() for key in ("commits", "issues", "pull_requests", "releases")}
+        previous_file = self.latest_activity_file(activities['repository'])
+        if previous_file:
+            try:
+                with open(previous_file, 'r', encoding='utf-8') as f:
+                    previous_ids = self.activity_event_ids(json.load(f).get('activities', {}))
+            except (OSError, json.JSONDecodeError) as e:
+                print(f"读取历史活动数据时出错: {str(e)}")
+                
+        current_ids = self.activity_event_ids(activities['activities'])
+        counts = {key: len(ids - previous_ids[key]) for key, ids in current_ids.items()}
+        new_events = sum(counts.values())
+        if not new_events:
+            return None
+            
+        return {
+            "type": "activity",
+            "repo": activities['repository'],
+            "new_events": new_events,
+            "counts": counts,
+            "timestamp": activities['timestamp']
+        }
         
     def _load_tracked_repos(self) -> List[Dict[str, str]]:
         """加载要追踪的仓库列表"""
@@ -34,6 +129,11 @@ class RepoActivityTracker:
             print(f"配置文件格式错误: {self.config_file}")
             return []
             
+    def reload_tracked_repos(self) -> List[Dict[str, str]]:
+        """重新读取追踪的仓库列表（接口修改配置文件后使用）"""
+        self.tracked_repos = self._load_tracked_repos()
+        return self.tracked_repos
+
     def get_repo_activities(self, repo_full_name: str, days: int = 7) -> Dict[str, Any]:
         """获取仓库的最新活动"""
         try:
@@ -144,12 +244,23 @@ class RepoActivityTracker:
             # 确保目录存在
             self.data_dir.mkdir(parents=True, exist_ok=True)
             
+            # 写入前与上一次的数据比较，得到新增事件
+            delta = self._compute_delta(activities) if self.listeners else None
+            
             # 使用仓库名和时间戳创建文件名
             repo_name = activities['repository'].replace('/', '_')
             filename = self.data_dir / f"{repo_name}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
             
             with open(filename, 'w', encoding='utf-8') as f:
                 json.dump(activities, f, ensure_ascii=False, indent=2)
+            self._prune_activity_files(activities['repository'])
+                
+            if delta:
+                for listener in self.listeners:
+                    try:
+                        listener(delta)
+                    except Exception as e:
+                        print(f"通知新动态监听器时出错: {str(e)}")
                 
             return filename
         except Exception as e:
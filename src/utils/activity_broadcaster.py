@@ -0,0 +1,135 @@
+import json
+import time
+import asyncio
+import logging
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+
+class ActivityBroadcaster:
+    """仓库动态推送器
+
+    将活动写入方（定时刷新、手动刷新等）产生的增量消息分发给所有 WebSocket 订阅者。
+    写入方可能运行在调度器线程中，因此 publish 是线程安全的。
+    指定 db_path 时消息先写入 SQLite，每个工作进程轮询新消息后分发给本进程的订阅者，
+    因此只在调度主进程中写入的活动也能推送到连接在其他工作进程上的客户端。
+    """
+
+    def __init__(self, queue_size: int = 100, db_path: Optional[Path] = None,
+                 poll_interval: float = 1.0, retention: float = 3600.0):
+        """
+        初始化推送器
+
+        Args:
+            queue_size: 每个订阅者最多缓存的消息数，超出时丢弃最旧的消息
+            db_path: 跨进程共享消息的数据库文件路径，为 None 时只推送给当前进程的订阅者
+            poll_interval: 轮询新消息的间隔（秒）
+            retention: 消息在数据库中保留的时间（秒）
+        """
+        self.queue_size = queue_size
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.logger = logging.getLogger(__name__)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._tail: Optional[asyncio.Task] = None
+        self._last_id = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+        if db_path is not None:
+            db_path.parent.mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS activity_events (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    payload TEXT NOT NULL,
+                    created_at REAL NOT NULL
+                )
+                """
+            )
+            self._conn.commit()
+
+    def attach_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        """绑定应用的事件循环（在事件循环中调用），共享模式下开始轮询新消息"""
+        self._loop = loop
+        if self._conn is not None and self._tail is None:
+            with self._lock:
+                # 只推送启动之后产生的消息
+                self._last_id = self._conn.execute("SELECT COALESCE(MAX(id), 0) FROM activity_events").fetchone()[0]
+            self._tail = loop.create_task(self._tail_events())
+
+    async def close(self) -> None:
+        """停止轮询新消息"""
+        if self._tail is not None:
+            self._tail.cancel()
+            try:
+                await self._tail
+            except asyncio.CancelledError:
+                pass
+            self._tail = None
+
+    def subscribe(self) -> asyncio.Queue:
+        """新增一个订阅者，返回其消息队列"""
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        """移除订阅者"""
+        self._subscribers.discard(queue)
+
+    def publish(self, delta: Dict[str, Any]) -> None:
+        """
+        发布一条增量消息，可在任意线程中调用
+
+        Args:
+            delta: 增量消息
+        """
+        if self._conn is not None:
+            # 所有工作进程（包括当前进程）都通过轮询取得消息
+            now = time.time()
+            with self._lock:
+                self._conn.execute(
+                    "INSERT INTO activity_events (payload, created_at) VALUES (?, ?)",
+                    (json.dumps(delta, ensure_ascii=False), now)
+                )
+                self._conn.execute("DELETE FROM activity_events WHERE created_at < ?", (now - self.retention,))
+                self._conn.commit()
+            return
+        if self._loop is None or self._loop.is_closed():
+            return
+        self._loop.call_soon_threadsafe(self._dispatch, delta)
+
+    def _read_new(self) -> List[Tuple[int, str]]:
+        """读取上次之后写入的消息"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT id, payload FROM activity_events WHERE id > ? ORDER BY id", (self._last_id,)
+            ).fetchall()
+
+    async def _tail_events(self) -> None:
+        """定期读取数据库中的新消息并分发给本进程的订阅者"""
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                rows = await asyncio.to_thread(self._read_new)
+            except sqlite3.Error as e:
+                self.logger.error(f"读取仓库新动态消息时出错: {str(e)}")
+                continue
+            for event_id, payload in rows:
+                self._last_id = event_id
+                self._dispatch(json.loads(payload))
+
+    def _dispatch(self, delta: Dict[str, Any]) -> None:
+        """在事件循环中将消息放入每个订阅者的队列"""
+        for queue in list(self._subscribers):
+            if queue.full():
+                # 客户端消费过慢时丢弃最旧的消息，避免占用内存
+                queue.get_nowait()
+            queue.put_nowait(delta)
+        self.logger.info(f"已推送 {delta.get('repo')} 的 {delta.get('new_events')} 条新动态给 {len(self._subscribers)} 个客户端")
@@ -0,0 +1,28 @@
+import threading
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+import yaml
+
+_cache: Dict[Tuple[str, float], Dict[str, Any]] = {}
+_lock = threading.Lock()
+
+def load_yaml_config(config_path: Path) -> Dict[str, Any]:
+    """
+    加载 YAML 配置文件，同一文件未修改时只解析一次
+    
+    Args:
+        config_path: 配置文件路径
+        
+    Returns:
+        Dict[str, Any]: 配置信息
+    """
+    path = Path(config_path).resolve()
+    key = (str(path), path.stat().st_mtime)
+    with _lock:
+        config = _cache.get(key)
+        if config is None:
+            with open(path, 'r', encoding='utf-8') as f:
+                config = yaml.safe_load(f) or {}
+            _cache[key] = config
+        return config
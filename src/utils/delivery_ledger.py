@@ -0,0 +1,147 @@
+import math
+import time
+import sqlite3
+import hashlib
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class BloomFilter:
+    """固定大小的布隆过滤器，用于记录已发送的事件ID"""
+
+    def __init__(self, capacity: int, error_rate: float, bits: Optional[bytes] = None, count: int = 0):
+        """
+        初始化布隆过滤器
+
+        Args:
+            capacity: 预计容纳的事件数
+            error_rate: 目标误判率
+            bits: 已保存的位数组
+            count: 已加入的事件数
+        """
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(bits) if bits is not None else bytearray((self.size + 7) // 8)
+        self.count = count
+
+    def _positions(self, item: str) -> Iterable[int]:
+        # 双重哈希：由一次 blake2b 摘要派生出 k 个位置
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(item))
+
+    def add(self, item: str) -> None:
+        for pos in self._positions(item):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+
+class DeliveryLedger:
+    """订阅任务的已发送事件记录
+
+    每个任务保存两代布隆过滤器，当前一代达到容量后轮换，旧事件随之淘汰，
+    因此误判率保持在配置范围内，而占用空间固定。
+    容量应大于一个活动窗口内的事件数，保证窗口内的事件不会因轮换被重复发送。
+    """
+
+    def __init__(self, db_path: Path, capacity: int = 5000, error_rate: float = 0.001):
+        """
+        初始化发送记录
+
+        Args:
+            db_path: 数据库文件路径
+            capacity: 每代布隆过滤器容纳的事件数
+            error_rate: 布隆过滤器的误判率（误判的新事件会被漏发）
+        """
+        self.db_path = db_path
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS ledger (
+                task_id TEXT PRIMARY KEY,
+                current BLOB NOT NULL,
+                current_count INTEGER NOT NULL,
+                previous BLOB,
+                previous_count INTEGER NOT NULL DEFAULT 0,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.commit()
+
+    def _load(self, task_id: str) -> Tuple[BloomFilter, Optional[BloomFilter]]:
+        row = self._conn.execute(
+            "SELECT current, current_count, previous, previous_count FROM ledger WHERE task_id = ?", (task_id,)
+        ).fetchone()
+        if row is None:
+            return BloomFilter(self.capacity, self.error_rate), None
+        current = BloomFilter(self.capacity, self.error_rate, row[0], row[1])
+        previous = BloomFilter(self.capacity, self.error_rate, row[2], row[3]) if row[2] is not None else None
+        if len(current.bits) != (current.size + 7) // 8:
+            # 容量或误判率配置变化，旧过滤器不可用
+            return BloomFilter(self.capacity, self.error_rate), None
+        return current, previous
+
+    def unseen(self, task_id: str, event_ids: Iterable[str]) -> List[str]:
+        """
+        筛选出尚未发送给该任务的事件
+
+        Args:
+            task_id: 任务ID
+            event_ids: 事件ID列表
+
+        Returns:
+            List[str]: 未发送过的事件ID
+        """
+        with self._lock:
+            current, previous = self._load(task_id)
+        return [event_id for event_id in event_ids
+                if event_id not in current and (previous is None or event_id not in previous)]
+
+    def mark_sent(self, task_id: str, event_ids: Iterable[str]) -> None:
+        """
+        记录已发送给该任务的事件
+
+        Args:
+            task_id: 任务ID
+            event_ids: 事件ID列表
+        """
+        with self._lock:
+            current, previous = self._load(task_id)
+            for event_id in event_ids:
+                if current.count >= self.capacity:
+                    current, previous = BloomFilter(self.capacity, self.error_rate), current
+                current.add(event_id)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO ledger (task_id, current, current_count, previous, previous_count, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (task_id, bytes(current.bits), current.count,
+                 bytes(previous.bits) if previous is not None else None,
+                 previous.count if previous is not None else 0, time.time())
+            )
+            self._conn.commit()
+
+    def forget(self, task_id: str) -> None:
+        """删除任务的发送记录（任务被删除时）"""
+        with self._lock:
+            self._conn.execute("DELETE FROM ledger WHERE task_id = ?", (task_id,))
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """记录的任务数和事件数"""
+        with self._lock:
+            tasks, events = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(current_count + previous_count), 0) FROM ledger"
+            ).fetchone()
+        return {"tasks": tasks, "events": events}
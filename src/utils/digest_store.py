@@ -0,0 +1,127 @@
+import json
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+
+class DigestStore:
+    """摘要模式下等待合并投递的任务和每日总结
+
+    同一收件人在一个摘要窗口内登记的条目共用该窗口的投递时间。条目保存在 SQLite 中，
+    进程重启或调度主进程切换后由新的主进程按原投递时间继续投递，不会丢失。
+    投递时先认领条目，邮件进入发件队列后再删除；投递中途退出时认领在下次启动时撤销。
+    """
+
+    def __init__(self, db_path: Path):
+        """
+        初始化摘要条目存储
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS digest_items (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                email TEXT NOT NULL,
+                kind TEXT NOT NULL,
+                payload TEXT NOT NULL,
+                due_at REAL NOT NULL,
+                claimed INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_digest_items_email ON digest_items(email, claimed)")
+        self._conn.commit()
+
+    def add(self, email: str, kind: str, payload: Any, window: float) -> Tuple[float, bool]:
+        """
+        登记一个条目，收件人没有未投递的条目时开始新的摘要窗口
+
+        Args:
+            email: 收件人邮箱
+            kind: 条目类型，task 或 summary
+            payload: 任务配置或总结内容
+            window: 摘要窗口（秒）
+
+        Returns:
+            Tuple[float, bool]: 该条目的投递时间（时间戳），以及是否开始了新的窗口
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                due_at = self._conn.execute(
+                    "SELECT MIN(due_at) FROM digest_items WHERE email = ? AND claimed = 0", (email,)
+                ).fetchone()[0]
+                is_new = due_at is None
+                if is_new:
+                    due_at = time.time() + window
+                self._conn.execute(
+                    "INSERT INTO digest_items (email, kind, payload, due_at) VALUES (?, ?, ?, ?)",
+                    (email, kind, json.dumps(payload, ensure_ascii=False), due_at)
+                )
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return due_at, is_new
+
+    def claim(self, email: str, due_at: float) -> List[Tuple[int, str, Any]]:
+        """
+        认领收件人在该投递时间及之前的条目
+
+        Args:
+            email: 收件人邮箱
+            due_at: 投递时间（时间戳）
+
+        Returns:
+            List[Tuple[int, str, Any]]: (条目ID, 条目类型, 内容)，按登记顺序排列
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT id, kind, payload FROM digest_items WHERE email = ? AND claimed = 0 AND due_at <= ? ORDER BY id",
+                    (email, due_at)
+                ).fetchall()
+                self._conn.executemany("UPDATE digest_items SET claimed = 1 WHERE id = ?", [(row[0],) for row in rows])
+                self._conn.commit()
+            except Exception:
+                self._conn.rollback()
+                raise
+        return [(item_id, kind, json.loads(payload)) for item_id, kind, payload in rows]
+
+    def release(self, item_ids: List[int], due_at: float) -> None:
+        """投递失败时撤销认领，并推迟到新的投递时间"""
+        with self._lock:
+            self._conn.executemany(
+                "UPDATE digest_items SET claimed = 0, due_at = ? WHERE id = ?", [(due_at, item_id) for item_id in item_ids]
+            )
+            self._conn.commit()
+
+    def delete(self, item_ids: List[int]) -> None:
+        """删除已投递的条目"""
+        with self._lock:
+            self._conn.executemany("DELETE FROM digest_items WHERE id = ?", [(item_id,) for item_id in item_ids])
+            self._conn.commit()
+
+    def pending(self) -> Dict[str, float]:
+        """
+        撤销上次运行中未完成的认领，返回每个收件人最早的投递时间（启动调度时调用）
+
+        Returns:
+            Dict[str, float]: 收件人邮箱到投递时间（时间戳）
+        """
+        with self._lock:
+            self._conn.execute("UPDATE digest_items SET claimed = 0 WHERE claimed = 1")
+            self._conn.commit()
+            rows = self._conn.execute("SELECT email, MIN(due_at) FROM digest_items GROUP BY email").fetchall()
+        return dict(rows)
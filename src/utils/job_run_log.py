@@ -0,0 +1,93 @@
+import time
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from apscheduler.events import (
+    EVENT_JOB_ERROR, EVENT_JOB_EXECUTED, EVENT_JOB_MISSED, EVENT_JOB_SUBMITTED, JobEvent
+)
+
+# 需要监听的调度器事件
+JOB_EVENTS = EVENT_JOB_SUBMITTED | EVENT_JOB_EXECUTED | EVENT_JOB_ERROR | EVENT_JOB_MISSED
+
+
+class JobRunLog:
+    """定时任务的最近一次运行记录
+
+    监听调度器事件，记录每个任务最近一次的开始时间、耗时、结果和错过的次数。
+    记录保存在 SQLite 中，非调度主进程的接口也能读取。
+    """
+
+    def __init__(self, db_path: Path):
+        """
+        初始化运行记录
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = db_path
+        self._started: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS job_runs (
+                job_id TEXT PRIMARY KEY,
+                started_at REAL,
+                finished_at REAL,
+                duration REAL,
+                status TEXT,
+                error TEXT,
+                missed INTEGER NOT NULL DEFAULT 0
+            )
+            """
+        )
+        self._conn.commit()
+
+    def listener(self, event: JobEvent) -> None:
+        """调度器事件监听器，通过 scheduler.add_listener(log.listener, JOB_EVENTS) 注册"""
+        now = time.time()
+        with self._lock:
+            if event.code == EVENT_JOB_SUBMITTED:
+                self._started[event.job_id] = now
+                self._conn.execute(
+                    "INSERT INTO job_runs (job_id, started_at, status) VALUES (?, ?, 'running') "
+                    "ON CONFLICT(job_id) DO UPDATE SET started_at = excluded.started_at, status = 'running'",
+                    (event.job_id, now)
+                )
+            elif event.code == EVENT_JOB_MISSED:
+                self._conn.execute(
+                    "INSERT INTO job_runs (job_id, missed) VALUES (?, 1) "
+                    "ON CONFLICT(job_id) DO UPDATE SET missed = missed + 1",
+                    (event.job_id,)
+                )
+            else:
+                started = self._started.pop(event.job_id, None)
+                self._conn.execute(
+                    "UPDATE job_runs SET finished_at = ?, duration = ?, status = ?, error = ? WHERE job_id = ?",
+                    (now, round(now - started, 3) if started is not None else None,
+                     "error" if event.code == EVENT_JOB_ERROR else "ok",
+                     repr(event.exception) if event.exception is not None else None, event.job_id)
+                )
+            self._conn.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """任务最近一次的运行记录，从未运行时返回 None"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT started_at, finished_at, duration, status, error, missed FROM job_runs WHERE job_id = ?",
+                (job_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("started_at", "finished_at", "duration", "status", "error", "missed"), row))
+
+    def forget(self, job_id: str) -> None:
+        """删除任务的运行记录"""
+        with self._lock:
+            self._conn.execute("DELETE FROM job_runs WHERE job_id = ?", (job_id,))
+            self._conn.commit()
@@ -0,0 +1,103 @@
+import os
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只支持单进程运行
+    fcntl = None
+
+
+class LeaderElector:
+    """基于文件锁的主进程选举
+
+    多个 API 工作进程竞争同一个锁文件，持有锁的进程成为调度主进程。
+    主进程退出后操作系统会释放锁，其余进程在下一次轮询时接管。
+    """
+
+    def __init__(self, lock_path: Path, on_elected: Callable[[], None], poll_interval: float = 5.0):
+        """
+        初始化主进程选举器
+
+        Args:
+            lock_path: 锁文件路径
+            on_elected: 当选为主进程时的回调
+            poll_interval: 未当选时重新尝试加锁的间隔（秒）
+        """
+        self.lock_path = lock_path
+        self.on_elected = on_elected
+        self.poll_interval = poll_interval
+        self.is_leader = False
+        self.logger = logging.getLogger(__name__)
+        self._fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _try_acquire(self) -> bool:
+        """尝试以非阻塞方式获取锁"""
+        if fcntl is None:
+            return True
+
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+
+        # 记录当前主进程的 PID，便于排查
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def _run(self, delay: float = 0.0) -> None:
+        """轮询加锁，直到当选或被停止"""
+        if delay:
+            self._stop.wait(delay)
+        while not self._stop.is_set():
+            try:
+                if self._try_acquire():
+                    self.is_leader = True
+                    self.logger.info(f"进程 {os.getpid()} 当选为调度主进程")
+                    self.on_elected()
+                    return
+            except Exception as e:
+                self.logger.error(f"主进程选举时出错: {str(e)}")
+            self._stop.wait(self.poll_interval)
+
+    def start(self, delay: float = 0.0) -> None:
+        """
+        在后台线程中开始选举
+
+        Args:
+            delay: 首次尝试加锁前的等待时间（秒）
+        """
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        self._thread = threading.Thread(target=self._run, args=(delay,), name="leader-election", daemon=True)
+        self._thread.start()
+
+    def resign(self) -> None:
+        """放弃主进程身份并释放锁，等待一个轮询间隔后重新参与选举，让其他进程有机会接管"""
+        self._unlock()
+        self.is_leader = False
+        if not self._stop.is_set():
+            self.logger.warning(f"进程 {os.getpid()} 放弃调度主进程身份")
+            self.start(delay=self.poll_interval)
+
+    def release(self) -> None:
+        """停止选举并释放锁"""
+        self._stop.set()
+        self._unlock()
+        self.is_leader = False
+
+    def _unlock(self) -> None:
+        if self._fd is not None:
+            try:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+                os.close(self._fd)
+            except OSError:
+                pass
+            self._fd = None
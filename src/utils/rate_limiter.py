@@ -1,5 +1,5 @@
 import time
-from typing import Optional, Dict
+from typing import Any, Optional, Dict, Tuple
 from datetime import datetime, timedelta
 
 class RateLimiter:
@@ -34,4 +34,19 @@ class RateLimiter:
             # 移除最早的时间戳
             self.timestamps.pop(0)
             
-        self.timestamps.append(now) 
\ No newline at end of file
+        self.timestamps.append(now) 
+
+def github_quota(github: Any) -> Tuple[int, float]:
+    """
+    GitHub API 剩余调用次数和配额重置时间（时间戳）
+    
+    优先使用最近一次响应头中的数据，尚未发出请求时查询 /rate_limit（不消耗配额）。
+    
+    Args:
+        github: PyGithub 的 Github 实例
+    """
+    remaining, _ = github.rate_limiting
+    if remaining < 0:
+        core = github.get_rate_limit().core
+        return core.remaining, core.reset.timestamp()
+    return remaining, float(github.rate_limiting_resettime)
@@ -0,0 +1,292 @@
+import gzip
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import asyncio
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional, Union
+
+from fastapi import Request, Response
+
+try:
+    import orjson
+except ImportError:  # orjson 为可选依赖，缺失时退回标准库
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # brotli 为可选依赖，缺失时只提供 gzip
+    brotli = None
+
+
+class CachedResponse:
+    """已序列化的响应体及其压缩版本"""
+
+    def __init__(self, body: bytes, ttl: Optional[float] = None, min_compress_size: int = 1024):
+        """
+        初始化缓存条目
+
+        Args:
+            body: JSON 编码后的响应体
+            ttl: 有效期（秒），为 None 时只依赖写操作失效
+            min_compress_size: 小于该字节数的响应不压缩
+        """
+        self.body = body
+        self.etag = f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+        self.created_at = time.monotonic()
+        self.ttl = ttl
+        self.variants: Dict[str, bytes] = {}
+
+        # 压缩只做一次，之后的轮询直接复用
+        if len(body) >= min_compress_size:
+            self.variants['gzip'] = gzip.compress(body, compresslevel=6)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body, quality=5)
+
+    def is_expired(self) -> bool:
+        """判断条目是否已过期"""
+        return self.ttl is not None and time.monotonic() - self.created_at > self.ttl
+
+    def etag_for(self, encoding: Optional[str]) -> str:
+        """不同编码的表示使用不同的强 ETag"""
+        if not encoding:
+            return self.etag
+        return f'{self.etag[:-1]}-{encoding}"'
+
+    def matches(self, if_none_match: Optional[str]) -> bool:
+        """判断 If-None-Match 是否命中当前内容的任一表示"""
+        if not if_none_match:
+            return False
+        if if_none_match.strip() == '*':
+            return True
+        candidates = {self.etag_for(None)} | {self.etag_for(enc) for enc in self.variants}
+        for tag in if_none_match.split(','):
+            tag = tag.strip()
+            if tag.startswith('W/'):
+                tag = tag[2:]
+            if tag in candidates:
+                return True
+        return False
+
+
+class SharedGenerations:
+    """保存在 SQLite 中的命名空间版本号，供多个工作进程共享缓存失效"""
+
+    def __init__(self, db_path: Path):
+        """
+        初始化版本号存储
+
+        Args:
+            db_path: 数据库文件路径
+        """
+        self.db_path = db_path
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations (namespace TEXT PRIMARY KEY, generation INTEGER NOT NULL)"
+        )
+        self._conn.commit()
+
+    def get(self, namespace: str) -> int:
+        """命名空间当前的版本号"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT generation FROM generations WHERE namespace = ?", (namespace,)
+            ).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, namespace: str) -> int:
+        """将命名空间的版本号加一，返回新版本号"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO generations (namespace, generation) VALUES (?, 1) "
+                "ON CONFLICT(namespace) DO UPDATE SET generation = generation + 1",
+                (namespace,)
+            )
+            self._conn.commit()
+            return self._conn.execute(
+                "SELECT generation FROM generations WHERE namespace = ?", (namespace,)
+            ).fetchone()[0]
+
+
+class ResponseCache:
+    """HTTP 响应缓存，保存编码后的字节并支持 ETag/304 与压缩
+
+    指定 generations_path 时，失效通过 SQLite 中的版本号在所有工作进程间生效：
+    每次读取缓存前比较本进程与共享的版本号，不一致时丢弃该命名空间的本地条目。
+    """
+
+    def __init__(self, min_compress_size: int = 1024, generations_path: Optional[Path] = None):
+        """
+        初始化响应缓存
+
+        Args:
+            min_compress_size: 小于该字节数的响应不压缩
+            generations_path: 共享版本号的数据库文件路径，为 None 时失效只作用于当前进程
+        """
+        self.min_compress_size = min_compress_size
+        self._entries: Dict[str, CachedResponse] = {}
+        self._generations: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._mutex = threading.Lock()
+        self._shared = SharedGenerations(generations_path) if generations_path is not None else None
+
+    @staticmethod
+    def encode(payload: Any) -> bytes:
+        """将数据编码为 JSON 字节"""
+        if orjson is not None:
+            return orjson.dumps(payload, default=str)
+        return json.dumps(payload, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+    @staticmethod
+    def _namespace(key: str) -> str:
+        """缓存键的命名空间，例如 tracked-repos:days=1 -> tracked-repos"""
+        return key.split(':', 1)[0]
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        获取缓存条目
+
+        Args:
+            key: 缓存键名
+
+        Returns:
+            未过期的缓存条目，不存在则返回 None
+        """
+        self._sync(self._namespace(key))
+        with self._mutex:
+            entry = self._entries.get(key)
+            if entry is not None and entry.is_expired():
+                del self._entries[key]
+                return None
+            return entry
+
+    def put(self, key: str, payload: Any, ttl: Optional[float] = None,
+            generation: Optional[int] = None) -> CachedResponse:
+        """
+        编码并缓存数据
+
+        Args:
+            key: 缓存键名
+            payload: 要缓存的数据
+            ttl: 有效期（秒）
+            generation: 开始生成数据时的命名空间版本，若期间发生失效则不写入缓存
+
+        Returns:
+            CachedResponse: 缓存条目
+        """
+        entry = CachedResponse(self.encode(payload), ttl, self.min_compress_size)
+        namespace = self._namespace(key)
+        # 生成数据期间其他进程可能已使缓存失效
+        self._sync(namespace)
+        with self._mutex:
+            if generation is None or generation == self._generations.get(namespace, 0):
+                self._entries[key] = entry
+        return entry
+
+    def invalidate(self, *namespaces: str) -> None:
+        """
+        使指定命名空间下的所有缓存失效，可在任意线程中调用
+
+        Args:
+            namespaces: 命名空间，例如 "tracked-repos"
+        """
+        for namespace in namespaces:
+            self._drop(namespace, self._shared.bump(namespace) if self._shared is not None else None)
+
+    def _drop(self, namespace: str, generation: Optional[int] = None) -> None:
+        """记录命名空间的新版本号（为 None 时在本进程内加一）并删除其本地条目"""
+        with self._mutex:
+            current = self._generations.get(namespace, 0)
+            if generation is None:
+                generation = current + 1
+            elif generation <= current:
+                # 共享版本号只增不减，不大于本地版本号说明条目已经是最新的
+                return
+            self._generations[namespace] = generation
+            for key in [k for k in self._entries if self._namespace(k) == namespace]:
+                del self._entries[key]
+
+    def _sync(self, namespace: str) -> None:
+        """其他进程使命名空间失效后，丢弃本进程中该命名空间的条目"""
+        if self._shared is not None:
+            self._drop(namespace, self._shared.get(namespace))
+
+    def _generation(self, key: str) -> int:
+        namespace = self._namespace(key)
+        self._sync(namespace)
+        with self._mutex:
+            return self._generations.get(namespace, 0)
+
+    def _lock_for(self, key: str) -> asyncio.Lock:
+        with self._mutex:
+            lock = self._locks.get(key)
+            if lock is None:
+                lock = self._locks[key] = asyncio.Lock()
+            return lock
+
+    async def respond(self, request: Request, key: str, producer: Callable[[], Awaitable[Any]],
+                      ttl: Union[float, None, Callable[[Any], Optional[float]]] = None) -> Response:
+        """
+        返回缓存的响应，未命中时调用 producer 生成数据
+
+        并发的未命中请求只会触发一次 producer 调用。
+
+        Args:
+            request: 当前请求
+            key: 缓存键名
+            producer: 生成响应数据的协程函数
+            ttl: 有效期（秒），也可以是根据生成的数据返回有效期的函数（例如失败结果只缓存很短时间）
+
+        Returns:
+            Response: 200 或 304 响应
+        """
+        entry = self.get(key)
+        if entry is None:
+            async with self._lock_for(key):
+                entry = self.get(key)
+                if entry is None:
+                    generation = self._generation(key)
+                    payload = await producer()
+                    entry = self.put(key, payload, ttl(payload) if callable(ttl) else ttl, generation)
+        return self.build_response(request, entry)
+
+    @staticmethod
+    def _choose_encoding(request: Request, entry: CachedResponse) -> Optional[str]:
+        """根据 Accept-Encoding 选择压缩方式"""
+        accept = request.headers.get('accept-encoding', '')
+        accepted = {part.split(';', 1)[0].strip().lower() for part in accept.split(',')}
+        for encoding in ('br', 'gzip'):
+            if encoding in entry.variants and encoding in accepted:
+                return encoding
+        return None
+
+    def build_response(self, request: Request, entry: CachedResponse) -> Response:
+        """
+        根据缓存条目构建响应
+
+        Args:
+            request: 当前请求
+            entry: 缓存条目
+
+        Returns:
+            Response: 200 或 304 响应
+        """
+        encoding = self._choose_encoding(request, entry)
+        headers = {
+            'ETag': entry.etag_for(encoding),
+            'Cache-Control': 'no-cache',
+            'Vary': 'Accept-Encoding',
+        }
+
+        if entry.matches(request.headers.get('if-none-match')):
+            return Response(status_code=304, headers=headers)
+
+        if encoding:
+            headers['Content-Encoding'] = encoding
+            return Response(content=entry.variants[encoding], media_type='application/json', headers=headers)
+        return Response(content=entry.body, media_type='application/json', headers=headers)
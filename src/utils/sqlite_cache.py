@@ -0,0 +1,171 @@
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class SQLiteCache:
+    """基于 SQLite 的持久化键值缓存
+
+    支持按条数上限的 LRU 淘汰和可选的过期时间，并统计命中率。
+    """
+
+    def __init__(self, db_path: Path, max_entries: int = 10000, ttl: Optional[int] = None):
+        """
+        初始化缓存
+
+        Args:
+            db_path: 数据库文件路径
+            max_entries: 最多保存的条目数，超出时淘汰最久未使用的条目
+            ttl: 缓存有效期（秒），为 None 时永不过期
+        """
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(db_path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_used REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_last_used ON cache(last_used)")
+        self._conn.commit()
+
+    def _is_expired(self, created_at: float, now: float) -> bool:
+        return self.ttl is not None and now - created_at > self.ttl
+
+    def get(self, key: str) -> Optional[Any]:
+        """
+        获取缓存数据
+
+        Args:
+            key: 缓存键名
+
+        Returns:
+            缓存的数据，如果不存在或已过期则返回None
+        """
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        """
+        批量获取缓存数据
+
+        Args:
+            keys: 缓存键名列表
+
+        Returns:
+            Dict[str, Any]: 命中的键及其数据
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        now = time.time()
+        found: Dict[str, Any] = {}
+        expired: List[str] = []
+        with self._lock:
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, value, created_at FROM cache WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, value, created_at in rows:
+                    if self._is_expired(created_at, now):
+                        expired.append(key)
+                    else:
+                        found[key] = json.loads(value)
+
+            if found:
+                self._conn.executemany(
+                    "UPDATE cache SET last_used = ? WHERE key = ?", [(now, key) for key in found]
+                )
+            if expired:
+                self._conn.executemany("DELETE FROM cache WHERE key = ?", [(key,) for key in expired])
+            self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        设置缓存数据
+
+        Args:
+            key: 缓存键名
+            value: 要缓存的数据（需可 JSON 序列化）
+        """
+        self.set_many({key: value})
+
+    def set_many(self, items: Dict[str, Any]) -> None:
+        """
+        批量设置缓存数据，写入后按条数上限淘汰
+
+        Args:
+            items: 键名到数据的映射
+        """
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO cache (key, value, created_at, last_used) VALUES (?, ?, ?, ?)",
+                [(key, json.dumps(value, ensure_ascii=False), now, now) for key, value in items.items()]
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """淘汰最久未使用的条目，调用方需持有锁"""
+        count = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        overflow = count - self.max_entries
+        if overflow > 0:
+            self._conn.execute(
+                "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY last_used LIMIT ?)",
+                (overflow,)
+            )
+
+    def delete(self, key: str) -> None:
+        """
+        删除缓存数据
+
+        Args:
+            key: 缓存键名
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """清除所有缓存"""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """返回缓存条目数和命中率统计"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
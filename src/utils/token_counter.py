@@ -0,0 +1,20 @@
+import re
+
+# 中日韩字符大约各占一个 token，其余文本按约 4 个字符一个 token 估算
+_CJK_PATTERN = re.compile(r'[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uac00-\ud7af\uff00-\uffef]')
+
+def estimate_tokens(text: str) -> int:
+    """
+    粗略估算文本的 token 数，用于控制提示词大小
+    
+    Args:
+        text: 文本
+        
+    Returns:
+        int: 估算的 token 数
+    """
+    if not text:
+        return 0
+    cjk_count = len(_CJK_PATTERN.findall(text))
+    other_count = len(text) - cjk_count
+    return cjk_count + (other_count + 3) // 4
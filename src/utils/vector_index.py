@@ -0,0 +1,331 @@
+import os
+import re
+import json
+import zlib
+import logging
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows 下没有 fcntl，只支持单进程写入
+    fcntl = None
+
+_WORD_PATTERN = re.compile(r'[a-z0-9]+|[\u3400-\u4dbf\u4e00-\u9fff]')
+_CAMEL_PATTERN = re.compile(r'(?<=[a-z0-9])(?=[A-Z])|(?<=[A-Z])(?=[A-Z][a-z])')
+
+
+class HashingEmbedder:
+    """离线的哈希特征向量
+
+    将仓库名和描述切分为单词（驼峰、下划线、连字符都会拆开）、相邻词对和汉字，
+    用稳定哈希映射到固定维度并做 L2 归一化，不需要下载任何模型。
+    """
+
+    def __init__(self, dim: int = 512):
+        """
+        初始化哈希向量
+
+        Args:
+            dim: 向量维度
+        """
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    @staticmethod
+    def tokenize(text: str) -> List[str]:
+        """切分文本并生成单词和相邻词对特征"""
+        words = _WORD_PATTERN.findall(_CAMEL_PATTERN.sub(' ', text or '').lower())
+        return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        计算文本向量
+
+        Args:
+            texts: 文本列表
+
+        Returns:
+            np.ndarray: 形状为 (len(texts), dim) 的归一化向量
+        """
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for token in self.tokenize(text):
+                # crc32 在各进程间稳定，最高位决定符号以减小哈希冲突的影响
+                digest = zlib.crc32(token.encode('utf-8'))
+                sign = 1.0 if digest & 0x80000000 else -1.0
+                vectors[row, digest % self.dim] += sign
+        # 对词频取对数，避免重复出现的词主导相似度
+        vectors = np.sign(vectors) * np.log1p(np.abs(vectors))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+
+class ModelEmbedder:
+    """基于 sentence-transformers 模型的向量（可选依赖）"""
+
+    def __init__(self, model_name: str):
+        """
+        初始化模型向量
+
+        Args:
+            model_name: sentence-transformers 模型名称或本地路径
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError("使用模型向量需要安装 sentence-transformers") from e
+        self.model = SentenceTransformer(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"model-{model_name}"
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(texts, normalize_embeddings=True)
+        return np.asarray(vectors, dtype=np.float32)
+
+
+def create_embedder(config: Dict[str, Any]):
+    """
+    按 embeddings 配置创建向量化器，模型不可用时退回到哈希向量
+
+    Args:
+        config: embeddings 配置
+    """
+    if config.get('embedder', 'hashing') == 'model' and config.get('model'):
+        try:
+            return ModelEmbedder(config['model'])
+        except Exception as e:
+            logging.getLogger(__name__).warning(f"加载向量模型失败，改用哈希向量: {str(e)}")
+    return HashingEmbedder(config.get('dim', 512))
+
+
+class VectorIndex:
+    """仓库名称和描述的本地向量索引
+
+    向量保存在内存映射的 float32 矩阵文件中，元数据（仓库ID和基本信息）保存在 JSON 文件中。
+    相似度检索是一次矩阵乘法加 top-k 选择。
+    """
+
+    def __init__(self, index_dir: Path, embedder: Any, initial_capacity: int = 256):
+        """
+        初始化向量索引
+
+        Args:
+            index_dir: 索引目录
+            embedder: 向量化器，需提供 name、dim 和 embed(texts)
+            initial_capacity: 向量矩阵的初始行数
+        """
+        self.index_dir = index_dir
+        self.embedder = embedder
+        self.initial_capacity = initial_capacity
+        self.vectors_path = index_dir / "repos.f32"
+        self.meta_path = index_dir / "repos.json"
+        self.lock_path = index_dir / "repos.lock"
+        self.logger = logging.getLogger(__name__)
+        self._lock = threading.RLock()
+        self._meta_mtime: Optional[float] = None
+        self._matrix: Optional[np.memmap] = None
+        self._ids: List[str] = []
+        self._rows: Dict[str, int] = {}
+        self._items: Dict[str, Dict[str, Any]] = {}
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def repo_text(repo: Dict[str, Any]) -> str:
+        """参与向量化的文本：仓库名和描述"""
+        name = repo.get('full_name') or repo.get('name') or ''
+        return f"{name.split('/')[-1]} {repo.get('description') or ''}"
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """写入索引时的跨进程文件锁"""
+        if fcntl is None:
+            yield
+            return
+        with open(self.lock_path, 'a') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+    def _refresh(self) -> None:
+        """元数据文件被其他进程更新时重新加载，调用方需持有锁"""
+        try:
+            mtime = self.meta_path.stat().st_mtime
+        except FileNotFoundError:
+            if self._matrix is None:
+                self._reset()
+            return
+        if mtime == self._meta_mtime and self._matrix is not None:
+            return
+
+        with open(self.meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('embedder') != self.embedder.name or meta.get('dim') != self.embedder.dim:
+            # 更换了向量化器，旧向量不可比较，重建索引
+            self.logger.info(f"向量化器变更为 {self.embedder.name}，重建仓库向量索引")
+            self._reset()
+            self._meta_mtime = mtime
+            return
+
+        self._ids = meta['ids']
+        self._rows = {repo_id: row for row, repo_id in enumerate(self._ids)}
+        self._items = meta['items']
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(meta['capacity'], self.embedder.dim))
+        self._meta_mtime = mtime
+
+    def _reset(self) -> None:
+        self._ids, self._rows, self._items = [], {}, {}
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='w+',
+                                 shape=(self.initial_capacity, self.embedder.dim))
+        self._meta_mtime = None
+
+    def _ensure_capacity(self, rows: int) -> None:
+        """矩阵行数不足时按倍数扩容"""
+        capacity = self._matrix.shape[0]
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        tmp_path = self.vectors_path.with_suffix('.tmp')
+        grown = np.memmap(tmp_path, dtype=np.float32, mode='w+', shape=(capacity, self.embedder.dim))
+        grown[:len(self._ids)] = self._matrix[:len(self._ids)]
+        grown.flush()
+        del grown
+        self._matrix = None
+        os.replace(tmp_path, self.vectors_path)
+        self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode='r+',
+                                 shape=(capacity, self.embedder.dim))
+
+    def _save_meta(self) -> None:
+        self._matrix.flush()
+        meta = {
+            "embedder": self.embedder.name,
+            "dim": self.embedder.dim,
+            "capacity": self._matrix.shape[0],
+            "ids": self._ids,
+            "items": self._items,
+        }
+        tmp_path = self.meta_path.with_suffix('.tmp')
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, ensure_ascii=False)
+        os.replace(tmp_path, self.meta_path)
+        self._meta_mtime = self.meta_path.stat().st_mtime
+
+    def upsert(self, repos: List[Dict[str, Any]]) -> None:
+        """
+        写入或更新仓库向量，名称和描述未变化的仓库不会重新计算
+
+        Args:
+            repos: 仓库列表，需包含 full_name（或 name 为 owner/repo）和 description
+        """
+        with self._lock, self._file_lock():
+            self._refresh()
+            changed = []
+            for repo in repos:
+                repo_id = repo.get('full_name') or repo.get('name')
+                if not repo_id:
+                    continue
+                item = {
+                    "full_name": repo_id,
+                    "description": repo.get('description') or "",
+                    "url": repo.get('url') or f"https://github.com/{repo_id}",
+                    "stars": repo.get('stars'),
+                }
+                if self._items.get(repo_id, {}).get('description') != item['description'] or repo_id not in self._rows:
+                    changed.append((repo_id, item))
+                self._items[repo_id] = item
+
+            if not changed:
+                return
+
+            vectors = self.embedder.embed([self.repo_text(item) for _, item in changed])
+            for (repo_id, _), vector in zip(changed, vectors):
+                if repo_id not in self._rows:
+                    self._ensure_capacity(len(self._ids) + 1)
+                    self._rows[repo_id] = len(self._ids)
+                    self._ids.append(repo_id)
+                self._matrix[self._rows[repo_id]] = vector
+            self._save_meta()
+
+    def _top_k(self, query: np.ndarray, k: int, exclude: Optional[str] = None) -> List[Tuple[Dict[str, Any], float]]:
+        """按余弦相似度返回前 k 个仓库，调用方需持有锁"""
+        count = len(self._ids)
+        if count == 0:
+            return []
+        scores = np.asarray(self._matrix[:count] @ query)
+        if exclude is not None and exclude in self._rows:
+            scores[self._rows[exclude]] = -np.inf
+        k = min(k, count)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        # 相似度不大于 0 的仓库没有共同特征，不返回
+        return [(self._items[self._ids[row]], float(scores[row])) for row in top if scores[row] > 0]
+
+    def search(self, text: str, k: int = 5) -> List[Tuple[Dict[str, Any], float]]:
+        """
+        按文本检索相似仓库
+
+        Args:
+            text: 查询文本
+            k: 返回数量
+
+        Returns:
+            List[Tuple[Dict[str, Any], float]]: 仓库信息和相似度，按相似度从高到低
+        """
+        query = self.embedder.embed([text])[0]
+        with self._lock:
+            self._refresh()
+            return self._top_k(query, k)
+
+    def similar_to(self, repo_id: str, k: int = 5) -> Optional[List[Tuple[Dict[str, Any], float]]]:
+        """
+        检索与已收录仓库相似的仓库
+
+        Args:
+            repo_id: 仓库全名
+            k: 返回数量
+
+        Returns:
+            相似仓库列表，仓库未收录时返回 None
+        """
+        with self._lock:
+            self._refresh()
+            row = self._rows.get(repo_id)
+            if row is None:
+                return None
+            return self._top_k(np.array(self._matrix[row]), k, exclude=repo_id)
+
+    def dedupe(self, repos: List[Dict[str, Any]], threshold: float = 0.9) -> List[Dict[str, Any]]:
+        """
+        合并相似度超过阈值的仓库，保留排在前面的一个，并在其 similar 字段中记录被合并的仓库
+
+        Args:
+            repos: 仓库列表（按优先级排序）
+            threshold: 判定为近似重复的余弦相似度
+
+        Returns:
+            List[Dict[str, Any]]: 去重后的仓库列表
+        """
+        if len(repos) < 2:
+            return repos
+        vectors = self.embedder.embed([self.repo_text(repo) for repo in repos])
+        similarity = vectors @ vectors.T
+
+        kept: List[int] = []
+        for i in range(len(repos)):
+            duplicate_of = next((j for j in kept if similarity[i, j] >= threshold), None)
+            if duplicate_of is None:
+                kept.append(i)
+            else:
+                repos[duplicate_of].setdefault('similar', []).append(repos[i].get('full_name') or repos[i].get('name'))
+        if len(kept) < len(repos):
+            self.logger.info(f"合并了 {len(repos) - len(kept)} 个近似重复的仓库")
+        return [repos[i] for i in kept]
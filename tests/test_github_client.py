@@ -0,0 +1,63 @@
+import asyncio
+
+import pytest
+
+from src.llm.github_client import GitHubClient
+
+
+class SlowTranslator:
+    """翻译一直挂起，记录被取消的次数"""
+
+    def __init__(self):
+        self.started = 0
+        self.cancelled = 0
+
+    async def batch_translate(self, items):
+        self.started += 1
+        try:
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+
+def make_client(llm) -> GitHubClient:
+    client = GitHubClient.__new__(GitHubClient)
+    client.config = {"github": {"activity_batch_size": 1}}
+    client.llm = llm
+    return client
+
+
+def test_page_error_cancels_started_translations():
+    llm = SlowTranslator()
+    client = make_client(llm)
+
+    def fetch():
+        yield {"title": "first"}
+        yield {"title": "second"}
+        raise RuntimeError("page 2 failed")
+
+    async def run():
+        with pytest.raises(RuntimeError, match="page 2 failed"):
+            await client._fetch_and_translate(
+                fetch, lambda item: {"title": item["title"], "title_zh": None}, ("title", None), ("title_zh", None)
+            )
+        # 已开始的翻译都被取消，事件循环中只剩当前任务
+        assert asyncio.all_tasks() == {asyncio.current_task()}
+
+    asyncio.run(run())
+    assert llm.started >= 1
+    assert llm.cancelled == llm.started
+
+
+def test_translations_fill_records_in_order():
+    class EchoTranslator:
+        async def batch_translate(self, items):
+            return [(f"{title}-zh", "") for title, _ in items]
+
+    client = make_client(EchoTranslator())
+    records = asyncio.run(client._fetch_and_translate(
+        lambda: iter([{"title": "a"}, {"title": "b"}, {"title": "c"}]),
+        lambda item: {"title": item["title"], "title_zh": None}, ("title", None), ("title_zh", None)
+    ))
+    assert [record["title_zh"] for record in records] == ["a-zh", "b-zh", "c-zh"]
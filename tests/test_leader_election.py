@@ -0,0 +1,27 @@
+import threading
+
+from src.utils.leader_election import LeaderElector
+
+
+def test_resign_lets_another_process_lead(tmp_path):
+    lock_path = tmp_path / "scheduler.lock"
+    first_elected, second_elected = threading.Event(), threading.Event()
+    first = LeaderElector(lock_path, on_elected=first_elected.set, poll_interval=0.5)
+    second = LeaderElector(lock_path, on_elected=second_elected.set, poll_interval=0.05)
+    try:
+        first.start()
+        assert first_elected.wait(2)
+        second.start()
+        assert not second_elected.wait(0.2)
+
+        first_elected.clear()
+        first.resign()
+        assert second_elected.wait(2)
+        assert second.is_leader and not first.is_leader
+        assert not first_elected.wait(0.2)
+
+        second.release()
+        assert first_elected.wait(2)
+    finally:
+        first.release()
+        second.release()
@@ -0,0 +1,198 @@
+"""LLMRouter 与本地模拟 Ollama 服务之间的测试
+
+每个模型服务都是一个在本机随机端口上运行的模拟 Ollama 接口，可以指定返回内容、延迟和状态码，
+不访问真实模型。
+"""
+import json
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import yaml
+from aiohttp import web
+
+from src.llm.llm_router import LLMRouter
+from src.llm.ollama_client import OllamaAI
+from src.llm.summary_service import SummaryService
+
+
+class StubOllama:
+    """模拟 Ollama 的 /api/generate 接口"""
+
+    def __init__(self, reply: str = "ok", delay: float = 0.0, status: int = 200):
+        self.reply = reply
+        self.delay = delay
+        self.status = status
+        self.calls = 0
+        self.url = ""
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _generate(self, request: web.Request) -> web.StreamResponse:
+        self.calls += 1
+        body = await request.json()
+        await asyncio.sleep(self.delay)
+        if self.status != 200:
+            return web.Response(status=self.status, text="stub failure")
+        if not body.get("stream"):
+            return web.json_response({"response": self.reply, "prompt_eval_count": 3, "eval_count": 2})
+
+        response = web.StreamResponse()
+        await response.prepare(request)
+        for chunk in (self.reply[:1], self.reply[1:]):
+            await response.write(json.dumps({"response": chunk, "done": False}).encode() + b"\n")
+        await response.write(json.dumps({"response": "", "done": True}).encode() + b"\n")
+        return response
+
+    async def start(self) -> None:
+        app = web.Application()
+        app.router.add_post("/api/generate", self._generate)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = self._runner.addresses[0][1]
+        self.url = f"http://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        await self._runner.cleanup()
+
+
+def write_config(base_dir: Path, name: str, llm: Dict[str, Any]) -> Path:
+    """在临时项目目录下写入模型配置，缓存文件保存在 base_dir/data/cache 中"""
+    config_path = base_dir / "config" / f"{name}.yaml"
+    config_path.parent.mkdir(parents=True, exist_ok=True)
+    config_path.write_text(yaml.safe_dump({"llm": llm}), encoding="utf-8")
+    return config_path
+
+
+def make_router(base_dir: Path, primary: StubOllama, local: StubOllama, hedge: bool = False) -> LLMRouter:
+    """两个服务均指向模拟服务：primary 使用 glm-4-plus 模型名，ollama 使用 qwen2:7b"""
+    router_config = {"hedge": {"enabled": hedge, "after_seconds": 0.05, "provider": "ollama"}}
+    providers = {
+        "primary": OllamaAI(write_config(base_dir, "primary", {"ollama": {"base_url": primary.url, "model": "glm-4-plus"}})),
+        "ollama": OllamaAI(write_config(base_dir, "ollama", {"ollama": {"base_url": local.url, "model": "qwen2:7b"}})),
+    }
+    return LLMRouter(write_config(base_dir, "model_config", {"router": router_config}), providers=providers)
+
+
+async def with_stubs(base_dir: Path, scenario, primary: StubOllama, local: StubOllama, hedge: bool = False):
+    await primary.start()
+    await local.start()
+    router = make_router(base_dir, primary, local, hedge=hedge)
+    try:
+        return await scenario(router)
+    finally:
+        await router.close()
+        await primary.stop()
+        await local.stop()
+
+
+def test_fails_over_to_next_provider(tmp_path):
+    primary, local = StubOllama(status=500), StubOllama(reply="来自本地模型")
+
+    async def scenario(router: LLMRouter):
+        assert await router._call_model("hello") == "来自本地模型"
+        assert primary.calls == 1
+        stats = router.provider_stats()
+        assert stats["primary"]["error_rate"] == 1.0
+        assert stats["ollama"]["p50_ms"] is not None
+        # 出错的服务排到后面，下一次直接使用本地模型
+        assert await router._call_model("again") == "来自本地模型"
+        assert primary.calls == 1
+
+    asyncio.run(with_stubs(tmp_path, scenario, primary, local))
+
+
+def test_cools_down_failing_provider(tmp_path):
+    primary, local = StubOllama(status=500), StubOllama(reply="ok")
+
+    async def scenario(router: LLMRouter):
+        router.failure_threshold = 1
+        await router._call_model("hello")
+        assert not router.provider_stats()["primary"]["available"]
+        assert router._ranked() == ["ollama"]
+
+    asyncio.run(with_stubs(tmp_path, scenario, primary, local))
+
+
+def test_hedges_slow_primary(tmp_path):
+    primary, local = StubOllama(reply="slow", delay=1.0), StubOllama(reply="fast")
+
+    async def scenario(router: LLMRouter):
+        assert await router._call_model("hedge me") == "fast"
+        assert local.calls == 1
+
+    asyncio.run(with_stubs(tmp_path, scenario, primary, local, hedge=True))
+
+
+def test_stream_fails_over(tmp_path):
+    primary, local = StubOllama(status=503), StubOllama(reply="流式结果")
+
+    async def scenario(router: LLMRouter):
+        chunks = [chunk async for chunk in router._stream_model("stream me")]
+        assert "".join(chunks) == "流式结果"
+
+    asyncio.run(with_stubs(tmp_path, scenario, primary, local))
+
+
+def test_fails_over_and_reports_answering_model(tmp_path):
+    primary, local = StubOllama(status=500), StubOllama(reply="来自本地模型")
+
+    async def scenario(router: LLMRouter):
+        result, model = await router.generate_answered("hello")
+        assert result == "来自本地模型"
+        assert model == "qwen2:7b"
+        # 同一提示词命中结果缓存时仍返回作答的模型
+        assert await router.generate_answered("hello") == ("来自本地模型", "qwen2:7b")
+        assert local.calls == 1
+        stats = router.provider_stats()
+        assert stats["primary"]["error_rate"] == 1.0
+        assert stats["ollama"]["p50_ms"] is not None
+
+    asyncio.run(with_stubs(tmp_path, scenario, primary, local))
+
+
+def test_hedged_request_is_attributed_to_hedge_provider(tmp_path):
+    primary, local = StubOllama(reply="slow", delay=1.0), StubOllama(reply="fast")
+
+    async def scenario(router: LLMRouter):
+        result = await router._invoke("hedge me")
+        assert result == "fast"
+        assert router.answered_model() == "qwen2:7b"
+
+    asyncio.run(with_stubs(tmp_path, scenario, primary, local, hedge=True))
+
+
+def test_translation_cache_keyed_by_answering_model(tmp_path):
+    reply = json.dumps({"1": {"name": "名称", "description": "描述"}}, ensure_ascii=False)
+    primary, local = StubOllama(status=500), StubOllama(reply=reply)
+
+    async def scenario(router: LLMRouter):
+        assert await router.batch_translate([("name", "description")]) == [("名称", "描述")]
+        cache = router.translation_cache
+        assert cache.lookup(["name", "description"], "en", "zh", "glm-4-plus") == {}
+        assert cache.lookup(["name", "description"], "en", "zh", "qwen2:7b") == {"name": "名称", "description": "描述"}
+        # 再次翻译直接命中本地模型的缓存
+        assert await router.batch_translate([("name", "description")]) == [("名称", "描述")]
+        assert local.calls == 1
+
+    asyncio.run(with_stubs(tmp_path, scenario, primary, local))
+
+
+def test_repo_summary_cache_keyed_by_answering_model(tmp_path):
+    primary, local = StubOllama(status=500), StubOllama(reply="仓库总结")
+    repo = {
+        "full_name": "octo/demo",
+        "has_updates": True,
+        "activities": [{"type": "commit", "title": "fix bug", "description": "", "created_at": "2026-10-01"}],
+    }
+
+    async def scenario(router: LLMRouter):
+        service = SummaryService(router.base_dir / "config" / "model_config.yaml", llm=router)
+        parts = await service._summarize_repos([repo])
+        assert parts == ["项目名称: octo/demo\n仓库总结"]
+        keys = service._repo_summary_keys(repo)
+        assert service.repo_summary_cache.get(keys["glm-4-plus"]) is None
+        assert service.repo_summary_cache.get(keys["qwen2:7b"]) == "仓库总结"
+
+    asyncio.run(with_stubs(tmp_path, scenario, primary, local))
@@ -0,0 +1,55 @@
+import asyncio
+from email.message import EmailMessage
+
+from src.mail.mail_queue import MailQueue, MailQueueWorker
+
+
+class FakePool:
+    def __init__(self):
+        self.sent = []
+
+    def send_many(self, messages):
+        self.sent.extend(messages)
+        return [(msg, None) for msg in messages]
+
+
+class FakeMailService:
+    """validate_config 的结果可在测试中切换"""
+
+    def __init__(self, valid: bool):
+        self.valid = valid
+        self.pool = FakePool()
+
+    def validate_config(self) -> bool:
+        return self.valid
+
+
+def make_message() -> EmailMessage:
+    msg = EmailMessage()
+    msg["To"] = "user@example.com"
+    msg["Subject"] = "updates"
+    msg.set_content("hello")
+    return msg
+
+
+def test_worker_starts_with_invalid_config_and_sends_once_fixed(tmp_path):
+    queue = MailQueue(tmp_path / "outbox.sqlite3")
+    queue.enqueue(make_message())
+    service = FakeMailService(valid=False)
+
+    async def run():
+        worker = MailQueueWorker(queue, service, poll_interval=0.05, config_retry_interval=0.1)
+        worker.attach_loop(asyncio.get_running_loop())
+        worker.start()
+        await asyncio.sleep(0.2)
+        # 配置不完整时发送任务仍在运行，但邮件保留在队列中
+        assert worker._tasks and not service.pool.sent
+        assert queue.stats()["pending"] == 1
+
+        service.valid = True
+        await asyncio.sleep(0.3)
+        await worker.stop()
+
+    asyncio.run(run())
+    assert len(service.pool.sent) == 1
+    assert queue.stats()["pending"] == 0
@@ -0,0 +1,57 @@
+from src.llm.prompt_compactor import PromptCompactor
+
+
+def activity(type_: str, title: str, **extra) -> dict:
+    return {"type": type_, "title": title, "description": "", **extra}
+
+
+def test_keeps_distinct_releases_and_issues():
+    activities = [
+        activity("Release", "v2.1.0"),
+        activity("Release", "v2.0.0 — major breaking"),
+        activity("Issue", "Crash on Python 3.12"),
+        activity("Issue", "Crash on Python 3.9"),
+    ]
+    result, stats = PromptCompactor(budget_tokens=10000).compact(activities)
+
+    assert [a["title"] for a in result] == [a["title"] for a in activities]
+    assert stats["dropped"] == 0
+
+
+def test_merges_bot_and_numbered_commits():
+    activities = [
+        activity("Commit", "Bump requests from 2.31.0 to 2.32.0", author="dependabot[bot]"),
+        activity("Commit", "Bump urllib3 from 2.0.0 to 2.2.0", author="dependabot[bot]"),
+        activity("Commit", "Merge pull request #12 from a/b"),
+        activity("Commit", "Merge pull request #13 from c/d"),
+        activity("Commit", "Release 1.2"),
+        activity("Commit", "Release 1.3"),
+    ]
+    result, stats = PromptCompactor(budget_tokens=10000).compact(activities)
+
+    assert len(result) == 3
+    assert result[0]["title"].endswith("（及另外 1 条相似Commit）")
+    # 被归并的活动计入 dropped
+    assert stats["dropped"] == 3
+
+
+def test_reports_negative_savings_instead_of_clamping():
+    activities = [activity("Commit", "fix 1"), activity("Commit", "fix 2")]
+    compactor = PromptCompactor(budget_tokens=10000)
+    _, stats = compactor.compact(activities)
+
+    assert stats["saved_tokens"] == stats["original_tokens"] - stats["compacted_tokens"]
+    assert stats["saved_tokens"] < 0
+    assert compactor.total_saved == stats["saved_tokens"]
+
+
+def test_drops_low_priority_activities_over_budget():
+    activities = [activity("Commit", f"change {word}", description="x " * 200)
+                  for word in ("alpha", "beta", "gamma")]
+    activities.append(activity("Release", "v1.0.0"))
+    result, stats = PromptCompactor(budget_tokens=20, max_body_chars=300).compact(activities)
+
+    # 预算不足时优先保留发布
+    assert "v1.0.0" in [a["title"] for a in result]
+    assert len(result) < len(activities)
+    assert stats["dropped"] == len(activities) - len(result)
@@ -0,0 +1,97 @@
+"""SMTPPool 与本地 aiosmtpd 服务之间的测试"""
+import socket
+from email.message import EmailMessage
+from typing import List
+
+import pytest
+from aiosmtpd.controller import Controller
+
+from src.mail.smtp_pool import SMTPPool
+
+
+class RecordingHandler:
+    """记录收到的邮件及其所属的 SMTP 会话"""
+
+    def __init__(self):
+        self.received: List[tuple] = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.received.append((session, envelope.mail_from, envelope.rcpt_tos))
+        return "250 Message accepted for delivery"
+
+    @property
+    def sessions(self) -> int:
+        # 保存了会话对象，标识不会被复用
+        return len({id(session) for session, *_ in self.received})
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def make_message(i: int) -> EmailMessage:
+    msg = EmailMessage()
+    msg["From"] = "tracker@example.com"
+    msg["To"] = f"user{i}@example.com"
+    msg["Subject"] = f"message {i}"
+    msg.set_content("hello")
+    return msg
+
+
+@pytest.fixture
+def smtp_server():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    yield controller, handler
+    controller.stop()
+
+
+def make_pool(controller: Controller, **kwargs) -> SMTPPool:
+    return SMTPPool(controller.hostname, controller.port, use_tls=False, timeout=5, **kwargs)
+
+
+def test_reuses_one_session(smtp_server):
+    controller, handler = smtp_server
+    pool = make_pool(controller)
+    for i in range(5):
+        pool.send(make_message(i))
+    pool.close()
+
+    assert pool.sessions_opened == 1
+    assert handler.sessions == 1
+    assert [rcpt for *_, rcpt in handler.received] == [[f"user{i}@example.com"] for i in range(5)]
+
+
+def test_reconnects_after_server_drops_connection():
+    handler = RecordingHandler()
+    controller = Controller(handler, hostname="127.0.0.1", port=free_port())
+    controller.start()
+    pool = make_pool(controller)
+    try:
+        pool.send(make_message(0))
+        # 在同一端口上重启服务端，池中已建立的连接随之断开
+        controller.stop()
+        controller = Controller(handler, hostname="127.0.0.1", port=controller.port)
+        controller.start()
+        pool.send(make_message(1))
+        pool.close()
+    finally:
+        controller.stop()
+
+    assert pool.sessions_opened == 2
+    assert [rcpt for *_, rcpt in handler.received] == [["user0@example.com"], ["user1@example.com"]]
+
+
+def test_opens_new_session_after_max_messages(smtp_server):
+    controller, handler = smtp_server
+    pool = make_pool(controller, max_messages=2)
+    results = pool.send_many(make_message(i) for i in range(5))
+    pool.close()
+
+    assert all(error is None for _, error in results)
+    assert pool.sessions_opened == 3
+    assert handler.sessions == 3
+    assert len(handler.received) == 5